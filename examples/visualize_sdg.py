@@ -1,29 +1,40 @@
-import json
-import networkx as nx
-import matplotlib.pyplot as plt
+import argparse
+import time
+from collections import defaultdict, deque
 from pathlib import Path
+from xml.sax.saxutils import escape
 
-def visualize_sdg(json_path: str, min_prob: float = 0.0, save_path: str = None):
-    """Load sdg.json and draw or save the dependency graph."""
+import numpy as np
+from src.sl_core.sdg_io import iter_sdg, sdg_format
+
+def visualize_sdg(json_path: str, min_prob: float = 0.0, save_path: str = None, max_nodes: int = 2000):
+    """
+    Load an SDG (sdg.json, .ndjson[.gz] or a Parquet snapshot directory) and draw or save it.
+    Spring layout with matplotlib is only practical for small graphs; above max_nodes use render_svg.
+    """
+    import networkx as nx
+    import matplotlib.pyplot as plt
     path = Path(json_path)
     if not path.exists():
         print(f"[!] File not found: {json_path}")
         return
 
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     G = nx.DiGraph()
-    for node in data.get("nodes", []):
-        G.add_node(node)
-    for e in data.get("edges", []):
-        prob = float(e.get("prob", 0.0))
-        if prob >= min_prob:
-            G.add_edge(e["src"], e["tgt"], weight=prob)
+    for kind, rec in iter_sdg(str(path)):
+        if kind == "node":
+            G.add_node(rec)
+        else:
+            prob = float(rec.get("prob", 0.0))
+            if prob >= min_prob:
+                G.add_edge(rec["src"], rec["tgt"], weight=prob)
 
     if not G.edges:
         print("[!] No edges found above threshold; nothing to visualize.")
         return
+    if G.number_of_nodes() > max_nodes:
+        print(f"[!] {G.number_of_nodes()} nodes is too many for a spring layout; "
+              f"use render_svg (table rollup / focus subgraph) instead.")
+        return
 
     pos = nx.spring_layout(G, k=0.8, iterations=50, seed=42)
 
@@ -45,6 +56,268 @@ def visualize_sdg(json_path: str, min_prob: float = 0.0, save_path: str = None):
     else:
         plt.show()
 
+# ---------------------------------------------------------------------------- large graphs
+class EdgeArrays:
+    """
+    An SDG as interned node names plus src/tgt/prob arrays with CSR indexes in both directions,
+    for neighborhood extraction without building a networkx graph.
+    """
+    def __init__(self, names, src, tgt, prob):
+        self.names = list(names)
+        self.ids = {n: i for i, n in enumerate(self.names)}
+        self.src = np.asarray(src, dtype=np.int64)
+        self.tgt = np.asarray(tgt, dtype=np.int64)
+        self.prob = np.asarray(prob, dtype=np.float64)
+        n = len(self.names)
+        self.out_order = np.argsort(self.src, kind='stable')
+        self.out_ptr = np.searchsorted(self.src[self.out_order], np.arange(n + 1))
+        self.in_order = np.argsort(self.tgt, kind='stable')
+        self.in_ptr = np.searchsorted(self.tgt[self.in_order], np.arange(n + 1))
+
+    @classmethod
+    def load(cls, source, min_prob: float = 0.0) -> 'EdgeArrays':
+        """From an SDG path (a Parquet snapshot is read column-wise through DuckDB) or a store."""
+        if isinstance(source, str) and sdg_format(source) == 'parquet':
+            from src.sl_core.sdg_io import connect_parquet
+            con = connect_parquet(source if Path(source).is_dir() else str(Path(source).parent))
+            names = [r[0] for r in con.execute('SELECT name FROM nodes ORDER BY node_id').fetchall()]
+            cols = con.execute('SELECT src_id, tgt_id, prob FROM edges WHERE prob >= ?', [min_prob]).fetchnumpy()
+            con.close()
+            # node_ids are dense 0..n-1 as written by write_parquet
+            return cls(names, cols['src_id'], cols['tgt_id'], cols['prob'])
+        if hasattr(source, 'compact') and hasattr(source, 'node_names'):
+            source.compact()
+            keep = np.frombuffer(source.prob, dtype=np.float64) >= min_prob
+            return cls(source.node_names, np.frombuffer(source.src, dtype=np.int64)[keep],
+                       np.frombuffer(source.tgt, dtype=np.int64)[keep], np.frombuffer(source.prob, dtype=np.float64)[keep])
+        ids, src, tgt, prob = {}, [], [], []
+        intern = lambda n: ids.setdefault(n, len(ids))
+        if isinstance(source, str):
+            for kind, rec in iter_sdg(source):
+                if kind == 'node':
+                    intern(rec)
+                elif float(rec.get('prob', 0.0)) >= min_prob:
+                    src.append(intern(rec['src'])); tgt.append(intern(rec['tgt'])); prob.append(float(rec.get('prob', 0.0)))
+        else:
+            for n in source.nodes():
+                intern(n)
+            for u, v, p, _ in source.iter_edges():
+                if p >= min_prob:
+                    src.append(intern(u)); tgt.append(intern(v)); prob.append(float(p))
+        return cls(ids, src, tgt, prob)
+
+    def out_edges(self, i):
+        return self.out_order[self.out_ptr[i]:self.out_ptr[i + 1]]
+
+    def in_edges(self, i):
+        return self.in_order[self.in_ptr[i]:self.in_ptr[i + 1]]
+
+    def ego(self, focus, depth: int = 2, min_prob: float = 0.0, direction: str = 'both', max_nodes: int = 5000):
+        """
+        Edges (src, tgt, prob) within `depth` hops of the focus node(s), following only edges with
+        prob >= min_prob. direction is 'up', 'down' or 'both'; expansion stops at max_nodes.
+        """
+        focus = [focus] if isinstance(focus, str) else list(focus)
+        missing = [f for f in focus if f not in self.ids]
+        if missing:
+            raise KeyError(f"focus node(s) not in SDG: {missing[:5]}")
+        seen = {self.ids[f]: 0 for f in focus}
+        edges = set()
+        q = deque(seen)
+        while q:
+            i = q.popleft()
+            d = seen[i]
+            if d >= depth:
+                continue
+            sides = []
+            if direction in ('down', 'both'):
+                sides.append((self.out_edges(i), self.tgt))
+            if direction in ('up', 'both'):
+                sides.append((self.in_edges(i), self.src))
+            for eids, other in sides:
+                for e in eids[self.prob[eids] >= min_prob]:
+                    j = int(other[e])
+                    edges.add(int(e))
+                    if j not in seen and len(seen) < max_nodes:
+                        seen[j] = d + 1
+                        q.append(j)
+        names = self.names
+        return [(names[self.src[e]], names[self.tgt[e]], float(self.prob[e])) for e in sorted(edges)
+                if self.src[e] in seen and self.tgt[e] in seen]
+
+    def all_edges(self, min_prob: float = 0.0):
+        names = self.names
+        keep = np.flatnonzero(self.prob >= min_prob)
+        return [(names[self.src[e]], names[self.tgt[e]], float(self.prob[e])) for e in keep]
+
+def table_of(node: str) -> str:
+    return node.rsplit('.', 1)[0] if '.' in node else node
+
+def rollup_tables(edges, expand=()):
+    """
+    Collapse column edges to table edges, except for tables in `expand`, whose columns stay as
+    nodes. Returns (edges as (u, v, max_prob, n_column_edges), {node: [columns]}).
+    """
+    expand = set(expand)
+    agg = {}
+    columns = defaultdict(set)
+    for u, v, p in edges:
+        tu, tv = table_of(u), table_of(v)
+        a = u if tu in expand else tu
+        b = v if tv in expand else tv
+        columns[a].add(u)
+        columns[b].add(v)
+        if a == b:
+            continue
+        prev = agg.get((a, b))
+        agg[(a, b)] = (max(prev[0], p), prev[1] + 1) if prev else (p, 1)
+    return [(a, b, p, n) for (a, b), (p, n) in agg.items()], {k: sorted(v) for k, v in columns.items()}
+
+def layered_layout(nodes, edges):
+    """
+    Layered (Sugiyama-style) positions {node: (layer, row)}. Layers are longest-path depths from a
+    Kahn topological sort, linear in nodes + edges; cycles are broken at the first unplaced node.
+    Rows within a layer follow the mean row of each node's predecessors (one barycenter sweep).
+    """
+    nodes = list(dict.fromkeys(nodes))
+    succ = defaultdict(list)
+    pred = defaultdict(list)
+    indeg = dict.fromkeys(nodes, 0)
+    for e in edges:
+        u, v = e[0], e[1]
+        if u == v:
+            continue
+        succ[u].append(v)
+        pred[v].append(u)
+        indeg[v] += 1
+    layer = {}
+    q = deque(n for n in nodes if indeg[n] == 0)
+    cursor = 0
+    while len(layer) < len(nodes):
+        if not q:
+            # cycle: release the first unplaced node
+            while nodes[cursor] in layer:
+                cursor += 1
+            n = nodes[cursor]
+            layer[n] = max((layer[p] + 1 for p in pred[n] if p in layer), default=0)
+            indeg[n] = -1
+            q.append(n)
+        while q:
+            n = q.popleft()
+            if n not in layer:
+                layer[n] = max((layer[p] + 1 for p in pred[n] if p in layer), default=0)
+            for m in succ[n]:
+                indeg[m] -= 1
+                if indeg[m] == 0:
+                    q.append(m)
+    by_layer = defaultdict(list)
+    for n in nodes:
+        by_layer[layer[n]].append(n)
+    pos = {}
+    for l in sorted(by_layer):
+        members = by_layer[l]
+        def bary(n):
+            rows = [pos[p][1] for p in pred[n] if p in pos]
+            return sum(rows) / len(rows) if rows else float('inf')
+        members.sort(key=bary)
+        for row, n in enumerate(members):
+            pos[n] = (l, row)
+    return pos
+
+def write_svg(path, edges, pos, columns=None, title=None, col_width=260, row_height=34, box_height=24):
+    """
+    Stream an SVG with one box per node and one curve per edge (stroke opacity ~ prob), writing
+    element by element. columns, when given, adds a hover list of each box's columns.
+    """
+    columns = columns or {}
+    n_layers = 1 + max((l for l, _ in pos.values()), default=0)
+    n_rows = 1 + max((r for _, r in pos.values()), default=0)
+    width = n_layers * col_width + 40
+    height = n_rows * row_height + 60
+    box_w = col_width - 60
+
+    def xy(n):
+        l, r = pos[n]
+        return 20 + l * col_width, 40 + r * row_height
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                f'viewBox="0 0 {width} {height}" font-family="sans-serif" font-size="11">\n')
+        f.write('<defs><marker id="a" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="6" markerHeight="6" '
+                'orient="auto"><path d="M0,0L10,5L0,10z" fill="#555"/></marker></defs>\n')
+        if title:
+            f.write(f'<text x="20" y="22" font-size="14">{escape(title)}</text>\n')
+        f.write('<g fill="none" stroke="#555">\n')
+        for e in edges:
+            u, v, p = e[0], e[1], e[2]
+            if u not in pos or v not in pos:
+                continue
+            x1, y1 = xy(u)
+            x2, y2 = xy(v)
+            x1 += box_w
+            y1 += box_height / 2
+            y2 += box_height / 2
+            mx = (x1 + x2) / 2
+            label = f"{u} -> {v}  p={p:.2f}" + (f"  ({e[3]} column edges)" if len(e) > 3 else "")
+            f.write(f'<path d="M{x1:.0f},{y1:.0f}C{mx:.0f},{y1:.0f} {mx:.0f},{y2:.0f} {x2:.0f},{y2:.0f}" '
+                    f'stroke-opacity="{0.15 + 0.85 * p:.2f}" marker-end="url(#a)"><title>{escape(label)}</title></path>\n')
+        f.write('</g>\n')
+        for n in pos:
+            x, y = xy(n)
+            cols = columns.get(n)
+            is_table = bool(cols) and cols != [n]
+            fill = '#A0CBE2' if not is_table else '#B5E3B0'
+            label = n if len(n) <= 34 else n[:31] + '...'
+            if is_table:
+                label += f' [{len(cols)}]'
+            tip = n + ('\n' + '\n'.join(cols[:200]) if is_table else '')
+            f.write(f'<g><title>{escape(tip)}</title><rect x="{x}" y="{y}" width="{box_w}" height="{box_height}" rx="4" '
+                    f'fill="{fill}" stroke="#333"/><text x="{x + 6}" y="{y + 16}">{escape(label)}</text></g>\n')
+        f.write('</svg>\n')
+
+def render_svg(source, out_path: str, focus=None, depth: int = 2, min_prob: float = 0.0, direction: str = 'both',
+               rollup: bool = None, expand=(), max_nodes: int = 5000, graph: EdgeArrays = None):
+    """
+    Large-graph rendering: optionally cut the ego subgraph around `focus`, optionally roll columns
+    up to tables (default: on without a focus), lay it out in layers and stream it to an SVG.
+    Pass a prebuilt EdgeArrays as `graph` to render many focus nodes from one load.
+    Returns a dict of counts and timings.
+    """
+    t0 = time.perf_counter()
+    g = graph or EdgeArrays.load(source, min_prob)
+    t_load = time.perf_counter() - t0
+    edges = g.ego(focus, depth, min_prob, direction, max_nodes) if focus else g.all_edges(min_prob)
+    if rollup is None:
+        rollup = focus is None
+    columns = None
+    if rollup:
+        edges, columns = rollup_tables(edges, expand)
+    nodes = [n for e in edges for n in (e[0], e[1])]
+    if focus and not rollup:
+        nodes += [focus] if isinstance(focus, str) else list(focus)
+    pos = layered_layout(nodes, edges)
+    title = f"SDG {'around ' + str(focus) if focus else ''} (min_prob={min_prob}{', tables' if rollup else ''})"
+    write_svg(out_path, edges, pos, columns, title)
+    return {'nodes': len(pos), 'edges': len(edges), 'load_s': round(t_load, 3),
+            'render_s': round(time.perf_counter() - t0 - t_load, 3)}
+
 if __name__ == "__main__":
-    json_path = "examples/demo_project/sdg.json"
-    visualize_sdg(json_path, min_prob=0.7)
+    ap = argparse.ArgumentParser(description="Visualize an SDG")
+    ap.add_argument('sdg', nargs='?', default="examples/demo_project/sdg.json")
+    ap.add_argument('--min_prob', type=float, default=0.7)
+    ap.add_argument('--svg', help="write a layered SVG (large-graph mode) instead of a matplotlib figure")
+    ap.add_argument('--focus', nargs='+', help="render only the neighborhood of these nodes")
+    ap.add_argument('--depth', type=int, default=2)
+    ap.add_argument('--direction', choices=['up', 'down', 'both'], default='both')
+    ap.add_argument('--tables', dest='rollup', action='store_true', default=None, help="roll columns up to tables")
+    ap.add_argument('--columns', dest='rollup', action='store_false', help="keep column-level nodes")
+    ap.add_argument('--expand', nargs='*', default=(), help="tables whose columns stay visible under --tables")
+    ap.add_argument('--max_nodes', type=int, default=5000)
+    args = ap.parse_args()
+    if args.svg:
+        stats = render_svg(args.sdg, args.svg, args.focus, args.depth, args.min_prob, args.direction,
+                           args.rollup, args.expand, args.max_nodes)
+        print(f"[+] Saved {stats['nodes']} nodes / {stats['edges']} edges to {args.svg} "
+              f"(load {stats['load_s']}s, render {stats['render_s']}s)")
+    else:
+        visualize_sdg(args.sdg, min_prob=args.min_prob)
@@ -0,0 +1,5 @@
+import sys
+
+from src.sl_core.cli import main
+
+sys.exit(main())
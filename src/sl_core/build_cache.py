@@ -0,0 +1,97 @@
+import os, json, hashlib, logging
+import sqlglot
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_key(catalog=None, sketches=None) -> str:
+    """Key that invalidates the whole cache when the parser, the catalog or the value sketches change."""
+    cat = json.dumps(catalog, sort_keys=True) if catalog else ''
+    sk = sketches.fingerprint() if sketches is not None else ''
+    return f"{CACHE_VERSION}:{sqlglot.__version__}:{hashlib.sha1((cat + sk).encode('utf-8')).hexdigest()}"
+
+class ArtifactCache:
+    """
+    Persistent per-artifact cache keyed by path and content hash, holding the artifact's
+    statement summaries (its share of the schema index) and its edges.
+    A (size, mtime) match is trusted without re-reading the file; otherwise the content
+    hash decides whether the cached entry is still valid. A fingerprint may also carry a 'render'
+    state (the dbt manifest a templated file was compiled from) that must match. Edges additionally
+    carry the digest of the schema-index columns they were resolved against.
+    """
+    def __init__(self, path: str, key: str = ''):
+        self.path = path
+        self.key = key
+        self.entries = {}
+        self.dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    j = json.load(f)
+                if j.get('key') == key:
+                    self.entries = j.get('artifacts', {})
+                else:
+                    log.info("Cache key changed, rebuilding %s", path)
+                    self.dirty = True
+            except Exception as e:
+                log.warning("Ignoring unreadable cache %s: %s", path, e)
+
+    def fingerprint(self, art: str) -> dict:
+        """size, mtime_ns and sha1 of the artifact; the file is only hashed when size/mtime changed."""
+        st = os.stat(art)
+        entry = self.entries.get(art)
+        fp = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+        if entry is not None and entry['size'] == fp['size'] and entry['mtime_ns'] == fp['mtime_ns']:
+            fp['sha1'] = entry['sha1']
+            return fp
+        fp['sha1'] = file_digest(art)
+        if entry is not None and entry['sha1'] == fp['sha1']:
+            entry.update(size=fp['size'], mtime_ns=fp['mtime_ns'])
+            self.dirty = True
+        return fp
+
+    def _entry(self, art: str, fp: dict):
+        entry = self.entries.get(art)
+        if entry is None or entry['sha1'] != fp['sha1'] or entry.get('render', 0) != fp.get('render', 0):
+            return None
+        return entry
+
+    def schema(self, art: str, fp: dict):
+        """Cached statement summaries if the artifact is unchanged, else None."""
+        entry = self._entry(art, fp)
+        return entry.get('schema') if entry is not None else None
+
+    def edges(self, art: str, fp: dict, deps: str = ''):
+        """Cached edges if the artifact and the schema it depends on are unchanged, else None."""
+        entry = self._entry(art, fp)
+        if entry is None or entry.get('deps', '') != deps:
+            return None
+        return entry['edges']
+
+    def put(self, art: str, fp: dict, edges, schema=None, deps: str = ''):
+        self.entries[art] = {'sha1': fp['sha1'], 'size': fp['size'], 'mtime_ns': fp['mtime_ns'],
+                             'render': fp.get('render', 0), 'edges': [list(e) for e in edges], 'schema': schema, 'deps': deps}
+        self.dirty = True
+
+    def drop(self, arts):
+        for art in arts:
+            self.entries.pop(art, None)
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'key': self.key, 'artifacts': self.entries}, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
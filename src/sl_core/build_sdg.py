@@ -1,56 +1,280 @@
 
-import os, glob, datetime, logging
-from src.sl_core.parser_sql import parse_sql_statements, extract_create_selects, map_output_to_input_columns
+import os, glob, datetime, logging, time
+from src.sl_core.parser_sql import summarize_sql
 from src.sl_core.parser_notebook import extract_cells_from_notebook
-from src.sl_core.map_columns import name_similarity
+from src.sl_core.dbt_render import find_project, is_templated, render_sql, render_state
+from src.sl_core.map_columns import NameSimilarityEngine
 from src.sl_core.graph_store import SDGStore
+from src.sl_core.compact_store import CompactSDGStore
+from src.sl_core.build_cache import ArtifactCache, cache_key
+from src.sl_core.schema_index import SchemaIndex, statement_deps
+from src.sl_core.metrics import BuildMetrics, NULL_METRICS, make_metrics
 
 log = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
-def process_workspace(path_root: str, catalog=None, sqlite_db: str = None):
-    store = SDGStore(sqlite_db)
+def _mapping_edges(out_name, colmap, notebook: bool, edges: list, sketches=None, metrics=NULL_METRICS,
+                   similarity: NameSimilarityEngine = None):
+    """Score one statement's output -> input column mapping and append (src, tgt, score) edges."""
+    found = [(out_col, in_col) for out_col, in_cols in colmap.items() for in_col in in_cols]
+    if metrics.enabled:
+        metrics.add('edges_emitted', len(found))
+        metrics.add('wildcard_edges', sum(1 for _, in_col in found if in_col == '*' or in_col.endswith('.*')))
+    similarity = similarity if similarity is not None else NameSimilarityEngine()
+    sims = similarity.score_pairs((out_col, in_col.split('.')[-1] if '.' in in_col else in_col)
+                                  for out_col, in_col in found)
+    for (out_col, in_col), sim in zip(found, sims):
+        src = in_col if isinstance(in_col, str) else str(in_col)
+        tgt = f"{out_name}.{out_col}" if out_name else out_col
+        if notebook:
+            # a derived column's values should be drawn from its source column
+            value = sketches.containment(tgt, src) if sketches is not None else 0.0
+            score = 0.6 * sim + 0.4 * value
+        else:
+            score = sim
+        edges.append((src, tgt, score))
+
+def artifact_sql(art: str, metrics=NULL_METRICS):
+    """
+    The SQL texts of an artifact as (sql_text, from_notebook) pairs.
+    .sql files inside a dbt project or containing Jinja go through the dbt_render pre-render stage.
+    """
+    with metrics.stage('read'):
+        if metrics.enabled:
+            metrics.add('bytes_read', os.path.getsize(art))
+        if art.endswith('.ipynb'):
+            return [(cell['content'], True) for cell in extract_cells_from_notebook(art) if cell['type'] == 'sql']
+        if not art.endswith('.sql'):
+            return []
+        with open(art, encoding='utf-8', errors='ignore') as f:
+            text = f.read()
+    if is_templated(text) or find_project(os.path.dirname(os.path.abspath(art))) is not None:
+        with metrics.stage('render'):
+            text = render_sql(art, text, metrics)
+        return [(text, False)] if text else []
+    return [(text, False)]
+
+def artifact_summaries(art: str, metrics=NULL_METRICS):
+    """
+    First pass over one artifact: the summaries (parser_sql.summarize_sql) of every
+    statement that defines a table or view, each tagged with 'notebook'. They depend only on
+    the artifact's text. Errors are logged and the summaries made before the failure are kept.
+    """
+    out = []
+    t0 = time.perf_counter() if metrics.enabled else 0.0
+    failed = False
+    try:
+        for sql_text, notebook in artifact_sql(art, metrics):
+            for st in summarize_sql(sql_text, metrics):
+                st['notebook'] = notebook
+                out.append(st)
+    except Exception as e:
+        failed = True
+        log.error("Error processing artifact %s: %s", art, e)
+    if metrics.enabled:
+        metrics.add('artifacts_failed' if failed else 'artifacts_ok')
+        metrics.artifact(art, time.perf_counter() - t0, statements=len(out), failed=failed)
+    return out
+
+def _artifact_summaries_metered(art: str):
+    """Worker entry point when metrics are on: the summaries plus the worker-side metrics to merge."""
+    metrics = BuildMetrics(slowest_n=1)
+    summaries = artifact_summaries(art, metrics)
+    return summaries, metrics.state()
+
+def summary_edges(summaries, index: SchemaIndex, sketches=None, metrics=NULL_METRICS,
+                  similarity: NameSimilarityEngine = None):
+    """
+    Second pass: resolve an artifact's statement summaries against the index and score the edges.
+    Pass one `similarity` engine for a whole build so its name interning and score cache are shared.
+    """
+    similarity = similarity if similarity is not None else NameSimilarityEngine()
+    edges = []
+    for st in summaries:
+        if st.get('query') is None:
+            continue
+        with metrics.stage('map'):
+            colmap = index.resolve(st)
+        with metrics.stage('score'):
+            _mapping_edges(st['target'], colmap, st['notebook'], edges, sketches, metrics, similarity)
+    return edges
+
+# resolve-pass worker state: (frozen SchemaIndex, sketches, NameSimilarityEngine), set once per worker
+_resolve_ctx = None
+
+def _init_resolve_worker(index: SchemaIndex, sketches):
+    global _resolve_ctx
+    _resolve_ctx = (index, sketches, NameSimilarityEngine())
+
+def _summary_edges_worker(summaries):
+    index, sketches, similarity = _resolve_ctx
+    return summary_edges(summaries, index, sketches, NULL_METRICS, similarity)
+
+def _summary_edges_metered(summaries):
+    """Worker entry point of the second pass when metrics are on: the edges plus the worker-side metrics."""
+    index, sketches, similarity = _resolve_ctx
+    metrics = BuildMetrics(slowest_n=1)
+    edges = summary_edges(summaries, index, sketches, metrics, similarity)
+    return edges, metrics.state()
+
+def artifact_edges(art: str, catalog=None, sketches=None, metrics=NULL_METRICS):
+    """
+    Parse a single artifact and return the edges it produces as (src, tgt, score) tuples,
+    resolving columns against `catalog` plus the tables and views the artifact itself defines.
+    """
+    summaries = artifact_summaries(art, metrics)
+    index = SchemaIndex(catalog)
+    index.add(summaries)
+    return summary_edges(summaries, index.build(), sketches, metrics)
+
+def list_artifacts(path_root):
+    """Sorted .sql and .ipynb artifacts under path_root (a directory, a file, or a list of either)."""
+    roots = [path_root] if isinstance(path_root, str) else list(path_root)
     artifacts = []
-    for ext in ('*.sql', '*.ipynb', '*.py', '*.json'):
-        artifacts.extend(glob.glob(os.path.join(path_root, '**', ext), recursive=True))
+    for root in roots:
+        if os.path.isfile(root):
+            if root.endswith(('.sql', '.ipynb')):
+                artifacts.append(root)
+            continue
+        for ext in ('*.sql', '*.ipynb'):
+            artifacts.extend(glob.glob(os.path.join(root, '**', ext), recursive=True))
+    return sorted(set(artifacts))
+
+def process_workspace(path_root: str, catalog=None, sqlite_db: str = None, workers: int = None,
+                      cache_path: str = None, store: SDGStore = None, compact: bool = False,
+                      sketches=None, metrics=None):
+    """
+    Build the SDG for every artifact under path_root.
+    The build runs in two passes. The first parses every artifact into statement summaries and
+    builds a SchemaIndex from the CREATE TABLE declarations and inferred view outputs of the
+    whole workspace (plus `catalog`, a hand-built {table: [columns]} dict). The second resolves
+    each statement against that index, expanding stars and qualifying columns, and scores the edges.
+    The index is attached as store.schema_index.
+    With workers > 1 both passes run in a process pool, the second with a frozen copy of the
+    index; edges are merged in sorted artifact order so the resulting store matches a serial run exactly.
+    With cache_path, only artifacts whose content changed since the last run are re-parsed, and
+    only those or the ones whose upstream columns changed get new edges.
+    Unchanged artifacts replay their cached edges into a new store; when `store` already holds
+    the previous build, their edges are left in place and changed or deleted artifacts have
+    their evidence retracted first.
+    With compact=True the graph is built in a CompactSDGStore instead of a networkx-backed SDGStore.
+    `sketches` (a SketchStore or the path of a saved one) adds value-overlap evidence to notebook edges.
+    metrics=True (or a BuildMetrics) records stage timings, counters and the slowest artifacts; the
+    result is attached as store.metrics. Worker-side stage times (read, parse, extract, map, score)
+    are summed over workers, while 'pool' is the wall time of the parallel sections.
+    """
+    metrics = make_metrics(metrics)
+    find_project.cache_clear()
+    incremental = store is not None
+    if store is None:
+        store = CompactSDGStore() if compact else SDGStore(sqlite_db)
+    with metrics.stage('glob'):
+        artifacts = list_artifacts(path_root)
+    metrics.add('artifacts', len(artifacts))
     ts = datetime.datetime.utcnow().isoformat()
-    for art in sorted(set(artifacts)):
-        try:
-            if art.endswith('.sql'):
-                sql_text = open(art, encoding='utf-8', errors='ignore').read()
-                asts = parse_sql_statements(sql_text)
-                for ast in asts:
-                    pairs = extract_create_selects(ast)
-                    for out_name, select_ast in pairs:
-                        colmap = map_output_to_input_columns(select_ast, catalog)
-                        for out_col, in_cols in colmap.items():
-                            for in_col in in_cols:
-                                sim = name_similarity(out_col, in_col.split('.')[-1] if '.' in in_col else in_col)
-                                score = sim
-                                src = in_col if isinstance(in_col, str) else str(in_col)
-                                tgt = f"{out_name}.{out_col}" if out_name else out_col
-                                store.add_edge(src, tgt, score, artifact_id=art, timestamp=ts)
-            elif art.endswith('.ipynb'):
-                cells = extract_cells_from_notebook(art)
-                for cell in cells:
-                    if cell['type'] == 'sql':
-                        sql_text = cell['content']
-                        asts = parse_sql_statements(sql_text)
-                        for ast in asts:
-                            pairs = extract_create_selects(ast)
-                            for out_name, select_ast in pairs:
-                                colmap = map_output_to_input_columns(select_ast, catalog)
-                                for out_col, in_cols in colmap.items():
-                                    for in_col in in_cols:
-                                        sim = name_similarity(out_col, in_col.split('.')[-1] if '.' in in_col else in_col)
-                                        score = 0.6 * sim + 0.4 * 0.0
-                                        src = in_col if isinstance(in_col, str) else str(in_col)
-                                        tgt = f"{out_name}.{out_col}" if out_name else out_col
-                                        store.add_edge(src, tgt, score, artifact_id=art, timestamp=ts)
-                    else:
-                        pass
+
+    if isinstance(sketches, str):
+        from src.sl_core.sketches import SketchStore
+        sketches = SketchStore.load(sketches) if os.path.exists(sketches) else None
+    summaries, fingerprints, to_parse = {}, {}, []
+    with metrics.stage('cache'):
+        cache = ArtifactCache(cache_path, cache_key(catalog, sketches)) if cache_path else None
+        for art in artifacts:
+            if cache is not None:
+                fingerprints[art] = fp = cache.fingerprint(art)
+                fp['render'] = render_state(art)
+                summaries[art] = cache.schema(art, fp)
+                if summaries[art] is not None:
+                    continue
+            to_parse.append(art)
+
+    # first pass: statement summaries of changed artifacts (the parsing work)
+    if workers and workers > 1 and len(to_parse) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(to_parse) // (workers * 4))
+        with metrics.stage('pool'), ProcessPoolExecutor(max_workers=workers) as ex:
+            if metrics.enabled:
+                for art, (parsed, state) in zip(to_parse, ex.map(_artifact_summaries_metered, to_parse, chunksize=chunksize)):
+                    summaries[art] = parsed
+                    metrics.merge(state)
+            else:
+                summaries.update(zip(to_parse, ex.map(artifact_summaries, to_parse, chunksize=chunksize)))
+    else:
+        for art in to_parse:
+            summaries[art] = artifact_summaries(art, metrics)
+
+    with metrics.stage('schema'):
+        index = SchemaIndex(catalog)
+        for art in artifacts:
+            index.add(summaries[art])
+        index.build()
+    metrics.add('schema_objects', len(index.tables))
+
+    # second pass: edges of artifacts whose text or upstream schema changed
+    cached, deps, to_resolve = {}, {}, []
+    with metrics.stage('cache'):
+        for art in artifacts:
+            deps[art] = index.digest(statement_deps(summaries[art]))
+            edges = cache.edges(art, fingerprints[art], deps[art]) if cache is not None else None
+            if edges is not None:
+                cached[art] = edges
+            else:
+                to_resolve.append(art)
+    metrics.add('artifacts_cached', len(cached))
+    if incremental or sqlite_db:
+        with metrics.stage('retract'):
+            # artifacts the store (or its database) holds that are gone from the workspace; the
+            # cache cannot tell, since it starts empty when it was unreadable or its key changed
+            held = store.artifact_ids()
+            if isinstance(store, SDGStore):
+                held |= store.persisted_artifacts()
+            stale = held - set(artifacts)
+            if incremental:
+                stale |= set(to_resolve)
+            store.remove_artifacts(stale)
+    if cache is not None:
+        with metrics.stage('cache'):
+            cache.drop(set(cache.entries) - set(artifacts))
+    if workers and workers > 1 and len(to_resolve) > 1:
+        # the index is frozen and sent once per worker; each task only carries one artifact's summaries
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(to_resolve) // (workers * 4))
+        work = [summaries[art] for art in to_resolve]
+        with metrics.stage('pool'), ProcessPoolExecutor(max_workers=workers, initializer=_init_resolve_worker,
+                                                        initargs=(index.frozen(), sketches)) as ex:
+            if metrics.enabled:
+                parsed = {}
+                for art, (edges, state) in zip(to_resolve, ex.map(_summary_edges_metered, work, chunksize=chunksize)):
+                    parsed[art] = edges
+                    metrics.merge(state)
+            else:
+                parsed = dict(zip(to_resolve, ex.map(_summary_edges_worker, work, chunksize=chunksize)))
+    else:
+        # one engine per build: its interned names and score cache live as long as the build
+        similarity = NameSimilarityEngine()
+        parsed = {art: summary_edges(summaries[art], index, sketches, metrics, similarity) for art in to_resolve}
+
+    with metrics.stage('store'):
+        n_edges = 0
+        for art in artifacts:
+            if art in parsed:
+                edges = parsed[art]
+                if cache is not None:
+                    cache.put(art, fingerprints[art], edges, summaries[art], deps[art])
+            elif incremental:
+                continue
             else:
-                pass
-        except Exception as e:
-            log.error("Error processing artifact %s: %s", art, e)
+                edges = cached[art]
+            n_edges += len(edges)
+            for src, tgt, score in edges:
+                store.add_edge(src, tgt, score, artifact_id=art, timestamp=ts)
+        store.flush()
+    metrics.add('edges_stored', n_edges)
+    if isinstance(store, CompactSDGStore):
+        with metrics.stage('compact'):
+            store.compact()
+    if cache is not None:
+        with metrics.stage('cache'):
+            cache.save()
+    store.schema_index = index
+    store.metrics = metrics.finish()
     return store
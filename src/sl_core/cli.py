@@ -0,0 +1,116 @@
+"""
+Command-line entry point: `python -m src.sl_core {build,query,export} ...`.
+
+Only argparse and the standard library are imported at startup. Each command imports what it
+needs: build pulls in the SQL parser (sqlglot), notebooks pull in nbformat only when the fast
+scanner cannot read them, pandas/numpy only come in with value sketches or Parquet, and
+duckdb only with Parquet I/O or probes. tests/test_cli.py keeps the cold start within budget.
+"""
+import argparse
+import json
+import logging
+import sys
+
+log = logging.getLogger(__name__)
+
+def _load_store(path: str):
+    from src.sl_core.compact_store import CompactSDGStore
+    from src.sl_core.sdg_io import load_sdg
+    store = CompactSDGStore()
+    load_sdg(path, store)
+    store.compact()
+    return store
+
+def cmd_build(args) -> int:
+    from src.sl_core.build_sdg import process_workspace
+    catalog = None
+    if args.catalog:
+        with open(args.catalog, encoding='utf-8') as f:
+            catalog = json.load(f)
+    paths = args.paths[0] if len(args.paths) == 1 else args.paths
+    store = process_workspace(paths, catalog=catalog, sqlite_db=args.sqlite, workers=args.workers,
+                              cache_path=args.cache, compact=args.compact, sketches=args.sketches,
+                              metrics=bool(args.metrics))
+    if args.out:
+        from src.sl_core.sdg_io import save_sdg
+        save_sdg(store, args.out, args.format)
+    if args.metrics:
+        store.metrics.dump_json(args.metrics)
+    if hasattr(store, 'close'):
+        store.close()
+    n_edges = store.number_of_edges() if hasattr(store, 'number_of_edges') else store.G.number_of_edges()
+    print(f"{n_edges} edges" + (f" -> {args.out}" if args.out else ""))
+    return 0
+
+def cmd_query(args) -> int:
+    from src.sl_core.lineage_query import LineageIndex
+    index = LineageIndex(_load_store(args.sdg))
+    missing = [n for n in args.nodes if n not in index.ids]
+    for n in missing:
+        print(f"[!] not in SDG: {n}", file=sys.stderr)
+    nodes = [n for n in args.nodes if n in index.ids]
+    if args.impact:
+        out = index.impact(nodes, min_prob=args.min_prob, max_depth=args.max_depth)
+    else:
+        walk = index.upstream if args.direction == 'up' else index.downstream
+        out = {n: walk(n, max_depth=args.max_depth, min_prob=args.min_prob) for n in nodes}
+    if args.json:
+        json.dump(out, sys.stdout, indent=2, sort_keys=True)
+        print()
+    elif args.impact:
+        for table, cols in out.items():
+            print(f"{table}: {', '.join(cols)}")
+    else:
+        for n, hits in out.items():
+            print(n)
+            for m, p in sorted(hits.items(), key=lambda kv: (-kv[1], kv[0])):
+                print(f"  {p:.3f}  {m}")
+    return 1 if missing else 0
+
+def cmd_export(args) -> int:
+    from src.sl_core.sdg_io import save_sdg
+    store = _load_store(args.sdg)
+    save_sdg(store, args.out, args.format)
+    print(f"{store.number_of_edges()} edges -> {args.out}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog='python -m src.sl_core', description="StructureLineage: build and query Schema Dependency Graphs")
+    ap.add_argument('-v', '--verbose', action='store_true', help="log progress at INFO level")
+    sub = ap.add_subparsers(dest='command', required=True)
+    formats = ('json', 'ndjson', 'parquet')
+
+    b = sub.add_parser('build', help="build an SDG from .sql/.ipynb artifacts")
+    b.add_argument('paths', nargs='+', help="workspace directories and/or individual artifact files")
+    b.add_argument('--out', help="write the SDG here (sdg.json, .ndjson[.gz] or a Parquet directory)")
+    b.add_argument('--format', choices=formats, help="output format (default: implied by --out)")
+    b.add_argument('--catalog', help="JSON catalog {table: [columns]} for star expansion")
+    b.add_argument('--workers', type=int, default=None)
+    b.add_argument('--cache', help="incremental build cache file")
+    b.add_argument('--sqlite', help="also persist to this SQLite database")
+    b.add_argument('--compact', action='store_true', help="build in the compact (CSR) store")
+    b.add_argument('--sketches', help="saved SketchStore for value-overlap evidence")
+    b.add_argument('--metrics', help="write build metrics JSON here")
+    b.set_defaults(func=cmd_build)
+
+    q = sub.add_parser('query', help="upstream/downstream lineage of columns in a saved SDG")
+    q.add_argument('sdg', help="sdg.json, .ndjson[.gz] or Parquet snapshot")
+    q.add_argument('nodes', nargs='+', help="fully qualified columns, e.g. orders.customer_id")
+    q.add_argument('--direction', choices=('up', 'down'), default='down')
+    q.add_argument('--impact', action='store_true', help="downstream columns grouped by table")
+    q.add_argument('--max_depth', type=int, default=None)
+    q.add_argument('--min_prob', type=float, default=0.0)
+    q.add_argument('--json', action='store_true')
+    q.set_defaults(func=cmd_query)
+
+    e = sub.add_parser('export', help="convert a saved SDG between formats")
+    e.add_argument('sdg')
+    e.add_argument('out')
+    e.add_argument('--format', choices=formats, help="output format (default: implied by out)")
+    e.set_defaults(func=cmd_export)
+    return ap
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    return args.func(args)
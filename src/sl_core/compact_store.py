@@ -0,0 +1,296 @@
+import json
+import os
+from array import array
+from bisect import bisect_left
+from src.sl_core.metrics import NULL_METRICS
+
+def _to_array(typecode: str, values) -> array:
+    out = array(typecode)
+    out.frombytes(values.astype('int64' if typecode == 'q' else 'float64').tobytes())
+    return out
+
+class CompactSDGStore:
+    """
+    Memory-compact drop-in for SDGStore.
+
+    Node names, artifact ids and timestamps are interned to integer ids. Edges are kept in
+    COO buffers (src, tgt, prob) while building and evidence as columnar
+    (edge, artifact, score, ts) buffers. compact() sorts both into CSR form, drops the build-time
+    hash index and adds a CSC index for predecessor lookups. Further add_edge calls simply
+    reopen the build buffers.
+    """
+    def __init__(self):
+        self.metrics = NULL_METRICS
+        self.node_names = []
+        self._node_ids = {}
+        self.artifacts = []
+        self._artifact_ids = {}
+        self.timestamps = []
+        self._ts_ids = {}
+        self._init_buffers()
+        self._edge_ids = {}
+        self.indptr = None
+        self.ev_ptr = None
+        self.in_indptr = None
+        self.in_edges = None
+        self._G = None
+        self.version = 0
+
+    @staticmethod
+    def _intern(value, ids: dict, values: list) -> int:
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = len(values)
+            values.append(value)
+        return i
+
+    def node_id(self, name: str) -> int:
+        return self._intern(name, self._node_ids, self.node_names)
+
+    @property
+    def compacted(self) -> bool:
+        return self.indptr is not None
+
+    def _reopen(self):
+        """Drop the CSR indexes and rebuild the (src, tgt) -> edge hash index for appends."""
+        self._edge_ids = {(s << 32) | t: i for i, (s, t) in enumerate(zip(self.src, self.tgt))}
+        self.indptr = self.ev_ptr = self.in_indptr = self.in_edges = None
+
+    def _append_edge(self, s: int, t: int, prob: float) -> int:
+        key = (s << 32) | t
+        eid = self._edge_ids.get(key)
+        if eid is None:
+            eid = self._edge_ids[key] = len(self.src)
+            self.src.append(s)
+            self.tgt.append(t)
+            self.prob.append(prob)
+        return eid
+
+    def _append_evidence(self, eid: int, artifact_id, score: float, timestamp):
+        self.ev_edge.append(eid)
+        self.ev_artifact.append(self._intern(artifact_id, self._artifact_ids, self.artifacts))
+        self.ev_score.append(score)
+        self.ev_ts.append(self._intern(timestamp, self._ts_ids, self.timestamps))
+
+    def add_edge(self, src: str, tgt: str, score: float, artifact_id: str, timestamp: str):
+        if self.compacted:
+            self._reopen()
+        self._G = None
+        self.version += 1
+        s = self.node_id(src)
+        t = self.node_id(tgt)
+        n = len(self.src)
+        eid = self._append_edge(s, t, score)
+        if eid != n:
+            self.prob[eid] = 1.0 - (1.0 - self.prob[eid])*(1.0 - score)
+        self._append_evidence(eid, artifact_id, score, timestamp)
+
+    def flush(self):
+        pass
+
+    def compact(self):
+        """Sort edges into CSR order (by src, then tgt) and group evidence per edge."""
+        import numpy as np
+        if self.compacted:
+            return
+        n_nodes = len(self.node_names)
+        i64 = lambda buf: np.frombuffer(buf, dtype=np.int64)
+        f64 = lambda buf: np.frombuffer(buf, dtype=np.float64)
+        order = np.lexsort((i64(self.tgt), i64(self.src)))
+        remap = np.empty_like(order)
+        remap[order] = np.arange(len(order))
+        ev_edge = remap[i64(self.ev_edge)]
+        ev_order = np.argsort(ev_edge, kind='stable')
+
+        self.src = _to_array('q', i64(self.src)[order])
+        self.tgt = _to_array('q', i64(self.tgt)[order])
+        self.prob = _to_array('d', f64(self.prob)[order])
+        self.ev_edge = _to_array('q', ev_edge[ev_order])
+        self.ev_artifact = _to_array('q', i64(self.ev_artifact)[ev_order])
+        self.ev_score = _to_array('d', f64(self.ev_score)[ev_order])
+        self.ev_ts = _to_array('q', i64(self.ev_ts)[ev_order])
+
+        src, tgt = i64(self.src), i64(self.tgt)
+        self.indptr = _to_array('q', np.concatenate(([0], np.cumsum(np.bincount(src, minlength=n_nodes)))))
+        counts = np.bincount(i64(self.ev_edge), minlength=len(self.src))
+        self.ev_ptr = _to_array('q', np.concatenate(([0], np.cumsum(counts))))
+        self.in_edges = _to_array('q', np.argsort(tgt, kind='stable'))
+        self.in_indptr = _to_array('q', np.concatenate(([0], np.cumsum(np.bincount(tgt, minlength=n_nodes)))))
+        self._edge_ids = {}
+
+    def number_of_nodes(self) -> int:
+        return len(self.node_names)
+
+    def number_of_edges(self) -> int:
+        return len(self.src)
+
+    def edge_id(self, src: str, tgt: str):
+        s = self._node_ids.get(src)
+        t = self._node_ids.get(tgt)
+        if s is None or t is None:
+            return None
+        if not self.compacted:
+            return self._edge_ids.get((s << 32) | t)
+        lo, hi = self.indptr[s], self.indptr[s + 1]
+        i = bisect_left(self.tgt, t, lo, hi)
+        return i if i < hi and self.tgt[i] == t else None
+
+    def successors(self, node: str):
+        self.compact()
+        s = self._node_ids.get(node)
+        if s is None:
+            return []
+        return [(self.node_names[self.tgt[i]], self.prob[i]) for i in range(self.indptr[s], self.indptr[s + 1])]
+
+    def predecessors(self, node: str):
+        self.compact()
+        t = self._node_ids.get(node)
+        if t is None:
+            return []
+        return [(self.node_names[self.src[e]], self.prob[e])
+                for e in self.in_edges[self.in_indptr[t]:self.in_indptr[t + 1]]]
+
+    def evidence(self, eid: int):
+        self.compact()
+        return [{'artifact': self.artifacts[self.ev_artifact[k]], 'score': self.ev_score[k],
+                 'ts': self.timestamps[self.ev_ts[k]]}
+                for k in range(self.ev_ptr[eid], self.ev_ptr[eid + 1])]
+
+    def iter_edges(self):
+        """Yield (src, tgt, prob, evidence) for every edge in CSR order."""
+        self.compact()
+        names = self.node_names
+        for i in range(len(self.src)):
+            yield names[self.src[i]], names[self.tgt[i]], self.prob[i], self.evidence(i)
+
+    def artifact_ids(self) -> set:
+        """Artifacts with evidence in the store."""
+        return {self.artifacts[a] for a in set(self.ev_artifact)}
+
+    def remove_artifacts(self, artifact_ids):
+        """Retract all evidence contributed by the given artifacts and recombine edge probabilities."""
+        drop = {self._artifact_ids[a] for a in artifact_ids if a in self._artifact_ids}
+        if not drop:
+            return
+        self.compact()
+        self._G = None
+        self.version += 1
+        affected = set()
+        keep_ev = []
+        for k, (eid, art) in enumerate(zip(self.ev_edge, self.ev_artifact)):
+            if art in drop:
+                affected.add(eid)
+            else:
+                keep_ev.append(k)
+        remaining = {}
+        for k in keep_ev:
+            eid = self.ev_edge[k]
+            if eid in affected:
+                remaining.setdefault(eid, []).append(self.ev_score[k])
+
+        src, tgt, prob = self.src, self.tgt, self.prob
+        ev_edge, ev_artifact, ev_score, ev_ts = self.ev_edge, self.ev_artifact, self.ev_score, self.ev_ts
+        self._init_buffers()
+        new_ids = {}
+        touched = set()
+        for eid in range(len(src)):
+            if eid in affected:
+                rest = remaining.get(eid)
+                if not rest:
+                    touched.update((src[eid], tgt[eid]))
+                    continue
+                p = rest[0]
+                for sc in rest[1:]:
+                    p = 1.0 - (1.0 - p)*(1.0 - sc)
+            else:
+                p = prob[eid]
+            new_ids[eid] = len(self.src)
+            self.src.append(src[eid])
+            self.tgt.append(tgt[eid])
+            self.prob.append(p)
+        for k in keep_ev:
+            self.ev_edge.append(new_ids[ev_edge[k]])
+            self.ev_artifact.append(ev_artifact[k])
+            self.ev_score.append(ev_score[k])
+            self.ev_ts.append(ev_ts[k])
+        self._prune_nodes(touched)
+        self._reopen()
+
+    def _init_buffers(self):
+        self.src, self.tgt, self.prob = array('q'), array('q'), array('d')
+        self.ev_edge, self.ev_artifact, self.ev_score, self.ev_ts = array('q'), array('q'), array('d'), array('q')
+
+    def _prune_nodes(self, candidates):
+        """
+        Drop the candidate nodes (endpoints of removed edges) left without edges and renumber the
+        rest, keeping first-seen order. Other isolated nodes, e.g. from put_node, stay.
+        """
+        dead = set(candidates) - set(self.src) - set(self.tgt)
+        if not dead:
+            return
+        remap = {}
+        names = []
+        for i, name in enumerate(self.node_names):
+            if i not in dead:
+                remap[i] = len(names)
+                names.append(name)
+        self.node_names = names
+        self._node_ids = {n: i for i, n in enumerate(names)}
+        self.src = array('q', (remap[s] for s in self.src))
+        self.tgt = array('q', (remap[t] for t in self.tgt))
+
+    def to_networkx(self) -> 'nx.DiGraph':
+        """Materialize a networkx DiGraph with the same node/edge attributes as SDGStore.G."""
+        import networkx as nx
+        G = nx.DiGraph()
+        G.add_nodes_from(self.node_names)
+        for u, v, p, ev in self.iter_edges():
+            G.add_edge(u, v, prob=p, evidence=ev)
+        return G
+
+    @property
+    def G(self) -> 'nx.DiGraph':
+        if self._G is None:
+            self._G = self.to_networkx()
+        return self._G
+
+    def persist_json(self, path: str):
+        out = {'nodes': list(self.node_names), 'edges': []}
+        for u, v, p, ev in self.iter_edges():
+            out['edges'].append({'src': u, 'tgt': v, 'prob': float(p), 'evidence': ev})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(out, f, indent=2)
+
+    def load_json(self, path: str):
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8') as f:
+            j = json.load(f)
+        for n in j.get('nodes', []):
+            self.put_node(n)
+        for e in j.get('edges', []):
+            self.put_edge(e['src'], e['tgt'], e.get('prob', 0.0), e.get('evidence', []))
+        self.compact()
+
+    def nodes(self):
+        return iter(self.node_names)
+
+    def put_node(self, name: str):
+        if name in self._node_ids:
+            return
+        if self.compacted:
+            self._reopen()
+        self._G = None
+        self.version += 1
+        self.node_id(name)
+
+    def put_edge(self, src: str, tgt: str, prob: float, evidence: list):
+        """Insert an edge with an already combined probability, as loaded from a persisted SDG."""
+        if self.compacted:
+            self._reopen()
+        self._G = None
+        self.version += 1
+        eid = self._append_edge(self.node_id(src), self.node_id(tgt), prob)
+        self.prob[eid] = prob
+        for ev in evidence:
+            self._append_evidence(eid, ev.get('artifact'), ev.get('score', 0.0), ev.get('ts'))
@@ -0,0 +1,495 @@
+"""
+Pre-render stage for dbt models and other Jinja-templated SQL.
+
+A dbt model is a bare SELECT full of {{ ref() }} / {{ source() }} / {% ... %} that sqlglot cannot
+parse, and even when it can, a bare SELECT carries no target. render_sql turns such a file into
+plain SQL with the model as target:
+
+- compiled code is taken from the project's target/manifest.json (loaded once per project) or
+  target/compiled/<project>/<path> when a previous `dbt compile` left them behind;
+- otherwise the template is rendered offline: ref('m') becomes m, source('s', 't') becomes s.t,
+  config() is dropped (its alias kept), is_incremental() is false, {% set %} and {% for %} over
+  literal lists are evaluated, and anything unknown becomes a placeholder that still parses;
+- the model's SELECT is wrapped as CREATE VIEW <model> AS ..., so model names become SDG table
+  nodes and refs to them link up.
+
+Files under the project's macro, test and target paths yield no SQL. Results are memoized by
+file content hash (plus the manifest state), so repeated builds in a process render each file once;
+across runs the build cache keeps the parsed summaries of unchanged files.
+"""
+import ast
+import hashlib
+import json
+import logging
+import operator
+import os
+import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from src.sl_core.parser_sql import is_lineage_statement, split_statements
+
+log = logging.getLogger(__name__)
+
+RENDER_CACHE_SIZE = 4096
+_render_cache = OrderedDict()
+
+_TEMPLATE = re.compile(r'\{\{|\{%|\{#')
+_TOKEN = re.compile(r'\{\{-?(.*?)-?\}\}|\{%-?(.*?)-?%\}|\{#.*?#\}', re.S)
+_RAW = re.compile(r'\{%-?\s*raw\s*-?%\}(.*?)\{%-?\s*endraw\s*-?%\}', re.S)
+_FROM_END = re.compile(r'\b(?:FROM|JOIN)\s*$', re.I)
+_IDENT = re.compile(r'[A-Za-z_]\w*$')
+_SQL_START = re.compile(r'\(*\s*(?:SELECT|WITH|VALUES)\b', re.I)
+
+# blocks whose body is not part of the model's SQL
+_SKIP_BLOCKS = {'macro': 'endmacro', 'call': 'endcall', 'test': 'endtest', 'docs': 'enddocs',
+                'materialization': 'endmaterialization'}
+
+def is_templated(text: str) -> bool:
+    return _TEMPLATE.search(text) is not None
+
+# ---------------------------------------------------------------------------- dbt projects
+class DbtProject:
+    """A dbt project root: its paths from dbt_project.yml and, lazily, its compiled manifest."""
+    def __init__(self, root: str):
+        self.root = root
+        conf = _read_project_yml(os.path.join(root, 'dbt_project.yml'))
+        self.name = conf.get('name') or os.path.basename(root)
+        self.model_paths = _paths(conf, ('model-paths', 'source-paths'), ['models'])
+        self.model_paths += _paths(conf, ('snapshot-paths',), ['snapshots'])
+        self.model_paths += _paths(conf, ('analysis-paths',), ['analyses', 'analysis'])
+        self.skip_paths = (_paths(conf, ('macro-paths',), ['macros']) + _paths(conf, ('test-paths',), ['tests'])
+                           + _paths(conf, ('target-path',), ['target']) + ['dbt_packages', 'dbt_modules'])
+        self.target_path = os.path.join(root, _paths(conf, ('target-path',), ['target'])[0])
+        self._compiled = None
+        self._compiled_state = None
+
+    def _under(self, path: str, dirs: List[str]) -> bool:
+        rel = os.path.relpath(path, self.root)
+        return any(rel == d or rel.startswith(d.rstrip('/') + os.sep) for d in dirs)
+
+    def kind(self, path: str) -> str:
+        """'model' for model/snapshot/analysis files, 'skip' for macros, tests and build output."""
+        if self._under(path, self.skip_paths):
+            return 'skip'
+        return 'model' if self._under(path, self.model_paths) else 'other'
+
+    @property
+    def state(self) -> int:
+        """Changes whenever the manifest does, so memoized renders follow recompiles."""
+        try:
+            return os.stat(os.path.join(self.target_path, 'manifest.json')).st_mtime_ns
+        except OSError:
+            return 0
+
+    def compiled(self) -> Dict[str, Tuple[str, str]]:
+        """{absolute model path: (relation name, compiled SQL)} from target/manifest.json, loaded once."""
+        state = self.state
+        if self._compiled is None or self._compiled_state != state:
+            self._compiled, self._compiled_state = {}, state
+            path = os.path.join(self.target_path, 'manifest.json')
+            if os.path.exists(path):
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        nodes = json.load(f).get('nodes', {})
+                except Exception as e:
+                    log.warning("Ignoring unreadable dbt manifest %s: %s", path, e)
+                    nodes = {}
+                for node in nodes.values():
+                    code = node.get('compiled_code') or node.get('compiled_sql')
+                    if (code and node.get('resource_type') in ('model', 'snapshot', 'analysis')
+                            and node.get('package_name', self.name) == self.name):
+                        key = os.path.normpath(os.path.join(self.root, node['original_file_path']))
+                        self._compiled[key] = (node.get('alias') or node['name'], code)
+        return self._compiled
+
+    def compiled_sql(self, path: str) -> Optional[Tuple[Optional[str], str]]:
+        """(relation name or None, compiled SQL) for a model compiled by a previous dbt run."""
+        hit = self.compiled().get(os.path.normpath(path))
+        if hit is not None:
+            return hit
+        compiled = os.path.join(self.target_path, 'compiled', self.name, os.path.relpath(path, self.root))
+        if os.path.exists(compiled):
+            with open(compiled, encoding='utf-8', errors='ignore') as f:
+                return None, f.read()
+        return None
+
+def _read_project_yml(path: str) -> dict:
+    try:
+        with open(path, encoding='utf-8') as f:
+            text = f.read()
+    except OSError:
+        return {}
+    try:
+        import yaml
+        conf = yaml.safe_load(text)
+        return conf if isinstance(conf, dict) else {}
+    except ImportError:
+        pass
+    except Exception as e:
+        log.warning("Ignoring unreadable %s: %s", path, e)
+        return {}
+    # without PyYAML: top-level scalars and inline lists are all the paths need
+    conf = {}
+    for m in re.finditer(r'^([\w-]+):[ \t]*(.+?)[ \t]*$', text, re.M):
+        value = m.group(2).split(' #')[0].strip()
+        if value.startswith('['):
+            conf[m.group(1)] = [v.strip().strip('\'"') for v in value.strip('[]').split(',') if v.strip()]
+        else:
+            conf[m.group(1)] = value.strip('\'"')
+    return conf
+
+def _paths(conf: dict, keys, default: List[str]) -> List[str]:
+    for key in keys:
+        value = conf.get(key)
+        if value:
+            return [value] if isinstance(value, str) else [str(v) for v in value]
+    return list(default)
+
+@lru_cache(maxsize=None)
+def find_project(directory: str) -> Optional[DbtProject]:
+    """The dbt project containing `directory` (nearest dbt_project.yml upwards), or None."""
+    if os.path.exists(os.path.join(directory, 'dbt_project.yml')):
+        return DbtProject(directory)
+    parent = os.path.dirname(directory)
+    return find_project(parent) if parent != directory else None
+
+# ---------------------------------------------------------------------------- offline Jinja
+class _Unknown:
+    """An expression the offline renderer cannot evaluate; `call` marks macro calls."""
+    __slots__ = ('text', 'call', 'columns')
+
+    def __init__(self, text: str, call: bool = False, columns: Tuple[str, ...] = ()):
+        self.text = text
+        self.call = call
+        self.columns = columns
+
+class _Relation(str):
+    pass
+
+_COMPARE = {ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+            ast.Gt: operator.gt, ast.GtE: operator.ge, ast.In: lambda a, b: a in b,
+            ast.NotIn: lambda a, b: a not in b, ast.Is: operator.is_, ast.IsNot: operator.is_not}
+_CONSTANTS = {'true': True, 'false': False, 'none': None, 'True': True, 'False': False, 'None': None}
+_FILTERS = {'upper': str.upper, 'lower': str.lower, 'trim': str.strip, 'string': str, 'list': list}
+
+def _dotted(node) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return f"{_dotted(node.value)}.{node.attr}"
+    return ast.dump(node)
+
+class _Renderer:
+    def __init__(self, model: str):
+        self.model = model
+        self.config = {}
+
+    # ------------------------------------------------------------------ template tree
+    def parse(self, text: str):
+        raws = []
+        def keep_raw(m):
+            raws.append(m.group(1))
+            return f"\x00{len(raws) - 1}\x00"
+        text = _RAW.sub(keep_raw, text)
+        tokens, pos = [], 0
+        for m in _TOKEN.finditer(text):
+            if m.start() > pos:
+                tokens.append(('text', text[pos:m.start()]))
+            if m.group(1) is not None:
+                tokens.append(('expr', m.group(1).strip()))
+            elif m.group(2) is not None:
+                tokens.append(('stmt', m.group(2).strip()))
+            pos = m.end()
+        tokens.append(('text', text[pos:]))
+        tokens = [(k, re.sub('\x00(\\d+)\x00', lambda m: raws[int(m.group(1))], v) if k == 'text' else v)
+                  for k, v in tokens]
+        nodes, _, _ = self._block(tokens, 0, ())
+        return nodes
+
+    def _block(self, tokens, i, stops):
+        """Nodes up to one of the `stops` tags; returns (nodes, next index, stop tag found)."""
+        nodes = []
+        while i < len(tokens):
+            kind, value = tokens[i]
+            i += 1
+            if kind != 'stmt':
+                nodes.append((kind, value))
+                continue
+            tag = value.split(None, 1)[0] if value else ''
+            rest = value[len(tag):].strip()
+            if tag in stops:
+                return nodes, i, (tag, rest)
+            if tag == 'if':
+                branches, else_body = [], []
+                cond = rest
+                while True:
+                    body, i, (stop, arg) = self._block(tokens, i, ('elif', 'else', 'endif'))
+                    if cond is None:
+                        else_body = body
+                    else:
+                        branches.append((cond, body))
+                    if stop == 'endif' or not stop:
+                        break
+                    cond = arg if stop == 'elif' else None
+                nodes.append(('if', branches, else_body))
+            elif tag == 'for':
+                target, _, iterable = rest.partition(' in ')
+                body, i, (stop, _) = self._block(tokens, i, ('else', 'endfor'))
+                if stop == 'else':
+                    _, i, _ = self._block(tokens, i, ('endfor',))
+                nodes.append(('for', target.strip(), iterable.strip(), body))
+            elif tag == 'set':
+                if '=' in rest:
+                    name, _, expr = rest.partition('=')
+                    nodes.append(('set', name.strip(), expr.strip()))
+                else:
+                    body, i, _ = self._block(tokens, i, ('endset',))
+                    nodes.append(('setblock', rest, body))
+            elif tag == 'snapshot':
+                body, i, _ = self._block(tokens, i, ('endsnapshot',))
+                self.model = rest or self.model
+                nodes.extend(body)
+            elif tag == 'filter':
+                body, i, _ = self._block(tokens, i, ('endfilter',))
+                nodes.extend(body)
+            elif tag in _SKIP_BLOCKS:
+                _, i, _ = self._block(tokens, i, (_SKIP_BLOCKS[tag],))
+            # do / call statement / anything else renders to nothing
+        return nodes, i, ('', '')
+
+    def render(self, nodes, env: dict, out: List[str]):
+        for node in nodes:
+            kind = node[0]
+            if kind == 'text':
+                out.append(node[1])
+            elif kind == 'expr':
+                out.append(self._to_sql(self.eval(node[1], env), ''.join(out[-3:])))
+            elif kind == 'if':
+                for cond, body in node[1]:
+                    value = self.eval(cond, env)
+                    # an undecidable condition takes its own branch (the first such one)
+                    if isinstance(value, _Unknown) or value:
+                        self.render(body, env, out)
+                        break
+                else:
+                    self.render(node[2], env, out)
+            elif kind == 'for':
+                items = self.eval(node[2], env)
+                names = [n.strip() for n in node[1].split(',')]
+                if isinstance(items, dict):
+                    items = list(items.items())
+                if not isinstance(items, (list, tuple)):
+                    items = [_Unknown(node[1])]
+                for k, item in enumerate(items):
+                    scope = dict(env)
+                    if len(names) > 1 and isinstance(item, (list, tuple)):
+                        scope.update(zip(names, item))
+                    else:
+                        scope[names[0]] = item
+                    scope['loop'] = {'index': k + 1, 'index0': k, 'first': k == 0, 'last': k == len(items) - 1,
+                                     'length': len(items), 'revindex': len(items) - k}
+                    self.render(node[3], scope, out)
+            elif kind == 'set':
+                env[node[1]] = self.eval(node[2], env)
+            elif kind == 'setblock':
+                buf = []
+                self.render(node[2], env, buf)
+                env[node[1]] = ''.join(buf)
+
+    def _to_sql(self, value, before: str) -> str:
+        if isinstance(value, _Unknown):
+            if _FROM_END.search(before):
+                return re.sub(r'\W+', '_', value.text).strip('_') or 'unknown_relation'
+            if value.columns:
+                # an unknown macro over named columns (surrogate keys, unit conversions, ...)
+                return f"COALESCE({', '.join(value.columns)})"
+            return 'NULL' if value.call else re.sub(r'\W+', '_', value.text).strip('_') or 'NULL'
+        if value is None:
+            return 'NULL'
+        if isinstance(value, bool):
+            return 'TRUE' if value else 'FALSE'
+        if isinstance(value, (list, tuple)):
+            return ', '.join(self._to_sql(v, before) for v in value)
+        return str(value)
+
+    # ------------------------------------------------------------------ expressions
+    def eval(self, text: str, env: dict):
+        try:
+            node = ast.parse(text.replace(' ~ ', ' + ').strip(), mode='eval').body
+        except SyntaxError:
+            return _Unknown(text)
+        try:
+            return self._ev(node, env)
+        except Exception:
+            return _Unknown(text)
+
+    def _ev(self, node, env):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return [self._ev(e, env) for e in node.elts]
+        if isinstance(node, ast.Dict):
+            return {self._ev(k, env): self._ev(v, env) for k, v in zip(node.keys, node.values)}
+        if isinstance(node, ast.Name):
+            if node.id in env:
+                return env[node.id]
+            if node.id in _CONSTANTS:
+                return _CONSTANTS[node.id]
+            if node.id == 'this':
+                return _Relation(self.model)
+            return _Unknown(node.id)
+        if isinstance(node, ast.Attribute):
+            base = self._ev(node.value, env)
+            if isinstance(base, dict) and node.attr in base:
+                return base[node.attr]
+            return _Unknown(_dotted(node))
+        if isinstance(node, ast.Call):
+            return self._call(node, env)
+        if isinstance(node, ast.BinOp):
+            left = self._ev(node.left, env)
+            if isinstance(node.op, ast.BitOr):
+                return self._filter(left, node.right, env)
+            right = self._ev(node.right, env)
+            if isinstance(left, _Unknown) or isinstance(right, _Unknown):
+                return _Unknown(ast.unparse(node))
+            if isinstance(node.op, ast.Add):
+                return f"{left}{right}" if isinstance(left, str) or isinstance(right, str) else left + right
+            return _Unknown(ast.unparse(node))
+        if isinstance(node, ast.Compare):
+            left = self._ev(node.left, env)
+            for op, comp in zip(node.ops, node.comparators):
+                right = self._ev(comp, env)
+                if isinstance(left, _Unknown) or isinstance(right, _Unknown):
+                    return _Unknown(ast.unparse(node))
+                if not _COMPARE[type(op)](left, right):
+                    return False
+                left = right
+            return True
+        if isinstance(node, ast.BoolOp):
+            values = [self._ev(v, env) for v in node.values]
+            known = [v for v in values if not isinstance(v, _Unknown)]
+            if isinstance(node.op, ast.And):
+                return False if any(not v for v in known) else (values[-1] if len(known) == len(values) else _Unknown('and'))
+            return next((v for v in known if v), _Unknown('or') if len(known) < len(values) else values[-1])
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            value = self._ev(node.operand, env)
+            return value if isinstance(value, _Unknown) else not value
+        if isinstance(node, ast.Subscript):
+            base, key = self._ev(node.value, env), self._ev(node.slice, env)
+            if isinstance(base, _Unknown) or isinstance(key, _Unknown):
+                return _Unknown(ast.unparse(node))
+            return base[key]
+        if isinstance(node, ast.IfExp):
+            test = self._ev(node.test, env)
+            if isinstance(test, _Unknown):
+                return test
+            return self._ev(node.body if test else node.orelse, env)
+        return _Unknown(ast.unparse(node))
+
+    def _call(self, node, env):
+        name = _dotted(node.func)
+        args = [self._ev(a, env) for a in node.args]
+        kwargs = {k.arg: self._ev(k.value, env) for k in node.keywords if k.arg}
+        strs = [a for a in args if isinstance(a, str)]
+        if name == 'ref' and strs:
+            return _Relation(strs[-1])
+        if name == 'source' and len(strs) >= 2:
+            return _Relation(f"{strs[0]}.{strs[1]}")
+        if name == 'config':
+            self.config.update(kwargs)
+            return ''
+        if name in ('var', 'env_var'):
+            return args[1] if len(args) > 1 else kwargs.get('default', _Unknown(str(args[0]) if args else name))
+        if name == 'is_incremental':
+            return False
+        if name == 'star' or name.endswith('.star'):
+            return '*'
+        if isinstance(node.func, ast.Attribute) and not isinstance(node.func.value, ast.Name):
+            base = self._ev(node.func.value, env)
+            if isinstance(base, str) and hasattr(str, node.func.attr):
+                return getattr(base, node.func.attr)(*args)
+        cols = [a for a in args for a in (a if isinstance(a, list) else [a])]
+        cols = tuple(c for c in cols if isinstance(c, str) and not isinstance(c, _Relation) and _IDENT.match(c))
+        return _Unknown(name, call=True, columns=cols)
+
+    def _filter(self, value, node, env):
+        if isinstance(node, ast.Name) and node.id in _FILTERS and not isinstance(value, _Unknown):
+            return _FILTERS[node.id](value)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            args = [self._ev(a, env) for a in node.args]
+            if node.func.id == 'default':
+                return args[0] if isinstance(value, _Unknown) and args else value
+            if node.func.id == 'join' and isinstance(value, (list, tuple)):
+                return (args[0] if args else '').join(self._to_sql(v, '') for v in value)
+            if node.func.id == 'replace' and isinstance(value, str) and len(args) == 2:
+                return value.replace(*args)
+        return value
+
+def render_template(text: str, model: str) -> Tuple[str, dict]:
+    """Render dbt/Jinja SQL offline; returns (sql, config() keyword arguments)."""
+    r = _Renderer(model)
+    nodes = r.parse(text)
+    out = []
+    r.render(nodes, {}, out)
+    r.config.setdefault('_name', r.model)
+    return ''.join(out), r.config
+
+# ---------------------------------------------------------------------------- models
+def wrap_model(sql: str, name: str) -> str:
+    """CREATE VIEW <name> AS <select> for a model body; SQL that already has targets is kept."""
+    stmts = split_statements(sql)
+    if not stmts or any(is_lineage_statement(s) for s in stmts):
+        return sql
+    body = next((s for s in reversed(stmts) if _SQL_START.match(s)), None)
+    if body is None:
+        return sql
+    return f"CREATE VIEW {name} AS {body}"
+
+def clear_render_cache():
+    _render_cache.clear()
+    find_project.cache_clear()
+
+def render_state(path: str) -> int:
+    """Manifest state of the dbt project containing `path` (0 outside one); part of its cache fingerprint."""
+    if not path.endswith('.sql'):
+        return 0
+    project = find_project(os.path.dirname(os.path.abspath(path)))
+    return project.state if project is not None else 0
+
+def render_sql(path: str, text: str, metrics=None) -> Optional[str]:
+    """
+    Plain SQL for a templated or dbt .sql file (see module docstring), or None when the file
+    is not part of any model (macros, tests, build output). Memoized by content hash.
+    """
+    project = find_project(os.path.dirname(os.path.abspath(path)))
+    key = hashlib.sha1(f"{os.path.abspath(path)}\0{project.state if project else 0}\0{text}".encode('utf-8')).digest()
+    hit = _render_cache.get(key)
+    if hit is not None:
+        _render_cache.move_to_end(key)
+        sql, how = hit
+    else:
+        sql, how = _render(os.path.abspath(path), text, project)
+        _render_cache[key] = (sql, how)
+        if len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    if metrics is not None:
+        metrics.add(f"dbt_{how}")
+    return sql
+
+def _render(path: str, text: str, project: Optional[DbtProject]):
+    model = os.path.splitext(os.path.basename(path))[0]
+    kind = project.kind(path) if project is not None else 'other'
+    if kind == 'skip':
+        return None, 'skipped'
+    if kind == 'model':
+        compiled = project.compiled_sql(path)
+        if compiled is not None:
+            name, sql = compiled
+            return wrap_model(sql, name or model), 'compiled'
+    sql, config = render_template(text, model) if is_templated(text) else (text, {'_name': model})
+    if kind == 'model':
+        alias = config.get('alias')
+        return wrap_model(sql, alias if isinstance(alias, str) and alias else config['_name']), 'rendered'
+    return sql, 'rendered'
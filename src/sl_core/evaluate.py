@@ -0,0 +1,212 @@
+"""
+Precision / recall / F1 of a predicted SDG against ground truth (gen_synthetic's ground_truth.json).
+
+Node names of predictions and truth are interned into one integer id space and every edge
+becomes an int64 key src_id * n_nodes + tgt_id, so matching is np.isin over sorted keys.
+The full threshold curve is one sort by probability plus a cumulative sum of hits: the point
+for threshold t counts the predictions with prob >= t. Per-view (target table) and per-artifact
+breakdowns are bincounts over the same arrays.
+"""
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+def load_truth(path: str):
+    """Ground-truth (src, tgt) pairs."""
+    with open(path, encoding='utf-8') as f:
+        return [tuple(x) for x in json.load(f)]
+
+def iter_predictions(source) -> Iterable[Tuple[str, str, float, list]]:
+    """(src, tgt, prob, artifacts) from an SDG path in any format or from a store."""
+    if isinstance(source, str):
+        from src.sl_core.sdg_io import iter_sdg
+        for kind, e in iter_sdg(source):
+            if kind == 'edge':
+                yield e['src'], e['tgt'], float(e.get('prob', 0.0)), [ev.get('artifact') for ev in e.get('evidence') or []]
+    else:
+        for u, v, p, ev in source.iter_edges():
+            yield u, v, float(p), [e.get('artifact') for e in ev]
+
+def _unique(a: np.ndarray) -> np.ndarray:
+    """Sorted unique values of an int array (sort + mask; cheaper than np.unique's hashing here)."""
+    a = np.sort(a)
+    return a[np.r_[True, a[1:] != a[:-1]]] if len(a) else a
+
+def _table(name: str) -> str:
+    return name.rsplit('.', 1)[0] if '.' in name else ''
+
+class LineageEval:
+    """
+    Predictions and truth loaded once as interned arrays; curve(), at(), by_view() and
+    by_artifact() are then pure numpy. Duplicate predictions keep their highest probability.
+    """
+    def __init__(self, predictions, truth, casefold: bool = False):
+        import pandas as pd
+        src, tgt, prob, art_edge, art_name = [], [], [], [], []
+        add_src, add_tgt, add_prob, add_edge, add_name = src.append, tgt.append, prob.append, art_edge.append, art_name.append
+        for i, (u, v, p, arts) in enumerate(predictions):
+            add_src(u)
+            add_tgt(v)
+            add_prob(p)
+            for a in arts:
+                add_edge(i)
+                add_name(a)
+        t_src = [u for u, _ in truth]
+        t_tgt = [v for _, v in truth]
+        n_pred, n_t = len(src), len(t_src)
+        names = np.array(src + tgt + t_src + t_tgt, dtype=object)
+        if casefold:
+            names = np.array([s.casefold() for s in names], dtype=object)
+        codes, self.nodes = pd.factorize(names)
+        codes = codes.astype(np.int64)
+        n = max(1, len(self.nodes))
+        p_src, p_tgt = codes[:n_pred], codes[n_pred:2 * n_pred]
+        t_src, t_tgt = codes[2 * n_pred:2 * n_pred + n_t], codes[2 * n_pred + n_t:]
+
+        # views: the table part of each node name
+        view_codes, self.views = pd.factorize(np.array([_table(s) for s in self.nodes], dtype=object))
+        self._node_view = view_codes.astype(np.int64)
+
+        keys = p_src * n + p_tgt
+        prob = np.asarray(prob, dtype=np.float64)
+        # dedupe predictions (max prob per key), remembering where each raw prediction went
+        order = np.lexsort((-prob, keys))
+        keys_sorted = keys[order]
+        first = np.ones(len(keys_sorted), dtype=bool)
+        first[1:] = keys_sorted[1:] != keys_sorted[:-1]
+        self.keys = keys_sorted[first]
+        self.prob = prob[order][first]
+        slot = np.cumsum(first) - 1
+        raw_to_pred = np.empty(n_pred, dtype=np.int64)
+        raw_to_pred[order] = slot
+
+        self.truth_keys = _unique(t_src * n + t_tgt)
+        self.hit = np.isin(self.keys, self.truth_keys, assume_unique=True)
+        self.n_truth = len(self.truth_keys)
+        self._n = n
+        self.pred_view = self._node_view[self.keys % n] if len(self.keys) else np.empty(0, np.int64)
+        self.truth_view = self._node_view[self.truth_keys % n] if self.n_truth else np.empty(0, np.int64)
+
+        art_codes, self.artifacts = pd.factorize(np.array(art_name, dtype=object))
+        self.art_pred = raw_to_pred[np.asarray(art_edge, dtype=np.int64)] if art_edge else np.empty(0, np.int64)
+        self.art_id = art_codes.astype(np.int64)
+        if len(self.art_pred):
+            # one row per (prediction, artifact), even if the artifact repeated the edge
+            pair = _unique(self.art_pred * max(1, len(self.artifacts)) + self.art_id)
+            self.art_pred = pair // max(1, len(self.artifacts))
+            self.art_id = pair % max(1, len(self.artifacts))
+
+    @classmethod
+    def from_files(cls, sdg_path: str, truth_path: str, **kw) -> 'LineageEval':
+        return cls(iter_predictions(sdg_path), load_truth(truth_path), **kw)
+
+    # ------------------------------------------------------------------ curves
+    def curve(self) -> Dict[str, np.ndarray]:
+        """
+        One point per distinct predicted probability, from the highest threshold down.
+        Returns arrays threshold, n_pred, tp, fp, fn, precision, recall, f1.
+        """
+        order = np.argsort(-self.prob, kind='stable')
+        p = self.prob[order]
+        tp = np.cumsum(self.hit[order], dtype=np.int64)
+        # the last position of each run of equal probabilities closes that threshold
+        last = np.flatnonzero(np.r_[p[1:] != p[:-1], True]) if len(p) else np.empty(0, np.int64)
+        tp = tp[last]
+        k = last + 1
+        fp = k - tp
+        fn = self.n_truth - tp
+        precision = tp / np.maximum(k, 1)
+        recall = tp / max(self.n_truth, 1)
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(denom), where=denom > 0)
+        return {'threshold': p[last], 'n_pred': k, 'tp': tp, 'fp': fp, 'fn': fn,
+                'precision': precision, 'recall': recall, 'f1': f1}
+
+    def best(self, curve: Optional[dict] = None) -> dict:
+        """The curve point with the highest F1 (the highest threshold among ties)."""
+        c = curve or self.curve()
+        if not len(c['f1']):
+            return self.at(0.0)
+        i = int(np.argmax(c['f1']))
+        return {k: (float(v[i]) if v.dtype.kind == 'f' else int(v[i])) for k, v in c.items()}
+
+    def at(self, threshold: float = 0.0) -> dict:
+        sel = self.prob >= threshold
+        tp = int(np.count_nonzero(self.hit & sel))
+        n_pred = int(np.count_nonzero(sel))
+        return _point(threshold, n_pred, tp, self.n_truth)
+
+    # ------------------------------------------------------------------ breakdowns
+    def by_view(self, threshold: float = 0.0) -> Dict[str, dict]:
+        """Metrics per target view/table: predictions and truth edges grouped by the table of tgt."""
+        sel = self.prob >= threshold
+        nv = len(self.views)
+        n_pred = np.bincount(self.pred_view[sel], minlength=nv)
+        tp = np.bincount(self.pred_view[sel & self.hit], minlength=nv)
+        n_truth = np.bincount(self.truth_view, minlength=nv)
+        out = {}
+        for v in np.flatnonzero(n_pred + n_truth):
+            out[self.views[v]] = _point(threshold, int(n_pred[v]), int(tp[v]), int(n_truth[v]))
+        return out
+
+    def by_artifact(self, threshold: float = 0.0) -> Dict[str, dict]:
+        """
+        Precision per artifact over the edges it gave evidence for. Recall is not defined per
+        artifact (truth does not say where an edge should come from), so only tp/fp are reported.
+        """
+        sel = (self.prob >= threshold)[self.art_pred]
+        na = len(self.artifacts)
+        n_pred = np.bincount(self.art_id[sel], minlength=na)
+        tp = np.bincount(self.art_id[sel & self.hit[self.art_pred]], minlength=na)
+        out = {}
+        for a in np.flatnonzero(n_pred):
+            out[self.artifacts[a]] = {'n_pred': int(n_pred[a]), 'tp': int(tp[a]), 'fp': int(n_pred[a] - tp[a]),
+                                      'precision': float(tp[a]) / float(n_pred[a])}
+        return out
+
+    def report(self, threshold: float = 0.0, breakdowns: bool = True) -> dict:
+        c = self.curve()
+        out = {'n_pred': int(len(self.keys)), 'n_truth': int(self.n_truth), 'at_threshold': self.at(threshold),
+               'best_f1': self.best(c), 'curve': {k: v.tolist() for k, v in c.items()}}
+        if breakdowns:
+            out['by_view'] = self.by_view(threshold)
+            out['by_artifact'] = self.by_artifact(threshold)
+        return out
+
+def _point(threshold, n_pred, tp, n_truth) -> dict:
+    precision = tp / n_pred if n_pred else 0.0
+    recall = tp / n_truth if n_truth else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'threshold': float(threshold), 'n_pred': n_pred, 'tp': tp, 'fp': n_pred - tp, 'fn': n_truth - tp,
+            'precision': precision, 'recall': recall, 'f1': f1}
+
+def evaluate(sdg, truth, threshold: float = 0.0, breakdowns: bool = True, casefold: bool = False) -> dict:
+    """
+    Evaluate predictions (an SDG path or a store) against truth (a ground_truth.json path or pairs).
+    Returns counts, the point at `threshold`, the best-F1 point, the full curve and breakdowns.
+    """
+    preds = iter_predictions(sdg)
+    pairs = load_truth(truth) if isinstance(truth, str) else list(truth)
+    return LineageEval(preds, pairs, casefold=casefold).report(threshold, breakdowns)
+
+if __name__ == '__main__':
+    import argparse
+    ap = argparse.ArgumentParser(description="Precision/recall/F1 of an SDG against ground truth")
+    ap.add_argument('sdg', help="sdg.json, .ndjson[.gz] or Parquet snapshot")
+    ap.add_argument('truth', help="ground_truth.json")
+    ap.add_argument('--threshold', type=float, default=0.0)
+    ap.add_argument('--casefold', action='store_true')
+    ap.add_argument('--out', help="write the full report as JSON")
+    args = ap.parse_args()
+    rep = evaluate(args.sdg, args.truth, args.threshold, breakdowns=bool(args.out), casefold=args.casefold)
+    at, best = rep['at_threshold'], rep['best_f1']
+    print(f"edges={rep['n_pred']} truth={rep['n_truth']}")
+    print(f"threshold={at['threshold']:.3f}  Precision={at['precision']:.3f}, Recall={at['recall']:.3f}, F1={at['f1']:.3f}")
+    print(f"best F1={best['f1']:.3f} at threshold={best['threshold']:.3f} "
+          f"(Precision={best['precision']:.3f}, Recall={best['recall']:.3f})")
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(rep, f, indent=2)
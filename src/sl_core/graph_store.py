@@ -1,24 +1,115 @@
 
-import networkx as nx
 import json
+import logging
 import sqlite3
 import os
+from src.sl_core.metrics import NULL_METRICS
+
+SQLITE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS nodes (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS edges (src_id INTEGER NOT NULL, tgt_id INTEGER NOT NULL, prob REAL NOT NULL,
+                                  PRIMARY KEY (src_id, tgt_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS edges_tgt ON edges (tgt_id, src_id);
+CREATE TABLE IF NOT EXISTS evidence (src_id INTEGER NOT NULL, tgt_id INTEGER NOT NULL,
+                                     artifact TEXT NOT NULL, score REAL NOT NULL, ts TEXT);
+CREATE INDEX IF NOT EXISTS evidence_edge ON evidence (src_id, tgt_id);
+CREATE INDEX IF NOT EXISTS evidence_artifact ON evidence (artifact);
+'''
+
+log = logging.getLogger(__name__)
+
+NODE_ID = '(SELECT id FROM nodes WHERE name = ?)'
 
 class SDGStore:
-    def __init__(self, sqlite_path: str = None):
+    def __init__(self, sqlite_path: str = None, batch_size: int = 5000):
+        import networkx as nx
         self.G = nx.DiGraph()
+        self.version = 0
         self.sqlite_path = sqlite_path
+        self.batch_size = batch_size
+        self._pending = []
+        # artifacts whose evidence in the database already belongs to this store's graph
+        self._written = set()
+        self.metrics = NULL_METRICS
         if sqlite_path:
             self._init_sqlite(sqlite_path)
 
     def _init_sqlite(self, path: str):
         self.conn = sqlite3.connect(path)
-        cur = self.conn.cursor()
-        cur.execute('''CREATE TABLE IF NOT EXISTS edges
-                        (src TEXT, tgt TEXT, prob REAL, evidence TEXT, ts TEXT)''')
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        cols = [r[1] for r in self.conn.execute('PRAGMA table_info(edges)')]
+        if cols and 'src_id' not in cols:
+            self._migrate_legacy()
+        self.conn.executescript(SQLITE_SCHEMA)
         self.conn.commit()
 
+    def _migrate_legacy(self):
+        """
+        Convert a database written before the normalized schema, which kept one
+        (src, tgt, prob, evidence JSON, ts) row per added edge, in a single transaction.
+        """
+        self.conn.execute('BEGIN')
+        try:
+            self.conn.execute('ALTER TABLE edges RENAME TO edges_legacy')
+            for stmt in SQLITE_SCHEMA.split(';'):
+                if stmt.strip():
+                    self.conn.execute(stmt)
+            rows = []
+            for src, tgt, prob, evidence, ts in self.conn.execute(
+                    'SELECT src, tgt, prob, evidence, ts FROM edges_legacy ORDER BY rowid'):
+                try:
+                    entries = json.loads(evidence) if evidence else []
+                except ValueError:
+                    entries = []
+                for e in entries or [{'artifact': '', 'score': prob, 'ts': ts}]:
+                    rows.append((src, tgt, float(e.get('score', prob)), e.get('artifact') or '', e.get('ts', ts)))
+            probs = {}
+            for src, tgt, score, _, _ in rows:
+                p = probs.get((src, tgt))
+                probs[(src, tgt)] = score if p is None else 1.0 - (1.0 - p)*(1.0 - score)
+            self.conn.executemany('INSERT OR IGNORE INTO nodes (name) VALUES (?)',
+                                  ((n,) for r in rows for n in (r[0], r[1])))
+            self.conn.executemany(f'INSERT INTO edges (src_id, tgt_id, prob) VALUES ({NODE_ID}, {NODE_ID}, ?)',
+                                  ((src, tgt, p) for (src, tgt), p in probs.items()))
+            self.conn.executemany(f'INSERT INTO evidence (src_id, tgt_id, score, artifact, ts) VALUES ({NODE_ID}, {NODE_ID}, ?, ?, ?)', rows)
+            self.conn.execute('DROP TABLE edges_legacy')
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        log.info("Migrated %d legacy edge rows in %s", len(rows), self.sqlite_path)
+
+    def flush(self):
+        """
+        Write buffered edges to SQLite in a single transaction.
+        Evidence an artifact left in the database from an earlier build is retracted the first time
+        this store writes that artifact, so rebuilding into an existing database replaces it rather
+        than compounding edge probabilities.
+        """
+        if not self._pending or not getattr(self, 'conn', None):
+            return
+        rows, self._pending = self._pending, []
+        new = {r[3] for r in rows} - self._written
+        self._written |= new
+        with self.conn:
+            self._retract_sqlite(new)
+            self.conn.executemany('INSERT OR IGNORE INTO nodes (name) VALUES (?)',
+                                  ((n,) for r in rows for n in (r[0], r[1])))
+            self.conn.executemany(f'''INSERT INTO edges (src_id, tgt_id, prob) VALUES ({NODE_ID}, {NODE_ID}, ?)
+                                     ON CONFLICT (src_id, tgt_id) DO UPDATE
+                                     SET prob = 1.0 - (1.0 - prob)*(1.0 - excluded.prob)''',
+                                  ((src, tgt, score) for src, tgt, score, _, _ in rows))
+            self.conn.executemany(f'INSERT INTO evidence (src_id, tgt_id, score, artifact, ts) VALUES ({NODE_ID}, {NODE_ID}, ?, ?, ?)', rows)
+
+    def close(self):
+        if getattr(self, 'conn', None):
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
     def add_edge(self, src: str, tgt: str, score: float, artifact_id: str, timestamp: str):
+        self.version += 1
         self.G.add_node(src)
         self.G.add_node(tgt)
         if self.G.has_edge(src, tgt):
@@ -31,9 +122,113 @@ class SDGStore:
         else:
             self.G.add_edge(src, tgt, evidence=[{'artifact': artifact_id, 'score': score, 'ts': timestamp}], prob=score)
         if getattr(self, 'conn', None):
-            cur = self.conn.cursor()
-            cur.execute('INSERT INTO edges VALUES (?,?,?, ?,?)', (src, tgt, float(score), json.dumps([{'artifact': artifact_id, 'score': score, 'ts': timestamp}]), timestamp))
-            self.conn.commit()
+            self._pending.append((src, tgt, float(score), artifact_id, timestamp))
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def remove_artifacts(self, artifact_ids):
+        """Retract all evidence contributed by the given artifacts and recombine edge probabilities."""
+        artifact_ids = set(artifact_ids)
+        if not artifact_ids:
+            return
+        self.version += 1
+        touched = set()
+        for u, v, data in list(self.G.edges(data=True)):
+            evidence = data.get('evidence', [])
+            kept = [e for e in evidence if e.get('artifact') not in artifact_ids]
+            if len(kept) == len(evidence):
+                continue
+            if kept:
+                prob = kept[0]['score']
+                for e in kept[1:]:
+                    prob = 1.0 - (1.0 - prob)*(1.0 - e['score'])
+                data['prob'] = prob
+                data['evidence'] = kept
+            else:
+                self.G.remove_edge(u, v)
+                touched.update((u, v))
+        self.G.remove_nodes_from([n for n in touched if self.G.degree(n) == 0])
+        if getattr(self, 'conn', None):
+            self._remove_artifacts_sqlite(artifact_ids)
+
+    def _remove_artifacts_sqlite(self, artifact_ids):
+        self.flush()
+        with self.conn:
+            self._retract_sqlite(artifact_ids)
+
+    def _retract_sqlite(self, artifact_ids):
+        """Delete the artifacts' evidence rows and recompute the affected edges from what remains."""
+        affected = set()
+        for a in artifact_ids:
+            affected.update(self.conn.execute('SELECT src_id, tgt_id FROM evidence WHERE artifact = ?', (a,)))
+        if not affected:
+            return
+        self.conn.executemany('DELETE FROM evidence WHERE artifact = ?', [(a,) for a in artifact_ids])
+        for s_id, t_id in affected:
+            scores = [r[0] for r in self.conn.execute(
+                'SELECT score FROM evidence WHERE src_id = ? AND tgt_id = ? ORDER BY rowid', (s_id, t_id))]
+            if scores:
+                prob = scores[0]
+                for sc in scores[1:]:
+                    prob = 1.0 - (1.0 - prob)*(1.0 - sc)
+                self.conn.execute('UPDATE edges SET prob = ? WHERE src_id = ? AND tgt_id = ?', (prob, s_id, t_id))
+            else:
+                self.conn.execute('DELETE FROM edges WHERE src_id = ? AND tgt_id = ?', (s_id, t_id))
+        self.conn.executemany('''DELETE FROM nodes WHERE id = ?
+                                 AND NOT EXISTS (SELECT 1 FROM edges WHERE src_id = nodes.id)
+                                 AND NOT EXISTS (SELECT 1 FROM edges WHERE tgt_id = nodes.id)''',
+                              [(n,) for n in {x for pair in affected for x in pair}])
+
+    def artifact_ids(self) -> set:
+        """Artifacts with evidence in the in-memory graph."""
+        return {e['artifact'] for _, _, ev in self.G.edges(data='evidence', default=()) for e in ev}
+
+    def persisted_artifacts(self) -> set:
+        """Artifacts with evidence in this store's database (empty without one)."""
+        if not getattr(self, 'conn', None):
+            return set()
+        self.flush()
+        return {r[0] for r in self.conn.execute('SELECT DISTINCT artifact FROM evidence')}
+
+    def load_sqlite(self, path: str = None):
+        """Rebuild the in-memory graph from an SDG SQLite database (defaults to this store's own)."""
+        if path is None:
+            if not getattr(self, 'conn', None):
+                raise ValueError("load_sqlite() needs a path when the store has no open SQLite database")
+            self.flush()
+            conn = self.conn
+        else:
+            if not os.path.exists(path):
+                return
+            conn = sqlite3.connect(path)
+        self.version += 1
+        names = dict(conn.execute('SELECT id, name FROM nodes'))
+        self.G.add_nodes_from(names.values())
+        for s_id, t_id, prob in conn.execute('SELECT src_id, tgt_id, prob FROM edges'):
+            self.G.add_edge(names[s_id], names[t_id], prob=prob, evidence=[])
+        for s_id, t_id, artifact, score, ts in conn.execute(
+                'SELECT src_id, tgt_id, artifact, score, ts FROM evidence ORDER BY rowid'):
+            self.G[names[s_id]][names[t_id]]['evidence'].append({'artifact': artifact, 'score': score, 'ts': ts})
+            if path is None:
+                self._written.add(artifact)
+        if conn is not getattr(self, 'conn', None):
+            conn.close()
+
+    def query_sqlite(self, node: str, direction: str = 'downstream', min_prob: float = 0.0):
+        """
+        Answer a one-hop lineage query straight from SQLite without loading the graph.
+        Returns a list of (neighbor, prob) sorted by descending probability.
+        """
+        self.flush()
+        if direction == 'downstream':
+            sql = f'''SELECT n.name, e.prob FROM edges e JOIN nodes n ON n.id = e.tgt_id
+                      WHERE e.src_id = {NODE_ID} AND e.prob >= ? ORDER BY e.prob DESC'''
+        elif direction == 'upstream':
+            sql = f'''SELECT n.name, e.prob FROM edges e JOIN nodes n ON n.id = e.src_id
+                      WHERE e.tgt_id = {NODE_ID} AND e.prob >= ? ORDER BY e.prob DESC'''
+        else:
+            raise ValueError(f"direction must be 'upstream' or 'downstream', got {direction!r}")
+        return list(self.conn.execute(sql, (node, min_prob)))
 
     def persist_json(self, path: str):
         out = {'nodes': list(self.G.nodes()), 'edges': []}
@@ -48,7 +243,23 @@ class SDGStore:
         with open(path, 'r', encoding='utf-8') as f:
             j = json.load(f)
         for n in j.get('nodes', []):
-            self.G.add_node(n)
+            self.put_node(n)
         for e in j.get('edges', []):
-            src = e['src']; tgt = e['tgt']; prob = e.get('prob', 0.0); evidence = e.get('evidence', [])
-            self.G.add_edge(src, tgt, prob=prob, evidence=evidence)
+            self.put_edge(e['src'], e['tgt'], e.get('prob', 0.0), e.get('evidence', []))
+
+    def nodes(self):
+        return iter(self.G.nodes())
+
+    def iter_edges(self):
+        """Yield (src, tgt, prob, evidence) for every edge."""
+        for u, v, data in self.G.edges(data=True):
+            yield u, v, float(data.get('prob', 0.0)), data.get('evidence', [])
+
+    def put_node(self, name: str):
+        self.version += 1
+        self.G.add_node(name)
+
+    def put_edge(self, src: str, tgt: str, prob: float, evidence: list):
+        """Insert an edge with an already combined probability, as loaded from a persisted SDG."""
+        self.version += 1
+        self.G.add_edge(src, tgt, prob=prob, evidence=evidence)
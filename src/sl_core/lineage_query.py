@@ -0,0 +1,349 @@
+import heapq
+import logging
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set
+from src.sl_core.compact_store import CompactSDGStore
+
+log = logging.getLogger(__name__)
+
+def _tarjan_scc(n: int, succ: List[Dict[int, float]]):
+    """
+    Iterative Tarjan. Components are numbered in completion order, which is a reverse
+    topological order of the condensed DAG: an edge c1 -> c2 between components has c2 < c1.
+    """
+    index = [-1] * n
+    low = [0] * n
+    onstack = [False] * n
+    comp = [-1] * n
+    stack = []
+    counter = 0
+    ncomp = 0
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        onstack[root] = True
+        work = [(root, iter(succ[root]))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onstack[w] = True
+                    work.append((w, iter(succ[w])))
+                    break
+                elif onstack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                if low[v] == index[v]:
+                    while True:
+                        w = stack.pop()
+                        onstack[w] = False
+                        comp[w] = ncomp
+                        if w == v:
+                            break
+                    ncomp += 1
+    return comp, ncomp
+
+# runs of up to 8 nonzero bytes in a bitset, so the bit loop below only ever works on small ints
+_NONZERO_RUN = re.compile(rb'[^\x00]{1,8}')
+
+def _bits_to_ids(bits: int) -> List[int]:
+    """Positions of the set bits, lowest first, peeled off with bits & -bits."""
+    out = []
+    if bin(bits).count('1') <= 16:
+        # few bits: each step costs one pass over the int, cheaper than scanning it bytewise
+        while bits:
+            low = bits & -bits
+            out.append(low.bit_length() - 1)
+            bits ^= low
+        return out
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for m in _NONZERO_RUN.finditer(data):
+        word = int.from_bytes(m.group(), 'little')
+        base = m.start() * 8
+        while word:
+            low = word & -word
+            out.append(base + low.bit_length() - 1)
+            word ^= low
+    return out
+
+class LineageIndex:
+    """
+    Reachability index and lineage queries over an SDGStore (or CompactSDGStore).
+
+    The graph is condensed into its strongly connected components. Each component c gets an
+    interval label [low[c], c] that contains every component reachable from it, so most negative
+    reachability checks are O(1). Descendant/ancestor sets are bitsets over component ids,
+    computed on first use and kept in an LRU bounded by their total size in bytes (cache_bytes,
+    shared by the descendant and ancestor caches). The index tracks `store.version`:
+    edges added through LineageIndex.add_edge are applied in place when they do not change
+    reachability, any other mutation of the store triggers a rebuild on the next query.
+    """
+    def __init__(self, store, cache_bytes: int = 64 << 20):
+        self.store = store
+        self.cache_bytes = cache_bytes
+        self._version = None
+        self._build()
+
+    # ------------------------------------------------------------------ index build
+    def _build(self):
+        if isinstance(self.store, CompactSDGStore):
+            # already interned: read the edge buffers directly instead of materializing networkx
+            self.names = list(self.store.node_names)
+            edges = zip(self.store.src, self.store.tgt, self.store.prob)
+        else:
+            G = self.store.G
+            self.names = list(G.nodes())
+            ids = {n: i for i, n in enumerate(self.names)}
+            edges = ((ids[u], ids[v], float(d.get('prob', 0.0))) for u, v, d in G.edges(data=True))
+        self.ids = {n: i for i, n in enumerate(self.names)}
+        n = len(self.names)
+        self.succ = [dict() for _ in range(n)]
+        self.pred = [dict() for _ in range(n)]
+        for u, v, p in edges:
+            self.succ[u][v] = p
+            self.pred[v][u] = p
+        self.comp, self.ncomp = _tarjan_scc(n, self.succ)
+        self.members = [[] for _ in range(self.ncomp)]
+        for v, c in enumerate(self.comp):
+            self.members[c].append(v)
+        self.csucc = [set() for _ in range(self.ncomp)]
+        self.cpred = [set() for _ in range(self.ncomp)]
+        for v in range(n):
+            cv = self.comp[v]
+            for w in self.succ[v]:
+                cw = self.comp[w]
+                if cw != cv:
+                    self.csucc[cv].add(cw)
+                    self.cpred[cw].add(cv)
+        # children always have smaller ids, so one ascending pass fills the interval labels
+        self.low = list(range(self.ncomp))
+        for c in range(self.ncomp):
+            for d in self.csucc[c]:
+                if self.low[d] < self.low[c]:
+                    self.low[c] = self.low[d]
+        self._desc = OrderedDict()
+        self._anc = OrderedDict()
+        self._cached_bytes = 0
+        self._version = self.store.version
+
+    def _ensure(self):
+        if self._version != self.store.version:
+            log.debug("Store changed (version %s -> %s), rebuilding lineage index", self._version, self.store.version)
+            self._build()
+
+    def add_edge(self, src: str, tgt: str, score: float, artifact_id: str, timestamp: str):
+        """Add an edge to the underlying store, keeping the index valid without a rebuild when possible."""
+        self._ensure()
+        self.store.add_edge(src, tgt, score, artifact_id=artifact_id, timestamp=timestamp)
+        u, v = self.ids.get(src), self.ids.get(tgt)
+        if u is None or v is None or not self._reach_comp(self.comp[u], self.comp[v]):
+            return  # reachability changed; the version mismatch rebuilds on the next query
+        p = self.store.prob[self.store.edge_id(src, tgt)] if isinstance(self.store, CompactSDGStore) else float(self.store.G[src][tgt]['prob'])
+        self.succ[u][v] = p
+        self.pred[v][u] = p
+        if self.comp[u] != self.comp[v]:
+            self.csucc[self.comp[u]].add(self.comp[v])
+            self.cpred[self.comp[v]].add(self.comp[u])
+        self._version = self.store.version
+
+    # ------------------------------------------------------------------ reachability
+    def _reach_comp(self, cu: int, cv: int) -> bool:
+        if cu == cv:
+            return True
+        if not (self.low[cu] <= cv < cu):
+            return False
+        bits = self._desc.get(cu)
+        if bits is not None:
+            return bool(bits >> cv & 1)
+        seen = {cu}
+        stack = [cu]
+        while stack:
+            c = stack.pop()
+            for d in self.csucc[c]:
+                if d == cv:
+                    return True
+                if d not in seen and self.low[d] <= cv < d:
+                    seen.add(d)
+                    stack.append(d)
+        return False
+
+    def reachable(self, src: str, tgt: str) -> bool:
+        """True if tgt is (transitively) downstream of src."""
+        self._ensure()
+        u, v = self.ids.get(src), self.ids.get(tgt)
+        if u is None or v is None:
+            return False
+        return self._reach_comp(self.comp[u], self.comp[v])
+
+    def _closure(self, c: int, adj, cache: OrderedDict) -> int:
+        bits = cache.get(c)
+        if bits is not None:
+            cache.move_to_end(c)
+            return bits
+        flags = bytearray((self.ncomp + 7) // 8)
+        flags[c >> 3] |= 1 << (c & 7)
+        stack = [c]
+        while stack:
+            x = stack.pop()
+            for d in adj[x]:
+                if not flags[d >> 3] & (1 << (d & 7)):
+                    flags[d >> 3] |= 1 << (d & 7)
+                    stack.append(d)
+        bits = int.from_bytes(flags, 'little')
+        cache[c] = bits
+        self._cached_bytes += bits.bit_length() // 8
+        while self._cached_bytes > self.cache_bytes and (self._desc or self._anc):
+            # evict from the larger of the two caches, oldest entry first
+            victim = self._desc if len(self._desc) >= len(self._anc) else self._anc
+            _, old = victim.popitem(last=False)
+            self._cached_bytes -= old.bit_length() // 8
+        return bits
+
+    def _set_query(self, nodes: Iterable[str], forward: bool) -> Set[str]:
+        self._ensure()
+        adj, cache = (self.csucc, self._desc) if forward else (self.cpred, self._anc)
+        bits = 0
+        for node in nodes:
+            i = self.ids.get(node)
+            if i is None:
+                continue
+            c = self.comp[i]
+            if len(self.members[c]) > 1 or i in self.succ[i]:
+                bits |= 1 << c  # node sits on a cycle, so it is its own ancestor/descendant
+            for d in adj[c]:
+                bits |= self._closure(d, adj, cache)
+        return {self.names[v] for c in _bits_to_ids(bits) for v in self.members[c]}
+
+    def downstream_set(self, node: str) -> Set[str]:
+        """All columns transitively derived from node (excluding node unless it sits on a cycle)."""
+        return self._set_query([node], True)
+
+    def upstream_set(self, node: str) -> Set[str]:
+        """All columns node is transitively derived from (excluding node unless it sits on a cycle)."""
+        return self._set_query([node], False)
+
+    def downstream_many(self, nodes: Iterable[str]) -> Set[str]:
+        """Union of downstream sets for many columns, computed as one bitset OR."""
+        return self._set_query(nodes, True)
+
+    def upstream_many(self, nodes: Iterable[str]) -> Set[str]:
+        return self._set_query(nodes, False)
+
+    # ------------------------------------------------------------------ weighted queries
+    def _traverse(self, start: int, adj, max_depth: Optional[int], min_prob: float, mode: str,
+                  target: Optional[int] = None) -> Dict[int, float]:
+        if mode not in ('max', 'product'):
+            raise ValueError(f"mode must be 'max' or 'product', got {mode!r}")
+        best = {start: 1.0}
+        if mode == 'max' and max_depth is None:
+            # max-product paths: Dijkstra on -log(prob) without the logs
+            heap = [(-1.0, start)]
+            done = set()
+            while heap:
+                negp, v = heapq.heappop(heap)
+                if v in done:
+                    continue
+                done.add(v)
+                if v == target:
+                    break
+                for w, p in adj[v].items():
+                    q = -negp * p
+                    if q < min_prob or q <= best.get(w, -1.0):
+                        continue
+                    if target is not None and not self._reach_comp(self.comp[w], self.comp[target]):
+                        continue
+                    best[w] = q
+                    heapq.heappush(heap, (-q, w))
+            return best
+        # layered relaxation: exact max-product within max_depth hops ('max'),
+        # or product along the fewest-hop path, ties broken by the higher product ('product')
+        frontier = {start: 1.0}
+        depth = 0
+        while frontier and (max_depth is None or depth < max_depth):
+            depth += 1
+            nxt = {}
+            for v, pv in frontier.items():
+                for w, p in adj[v].items():
+                    q = pv * p
+                    if q < min_prob:
+                        continue
+                    if target is not None and not self._reach_comp(self.comp[w], self.comp[target]):
+                        continue
+                    if mode == 'product' and w in best:
+                        continue
+                    if q > nxt.get(w, -1.0) and (mode == 'product' or q > best.get(w, -1.0)):
+                        nxt[w] = q
+            for w, q in nxt.items():
+                best[w] = q
+            frontier = nxt
+        return best
+
+    def _weighted(self, node: str, forward: bool, max_depth, min_prob, mode) -> Dict[str, float]:
+        self._ensure()
+        adj = self.succ if forward else self.pred
+        i = self.ids.get(node)
+        if i is None:
+            return {}
+        best = self._traverse(i, adj, max_depth, min_prob, mode)
+        best.pop(i, None)
+        return {self.names[v]: p for v, p in best.items()}
+
+    def downstream(self, node: str, max_depth: Optional[int] = None, min_prob: float = 0.0,
+                   mode: str = 'max') -> Dict[str, float]:
+        """
+        Downstream columns with their path probability.
+        mode='max' uses the best (max-product) path; mode='product' the product along the fewest-hop path.
+        Paths whose probability drops below min_prob are cut off.
+        """
+        return self._weighted(node, True, max_depth, min_prob, mode)
+
+    def upstream(self, node: str, max_depth: Optional[int] = None, min_prob: float = 0.0,
+                 mode: str = 'max') -> Dict[str, float]:
+        """Upstream columns with their path probability; see downstream()."""
+        return self._weighted(node, False, max_depth, min_prob, mode)
+
+    def downstream_bulk(self, nodes: Iterable[str], **kwargs) -> Dict[str, Dict[str, float]]:
+        return {n: self.downstream(n, **kwargs) for n in nodes}
+
+    def upstream_bulk(self, nodes: Iterable[str], **kwargs) -> Dict[str, Dict[str, float]]:
+        return {n: self.upstream(n, **kwargs) for n in nodes}
+
+    def path_prob(self, src: str, tgt: str, max_depth: Optional[int] = None, mode: str = 'max') -> float:
+        """Probability of the best path src -> tgt (0.0 if tgt is not downstream of src)."""
+        self._ensure()
+        u, v = self.ids.get(src), self.ids.get(tgt)
+        if u is None or v is None or not self._reach_comp(self.comp[u], self.comp[v]):
+            return 0.0
+        if u == v:
+            return 1.0
+        return self._traverse(u, self.succ, max_depth, 0.0, mode, target=v).get(v, 0.0)
+
+    # ------------------------------------------------------------------ impact analysis
+    def impact(self, nodes: Iterable[str], min_prob: float = 0.0, max_depth: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        What breaks if `nodes` change: downstream columns grouped by table.
+        Unbounded queries are answered from the bitset index; limits fall back to weighted traversal.
+        """
+        if min_prob > 0.0 or max_depth is not None:
+            hit = set()
+            for n in nodes:
+                hit.update(self.downstream(n, max_depth=max_depth, min_prob=min_prob))
+        else:
+            hit = self.downstream_many(nodes)
+        out = {}
+        for col in sorted(hit):
+            table, _, name = col.rpartition('.')
+            out.setdefault(table, []).append(name or col)
+        return out
@@ -1,13 +1,21 @@
 
 import re, difflib
-import pandas as pd
-from typing import Optional
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TOKEN_SPLIT = re.compile(r'[\W_]+')
+
+def name_tokens(name: str) -> List[str]:
+    return [t for t in TOKEN_SPLIT.split(name.lower()) if t]
 
 def name_similarity(a: str, b: str) -> float:
     if a is None or b is None:
         return 0.0
-    a_tokens = [t for t in re.split(r'[\W_]+', a.lower()) if t]
-    b_tokens = [t for t in re.split(r'[\W_]+', b.lower()) if t]
+    a_tokens = name_tokens(a)
+    b_tokens = name_tokens(b)
     if not a_tokens or not b_tokens:
         return 0.0
     inter = len(set(a_tokens) & set(b_tokens))
@@ -16,7 +24,7 @@ def name_similarity(a: str, b: str) -> float:
         sim = difflib.SequenceMatcher(None, a, b).ratio()
     return float(sim)
 
-def value_cooccurrence(sample_left: Optional[pd.Series], sample_right: Optional[pd.Series]) -> float:
+def value_cooccurrence(sample_left: Optional['pd.Series'], sample_right: Optional['pd.Series']) -> float:
     if sample_left is None or sample_right is None:
         return 0.0
     try:
@@ -27,3 +35,170 @@ def value_cooccurrence(sample_left: Optional[pd.Series], sample_right: Optional[
     set_right = set(sample_right.dropna().unique())
     matches = sample_left.dropna().apply(lambda v: v in set_right).sum()
     return float(matches) / max(1, len(sample_left))
+
+def _append(buf, n: int, values: list):
+    """Write values into buf after its first n entries, doubling its capacity as needed."""
+    import numpy as np
+    end = n + len(values)
+    if end > len(buf):
+        grown = np.zeros(max(end, 2 * len(buf)), dtype=buf.dtype)
+        grown[:n] = buf[:n]
+        buf = grown
+    buf[n:end] = values
+    return buf
+
+class NameSimilarityEngine:
+    """
+    Cached, batched equivalent of name_similarity.
+
+    Names are interned once with their unique token ids stored in CSR arrays; the numpy copies
+    grow by doubling and only take in names interned since the last batch. score_pairs
+    computes token overlaps for a whole batch with numpy and only falls back to difflib for
+    pairs without a shared token. Scores are memoized in a bounded LRU and are numerically
+    identical to name_similarity. candidates/match use a token inverted index so only pairs
+    sharing at least one token are ever scored.
+    """
+    def __init__(self, cache_size: int = 1 << 16, vectorize_min: int = 32):
+        self.cache_size = cache_size
+        self.vectorize_min = vectorize_min
+        self._cache = OrderedDict()
+        self._name_ids = {}
+        self._names = []
+        self._token_ids = {}
+        self._tok_ptr = [0]
+        self._tok_data = []
+        # numpy mirrors of _tok_ptr / _tok_data with spare capacity, and how much of them is filled
+        self._ptr_buf = self._data_buf = None
+        self._synced = (0, 0)
+
+    def intern(self, name: str) -> int:
+        i = self._name_ids.get(name)
+        if i is None:
+            i = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+            toks = {self._token_ids.setdefault(t, len(self._token_ids)) for t in name_tokens(name)}
+            self._tok_data.extend(sorted(toks))
+            self._tok_ptr.append(len(self._tok_data))
+        return i
+
+    def _arrays(self):
+        """(ptr, data) numpy views of the CSR token arrays, appending only what was interned since the last call."""
+        import numpy as np
+        n_ptr, n_data = self._synced
+        if self._ptr_buf is None:
+            self._ptr_buf, self._data_buf = np.zeros(1024, dtype=np.int64), np.zeros(1024, dtype=np.int64)
+        if n_ptr < len(self._tok_ptr):
+            self._ptr_buf = _append(self._ptr_buf, n_ptr, self._tok_ptr[n_ptr:])
+            self._data_buf = _append(self._data_buf, n_data, self._tok_data[n_data:])
+            self._synced = n_ptr, n_data = len(self._tok_ptr), len(self._tok_data)
+        return self._ptr_buf[:n_ptr], self._data_buf[:n_data]
+
+    def tokens(self, name: str) -> List[int]:
+        i = self.intern(name)
+        return self._tok_data[self._tok_ptr[i]:self._tok_ptr[i + 1]]
+
+    def _remember(self, key, value: float) -> float:
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def score(self, a: str, b: str) -> float:
+        if a is None or b is None:
+            return 0.0
+        key = (a, b)
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            return hit
+        ta, tb = self.tokens(a), self.tokens(b)
+        if not ta or not tb:
+            return self._remember(key, 0.0)
+        inter = len(set(ta).intersection(tb))
+        sim = inter / max(len(ta), len(tb))
+        if sim == 0:
+            sim = difflib.SequenceMatcher(None, a, b).ratio()
+        return self._remember(key, float(sim))
+
+    def score_pairs(self, pairs: Iterable[Tuple[str, str]]) -> List[float]:
+        """Score many (a, b) pairs in one call; token overlaps of cache misses are computed with numpy."""
+        pairs = list(pairs)
+        out = [0.0] * len(pairs)
+        miss = []
+        for k, (a, b) in enumerate(pairs):
+            if a is None or b is None:
+                continue
+            hit = self._cache.get((a, b))
+            if hit is not None:
+                self._cache.move_to_end((a, b))
+                out[k] = hit
+            else:
+                miss.append(k)
+        if len(miss) < self.vectorize_min:
+            for k in miss:
+                out[k] = self.score(*pairs[k])
+            return out
+        import numpy as np
+        a_ids = np.array([self.intern(pairs[k][0]) for k in miss], dtype=np.int64)
+        b_ids = np.array([self.intern(pairs[k][1]) for k in miss], dtype=np.int64)
+        ptr, data = self._arrays()
+        n_tokens = max(1, len(self._token_ids))
+
+        def keys(ids):
+            lens = ptr[ids + 1] - ptr[ids]
+            owner = np.repeat(np.arange(len(ids), dtype=np.int64), lens)
+            offs = np.arange(lens.sum(), dtype=np.int64) - np.repeat(np.cumsum(lens) - lens, lens)
+            return owner * n_tokens + data[np.repeat(ptr[ids], lens) + offs], lens
+
+        ka, la = keys(a_ids)
+        kb, lb = keys(b_ids)
+        inter = np.bincount(np.intersect1d(ka, kb, assume_unique=True) // n_tokens, minlength=len(miss))
+        denom = np.maximum(la, lb)
+        sims = np.divide(inter, denom, out=np.zeros(len(miss)), where=denom > 0)
+        for j, k in enumerate(miss):
+            a, b = pairs[k]
+            if la[j] == 0 or lb[j] == 0:
+                sim = 0.0
+            elif inter[j] == 0:
+                sim = difflib.SequenceMatcher(None, a, b).ratio()
+            else:
+                sim = float(sims[j])
+            out[k] = self._remember((a, b), sim)
+        return out
+
+    def candidates(self, left: Iterable[str], right: Iterable[str], max_block: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Pairs (l, r) that share at least one token, found through an inverted index on `right`.
+        Tokens shared by more than max_block right-hand names (e.g. 'id') are not used for blocking.
+        """
+        index = {}
+        right = list(dict.fromkeys(right))
+        for r in right:
+            for t in self.tokens(r):
+                index.setdefault(t, []).append(r)
+        out = []
+        for l in dict.fromkeys(left):
+            seen = set()
+            for t in self.tokens(l):
+                block = index.get(t, ())
+                if max_block is not None and len(block) > max_block:
+                    continue
+                for r in block:
+                    if r not in seen:
+                        seen.add(r)
+                        out.append((l, r))
+        return out
+
+    def match(self, left: Iterable[str], right: Iterable[str], min_score: float = 0.0,
+              top_k: Optional[int] = None, max_block: Optional[int] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """Catalog-wide candidate matching: blocked candidate pairs scored in one batch, best first."""
+        pairs = self.candidates(left, right, max_block=max_block)
+        out = {}
+        for (l, r), sc in zip(pairs, self.score_pairs(pairs)):
+            if sc >= min_score:
+                out.setdefault(l, []).append((r, sc))
+        for l in out:
+            out[l].sort(key=lambda x: -x[1])
+            if top_k is not None:
+                del out[l][top_k:]
+        return out
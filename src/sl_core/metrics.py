@@ -0,0 +1,236 @@
+"""
+Build metrics for the SDG pipeline.
+
+BuildMetrics collects wall time per stage (glob, cache, read, render, parse, extract, schema, map, score, store, ...),
+counters (bytes read, statements parsed/failed/skipped, edges, wildcard edges, ...) and a timing row
+per artifact, from which the slowest N are reported. NULL_METRICS has the same interface and
+does nothing, so instrumented code paths cost a method call when metrics are off.
+
+profile='cprofile' runs every in-process stage under one cProfile.Profile; profile='tracemalloc'
+records the peak traced allocation of each stage. Both only see work done in the calling
+process, so with a worker pool they cover the merge/store stages, not parsing.
+"""
+import heapq
+import json
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 't0')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        m = self.metrics
+        if m._profiler is not None:
+            m._profile_enter(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        m = self.metrics
+        m.stages[self.name] += time.perf_counter() - self.t0
+        m.stage_calls[self.name] += 1
+        if m._profiler is not None:
+            m._profile_exit(self.name)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class NullMetrics:
+    """Disabled metrics: every call is a no-op."""
+    enabled = False
+
+    def stage(self, name: str):
+        return _NULL_TIMER
+
+    def add(self, counter: str, n: int = 1):
+        pass
+
+    def artifact(self, art: str, seconds: float, **counts):
+        pass
+
+    def merge(self, other):
+        pass
+
+    def state(self):
+        return None
+
+    def finish(self):
+        return self
+
+    def to_dict(self) -> dict:
+        return {}
+
+NULL_METRICS = NullMetrics()
+
+class BuildMetrics:
+    enabled = True
+
+    def __init__(self, slowest_n: int = 20, profile: Optional[str] = None, keep_artifacts: bool = True):
+        if profile not in (None, 'cprofile', 'tracemalloc'):
+            raise ValueError(f"profile must be None, 'cprofile' or 'tracemalloc', got {profile!r}")
+        self.slowest_n = slowest_n
+        self.keep_artifacts = keep_artifacts
+        self.stages: Dict[str, float] = defaultdict(float)
+        self.stage_calls: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.artifacts: Dict[str, dict] = {}
+        self._slowest = []  # min-heap of (seconds, artifact)
+        self.stage_peak_bytes: Dict[str, int] = {}
+        self.profile = profile
+        self._profiler = None
+        self._depth = 0
+        self.started = time.perf_counter()
+        self.wall_s = None
+        if profile == 'cprofile':
+            import cProfile
+            self._profiler = cProfile.Profile()
+        elif profile == 'tracemalloc':
+            import tracemalloc
+            self._profiler = tracemalloc
+            self._tracemalloc_started = not tracemalloc.is_tracing()
+            if self._tracemalloc_started:
+                tracemalloc.start()
+
+    # ------------------------------------------------------------------ recording
+    def stage(self, name: str):
+        """Context manager adding its wall time to `name`."""
+        return _StageTimer(self, name)
+
+    def add(self, counter: str, n: int = 1):
+        self.counters[counter] += n
+
+    def artifact(self, art: str, seconds: float, **counts):
+        if self.keep_artifacts:
+            self.artifacts[art] = dict(seconds=round(seconds, 6), **counts)
+        item = (seconds, art)
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def slowest(self, n: Optional[int] = None):
+        return [{'artifact': a, 'seconds': round(s, 6)} for s, a in heapq.nlargest(n or self.slowest_n, self._slowest)]
+
+    # ------------------------------------------------------------------ profiling hooks
+    def _profile_enter(self, name):
+        # nested stages share the outermost stage's profiling window
+        self._depth += 1
+        if self._depth > 1:
+            return
+        if self.profile == 'cprofile':
+            self._profiler.enable()
+        else:
+            self._profiler.reset_peak()
+            self._mem0 = self._profiler.get_traced_memory()[0]
+
+    def _profile_exit(self, name):
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        if self.profile == 'cprofile':
+            self._profiler.disable()
+        else:
+            peak = self._profiler.get_traced_memory()[1] - self._mem0
+            self.stage_peak_bytes[name] = max(self.stage_peak_bytes.get(name, 0), peak)
+
+    def profile_stats(self, limit: int = 25, sort: str = 'cumulative') -> str:
+        """cProfile report of the profiled stages as text ('' unless profile='cprofile')."""
+        if self.profile != 'cprofile':
+            return ''
+        import io
+        import pstats
+        buf = io.StringIO()
+        pstats.Stats(self._profiler, stream=buf).sort_stats(sort).print_stats(limit)
+        return buf.getvalue()
+
+    def dump_profile(self, path: str):
+        """Write raw cProfile data (pstats format, e.g. for snakeviz)."""
+        if self.profile == 'cprofile':
+            self._profiler.dump_stats(path)
+
+    # ------------------------------------------------------------------ workers
+    def state(self) -> dict:
+        """Picklable snapshot, sent back from worker processes and folded in with merge()."""
+        return {'stages': dict(self.stages), 'stage_calls': dict(self.stage_calls), 'counters': dict(self.counters),
+                'artifacts': [(a, r) for a, r in self.artifacts.items()], 'slowest': list(self._slowest)}
+
+    def merge(self, other):
+        st = other.state() if isinstance(other, (BuildMetrics, NullMetrics)) else other
+        if not st:
+            return
+        for k, v in st['stages'].items():
+            self.stages[k] += v
+        for k, v in st['stage_calls'].items():
+            self.stage_calls[k] += v
+        for k, v in st['counters'].items():
+            self.counters[k] += v
+        if self.keep_artifacts:
+            self.artifacts.update(st['artifacts'])
+        for seconds, art in st['slowest']:
+            if len(self._slowest) < self.slowest_n:
+                heapq.heappush(self._slowest, (seconds, art))
+            elif (seconds, art) > self._slowest[0]:
+                heapq.heapreplace(self._slowest, (seconds, art))
+
+    # ------------------------------------------------------------------ output
+    def finish(self):
+        """Fix wall_s at the time since creation; stages recorded later (e.g. persist) still count."""
+        self.wall_s = time.perf_counter() - self.started
+        return self
+
+    def close(self):
+        """Stop tracemalloc if this object started it."""
+        if self.profile == 'tracemalloc' and self._tracemalloc_started:
+            self._profiler.stop()
+            self._tracemalloc_started = False
+
+    @property
+    def parse_time_s(self) -> float:
+        """Time spent turning artifacts into edges (read + render + parse + extract + schema + map + score)."""
+        return sum(self.stages.get(s, 0.0) for s in ('read', 'render', 'parse', 'extract', 'schema', 'map', 'score'))
+
+    def to_dict(self, include_artifacts: bool = False) -> dict:
+        out = {
+            'wall_s': round(self.wall_s, 6) if self.wall_s is not None else None,
+            'parse_time_s': round(self.parse_time_s, 6),
+            'stages_s': {k: round(v, 6) for k, v in self.stages.items()},
+            'stage_calls': dict(self.stage_calls),
+            'counters': dict(self.counters),
+            'slowest_artifacts': self.slowest(),
+        }
+        if self.stage_peak_bytes:
+            out['stage_peak_bytes'] = dict(self.stage_peak_bytes)
+        if self.profile == 'cprofile':
+            out['profile'] = self.profile_stats()
+        if include_artifacts:
+            out['artifacts'] = self.artifacts
+        return out
+
+    def dump_json(self, path: str, include_artifacts: bool = True):
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(include_artifacts), f, indent=2)
+
+def make_metrics(metrics=None):
+    """Normalize the `metrics` argument: None/False -> NULL_METRICS, True -> BuildMetrics(), or as given."""
+    if metrics is None or metrics is False:
+        return NULL_METRICS
+    if metrics is True:
+        return BuildMetrics()
+    return metrics
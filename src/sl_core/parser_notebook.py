@@ -1,32 +1,157 @@
-
-import nbformat
+import json
 import re
-from typing import List, Dict
+from typing import Iterable, List, Tuple
 import logging
 
 log = logging.getLogger(__name__)
 
 SQL_CELL_MAGIC = re.compile(r'^\s*%sql|^\s*%%sql', re.IGNORECASE)
-SQL_API_CALL = re.compile(r'(spark\.sql|pd\.read_sql|conn\.execute|cursor\.execute)\s*\(\s*[rR]?[\'\"](.+?)[\'\"]\s*\)', re.S)
+SQL_API_CALL = re.compile(
+    r'(spark\.sql|pd\.read_sql|conn\.execute|cursor\.execute)\s*\(\s*[rRfFuU]?'
+    r'(?:"""(.+?)"""|\'\'\'(.+?)\'\'\'|"((?:[^"\\\n]|\\.)+)"|\'((?:[^\'\\\n]|\\.)+)\')', re.S)
+DF_HINTS = ('.select(', '.join(', 'read_csv(', 'read_table(')
 
-def extract_cells_from_notebook(nb_path: str):
+NOTEBOOK_CHUNK = 1 << 20
+# a run of non-structural text and short escape-free strings (the lines of text outputs),
+# consumed in one regex call while inside outputs/metadata; longer strings take the slow path
+_FLAT_RUN = re.compile(r'(?:[^"\[\]{}]+|"[^"\\\n]{0,512}")*')
+_STRUCT = re.compile(r'["\[\]{}:,]')
+_CELL_FIELDS = ('cell_type', 'source')
+
+def scan_code_chunks(chunks: Iterable[str]) -> List[Tuple[int, str]]:
+    """
+    Streaming notebook scan over successive text chunks: returns (cell_index, source) for every
+    code cell. Only the cell_type and source values of each cell are kept and decoded; outputs,
+    attachments and metadata are skipped structurally as the chunks go by, so memory stays at one
+    chunk plus one cell's source however large the embedded outputs are.
+    Raises ValueError on malformed JSON or when there is no top-level cells list (e.g. v3 files).
+    """
+    stack, keys = [], []      # open containers and, for objects, their current member key
+    expect_key = False
+    in_str = escape = False
+    capture = None            # 'key' or 'value' while the text of one is being collected
+    buf, cap_start = [], 0
+    cell, idx, out, cells_seen = None, 0, [], False
+
+    def in_cell():
+        return len(stack) == 3 and keys[0] == 'cells' and stack[0] == '{' and stack[1] == '[' and stack[2] == '{'
+
+    for chunk in chunks:
+        i, n = 0, len(chunk)
+        cap_start = 0
+        while i < n:
+            if in_str:
+                if escape:
+                    i += 1
+                    escape = False
+                    continue
+                # the closing quote is the first one preceded by an even run of backslashes
+                j = chunk.find('"', i)
+                while j != -1:
+                    k = j
+                    while k > i and chunk[k - 1] == '\\':
+                        k -= 1
+                    if (j - k) % 2 == 0:
+                        break
+                    j = chunk.find('"', j + 1)
+                if j == -1:
+                    k = n
+                    while k > i and chunk[k - 1] == '\\':
+                        k -= 1
+                    escape = (n - k) % 2 == 1
+                    break
+                i = j + 1
+                in_str = False
+                if capture == 'key':
+                    buf.append(chunk[cap_start:i])
+                    keys[-1] = json.loads(''.join(buf))
+                    capture = None
+                continue
+            if len(stack) > 3:
+                i = _FLAT_RUN.match(chunk, i).end()
+            m = _STRUCT.search(chunk, i)
+            if m is None:
+                break
+            c = m.group()
+            i = m.end()
+            if c == '"':
+                in_str = True
+                if expect_key and capture is None and (len(stack) == 1 or in_cell()):
+                    capture, buf, cap_start = 'key', [], m.start()
+            elif c == '{' or c == '[':
+                if not stack and c != '{':
+                    raise ValueError("notebook is not a JSON object")
+                stack.append(c)
+                keys.append(None)
+                expect_key = c == '{'
+                if len(stack) == 2 and keys[0] == 'cells':
+                    cells_seen = c == '['
+                elif in_cell():
+                    cell = {}
+            else:
+                if not stack:
+                    raise ValueError("unexpected %r" % c)
+                if c == ':':
+                    expect_key = False
+                    if in_cell() and keys[-1] in _CELL_FIELDS:
+                        capture, buf, cap_start = 'value', [], i
+                    continue
+                if capture == 'value' and len(stack) == 3:
+                    buf.append(chunk[cap_start:m.start()])
+                    cell[keys[-1]] = json.loads(''.join(buf))
+                    capture = None
+                if c == ',':
+                    expect_key = stack[-1] == '{'
+                    continue
+                if (c == '}') != (stack[-1] == '{'):
+                    raise ValueError("mismatched %r" % c)
+                if in_cell():
+                    if cell.get('cell_type') == 'code':
+                        src = cell.get('source') or ''
+                        out.append((idx, ''.join(src) if isinstance(src, list) else src))
+                    idx += 1
+                    cell = None
+                stack.pop()
+                keys.pop()
+                expect_key = False
+        if capture is not None:
+            buf.append(chunk[cap_start:])
+    if stack or in_str:
+        raise ValueError("unterminated notebook JSON")
+    if not cells_seen:
+        raise ValueError("notebook has no cells list")
+    return out
+
+def scan_code_cells(text: str) -> List[Tuple[int, str]]:
+    """scan_code_chunks over notebook text already in memory."""
+    return scan_code_chunks((text,))
+
+def _read_code_cells(nb_path: str) -> List[Tuple[int, str]]:
+    try:
+        with open(nb_path, 'r', encoding='utf-8') as f:
+            return scan_code_chunks(iter(lambda: f.read(NOTEBOOK_CHUNK), ''))
+    except (ValueError, IndexError, TypeError) as e:
+        log.warning("Fast notebook scan failed for %s (%s), falling back to nbformat", nb_path, e)
+    import nbformat
     nb = nbformat.read(nb_path, as_version=4)
+    return [(i, cell.source or '') for i, cell in enumerate(nb.cells) if cell.cell_type == 'code']
+
+def extract_cells_from_notebook(nb_path: str):
     cells = []
-    for i, cell in enumerate(nb.cells):
-        if cell.cell_type != 'code':
-            continue
-        source = cell.source or ''
+    for i, source in _read_code_cells(nb_path):
         if SQL_CELL_MAGIC.search(source):
             lines = [line for line in source.splitlines() if not line.strip().startswith('%sql') and not line.strip().startswith('%%sql')]
             sql_text = "\n".join(lines).strip()
             cells.append({'type': 'sql', 'content': sql_text, 'cell_index': i})
             continue
-        m = SQL_API_CALL.search(source)
-        if m:
-            sql_text = m.group(2)
+        found = False
+        for m in SQL_API_CALL.finditer(source):
+            sql_text = next(g for g in m.groups()[1:] if g is not None)
             cells.append({'type': 'sql', 'content': sql_text, 'cell_index': i})
+            found = True
+        if found:
             continue
-        if '.select(' in source or '.join(' in source or 'read_csv(' in source or 'read_table(' in source:
+        if any(hint in source for hint in DF_HINTS):
             cells.append({'type': 'df', 'content': source, 'cell_index': i})
             continue
     return cells
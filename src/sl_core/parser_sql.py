@@ -1,73 +1,179 @@
 # src/sl_core/parser_sql.py
-from sqlglot import parse, parse_one, exp
+from sqlglot import parse, exp
+from collections import OrderedDict
 from typing import List, Dict, Tuple, Optional
+import hashlib
 import logging
+import re
+from src.sl_core.metrics import NULL_METRICS
 
 log = logging.getLogger(__name__)
 
-def parse_sql_statements(sql_text: str):
+# UNION/INTERSECT/EXCEPT: one SetOperation base in recent sqlglot, subclasses of Union before it
+_SET_OPERATION = getattr(exp, 'SetOperation', exp.Union)
+
+PARSE_CACHE_SIZE = 4096
+_parse_cache = OrderedDict()
+
+# quoted strings/identifiers are kept verbatim, comments and whitespace runs collapse to one space
+_LEX = re.compile(r"""
+      (?P<quoted>'(?:[^'\\]|''|\\.)*'|"(?:[^"]|"")*"|`[^`]*`|\$(?P<tag>\w*)\$.*?\$(?P=tag)\$)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<space>\s+)
+    | (?P<semi>;)
+    | (?P<other>[^'"`$;\s/-]+|.)
+""", re.S | re.X)
+_AS = re.compile(r'\bAS\b', re.I)
+_SELECT = re.compile(r'\bSELECT\b', re.I)
+_WITH_TARGET = re.compile(r'\b(?:INSERT|CREATE)\b', re.I)
+_DDL = re.compile(r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL|TEMP|TEMPORARY|EXTERNAL|TRANSIENT)\s+)*TABLE\b', re.I)
+
+def split_statements(sql_text: str) -> List[str]:
+    """
+    Cheap lexical split of SQL text into top-level statements.
+    Semicolons inside quotes, dollar-quoted bodies and comments are ignored; comments are dropped
+    and whitespace outside quotes is collapsed, so the result doubles as a normalized cache key.
+    """
+    out = []
+    buf = []
+    for m in _LEX.finditer(sql_text):
+        kind = m.lastgroup
+        if kind == 'semi':
+            stmt = ''.join(buf).strip()
+            if stmt:
+                out.append(stmt)
+            buf = []
+        elif kind in ('space', 'comment'):
+            if buf and buf[-1] != ' ':
+                buf.append(' ')
+        else:
+            buf.append(m.group())
+    stmt = ''.join(buf).strip()
+    if stmt:
+        out.append(stmt)
+    return out
+
+def is_lineage_statement(stmt: str) -> bool:
+    """True for statements that can yield lineage: CREATE ... AS, INSERT ... SELECT, WITH ... INSERT/CREATE."""
+    head = stmt[:6].upper()
+    if head == 'CREATE':
+        return _AS.search(stmt) is not None
+    if head == 'INSERT':
+        return _SELECT.search(stmt) is not None
+    if head[:4] == 'WITH':
+        return _WITH_TARGET.search(stmt) is not None
+    return False
+
+def is_schema_statement(stmt: str) -> bool:
+    """True for CREATE TABLE statements, whose column list feeds the workspace schema index."""
+    return _DDL.match(stmt) is not None
+
+_DDL_HEAD = re.compile(r'CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL|TEMP|TEMPORARY|EXTERNAL|TRANSIENT)\s+)*TABLE\s+'
+                       r'(?:IF\s+NOT\s+EXISTS\s+)?((?:\w+\.)*\w+)\s*\(', re.I)
+_DDL_CONSTRAINT = re.compile(r'(?:PRIMARY|FOREIGN|UNIQUE|CONSTRAINT|CHECK|KEY|INDEX|PERIOD)\b', re.I)
+_DDL_COLUMN = re.compile(r'\s*(\w+)\s+\w')
+
+def declared_columns(stmt: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    (table, columns) of a plain CREATE TABLE t (col type, ...) read lexically, without sqlglot.
+    Returns None for anything less regular (quoted names, AS/LIKE/CLONE, trailing options), which
+    is then parsed in full.
+    """
+    m = _DDL_HEAD.match(stmt)
+    if m is None or not stmt.endswith(')') or any(q in stmt for q in '"`[\''):
+        return None
+    body = stmt[m.end():-1]
+    cols, depth, start = [], 0, 0
+    for i, ch in enumerate(body + ','):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+            if depth < 0:
+                return None
+        elif ch == ',' and depth == 0:
+            item = body[start:i]
+            start = i + 1
+            if _DDL_CONSTRAINT.match(item.lstrip()):
+                continue
+            col = _DDL_COLUMN.match(item)
+            if col is None:
+                return None
+            cols.append(col.group(1))
+    if depth or not cols:
+        return None
+    return m.group(1).rsplit('.', 1)[-1], cols
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+def parse_statement(stmt: str):
+    """
+    Parse one normalized statement, memoized in an LRU keyed by its hash.
+    Returns the list of ASTs sqlglot produced ([] when it fails, so a bad statement is only
+    tried once). Cached ASTs are shared between callers and must be treated as read-only.
+    """
+    key = hashlib.sha1(stmt.encode('utf-8')).digest()
+    hit = _parse_cache.get(key)
+    if hit is not None:
+        _parse_cache.move_to_end(key)
+        return hit
+    try:
+        asts = [a for a in parse(stmt) if a is not None]
+    except Exception as e:
+        log.warning("Failed to parse SQL statement: %s", str(e).splitlines()[0] if str(e) else e)
+        asts = []
+    _parse_cache[key] = asts
+    if len(_parse_cache) > PARSE_CACHE_SIZE:
+        _parse_cache.popitem(last=False)
+    return asts
+
+def parse_sql_statements(sql_text: str, lineage_only: bool = True, metrics=NULL_METRICS):
     """
     Parse SQL text into sqlglot Expression ASTs.
     Returns list of Expression nodes (one per top-level statement).
+    The text is split lexically first; with lineage_only (the default) statements that can never
+    yield lineage (SET, GRANT, plain DDL, bare SELECT, ...) are skipped without being parsed.
+    Each statement is parsed on its own, so one bad statement does not affect the others.
+    Statement counts (statements, statements_skipped/parsed/failed) go to `metrics`.
     """
+    asts = []
+    for stmt in split_statements(sql_text):
+        metrics.add('statements')
+        if lineage_only and not is_lineage_statement(stmt):
+            metrics.add('statements_skipped')
+            continue
+        parsed = parse_statement(stmt)
+        metrics.add('statements_parsed' if parsed else 'statements_failed')
+        asts.extend(parsed)
+    return asts
+
+def _target_name(node) -> Optional[str]:
+    target = getattr(node, "this", None)
+    if isinstance(target, exp.Schema):
+        # INSERT INTO t (a, b) / CREATE TABLE t (a INT): the table sits inside the column list
+        target = target.this
+    if target is None:
+        return None
     try:
-        asts = parse(sql_text)
-        return asts
-    except Exception as e:
-        log.warning("sqlglot.parse failed, trying parse_one: %s", e)
-        try:
-            one = parse_one(sql_text)
-            return [one] if one is not None else []
-        except Exception as e2:
-            log.error("Failed to parse SQL: %s", e2)
-            return []
+        return getattr(target, "name", None) or target.sql()
+    except Exception:
+        return None
 
 def extract_create_selects(ast):
     """
     Given an AST, find CREATE VIEW / CREATE TABLE AS / INSERT ... SELECT constructs.
-    Returns list of (output_name, select_ast)
+    Returns list of (output_name, select_ast), each target once.
     """
     out = []
     if ast is None:
         return out
-
-    for node in ast.walk():
-        # CREATE TABLE ... AS SELECT / CREATE VIEW ... AS SELECT
-        if isinstance(node, exp.Create):
-            target = None
-            try:
-                # node.this is the table identifier expression
-                if hasattr(node, "this") and node.this is not None:
-                    target = getattr(node.this, "name", None) or node.this.sql()
-            except Exception:
-                target = None
-            # The create node may contain an expression (select) as node.expression
-            if hasattr(node, "expression") and node.expression is not None:
-                select_ast = node.expression
-                out.append((target, select_ast))
-        # INSERT INTO ... SELECT ...
-        if isinstance(node, exp.Insert):
-            target = None
-            try:
-                if hasattr(node, "this") and node.this is not None:
-                    target = getattr(node.this, "name", None) or node.this.sql()
-            except Exception:
-                target = None
-            select_ast = getattr(node, "expression", None)
-            if select_ast is not None:
-                out.append((target, select_ast))
-        # CREATE VIEW nodes appear as exp.Create(kind='VIEW') in newer sqlglot versions
-        if isinstance(node, exp.Create) and getattr(node, "kind", "").upper() == "VIEW":
-            target = None
-            try:
-                if hasattr(node, "this") and node.this is not None:
-                    target = getattr(node.this, "name", None) or node.this.sql()
-            except Exception:
-                target = None
-            select_ast = getattr(node, "expression", None)
+    nodes = [ast] if isinstance(ast, (exp.Create, exp.Insert)) else ast.walk()
+    for node in nodes:
+        if isinstance(node, (exp.Create, exp.Insert)):
+            select_ast = node.args.get("expression")
             if select_ast is not None:
-                out.append((target, select_ast))
-
+                out.append((_target_name(node), select_ast))
     return out
 
 def resolve_table_refs(select_ast) -> List[Tuple[str, Optional[str]]]:
@@ -90,65 +196,241 @@ def resolve_table_refs(select_ast) -> List[Tuple[str, Optional[str]]]:
         refs.append((table_name, alias))
     return refs
 
-def map_output_to_input_columns(select_ast, catalog: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+def table_columns(ast) -> Optional[Tuple[str, List[str]]]:
+    """(table, columns) declared by CREATE TABLE t (col type, ...), else None."""
+    if isinstance(ast, exp.Create) and isinstance(ast.this, exp.Schema):
+        cols = [c.name for c in ast.this.expressions if isinstance(c, exp.ColumnDef)]
+        if cols:
+            return _target_name(ast), cols
+    return None
+
+def _column_ref(col) -> str:
+    table = col.table
+    name = '*' if isinstance(col.this, exp.Star) else col.name
+    return f"{table}.{name}" if table else name
+
+def summarize_query(query) -> dict:
     """
-    Walk the select AST expressions to map output column names -> input columns.
-    Returns dict: out_col -> list of input references like 'table.col' or just 'col' if ambiguous.
-    If SELECT * is encountered, and catalog is provided, it will expand into concrete columns.
+    Catalog-independent, JSON-serializable summary of a query's column lineage:
+    {'columns': [[out_col, [ref, ...]], ...], 'scope': {qualifier: source}, 'ctes': {name: summary}}
+    where refs are 'qual.col', bare 'col', 'qual.*' or '*' exactly as written. Set operations become
+    {'union': [summary, ...]}. resolve_query turns a summary into an output -> input mapping once
+    the columns of the referenced tables are known.
     """
-    mapping = {}
-    if select_ast is None:
+    ctes = {}
+    with_ = query.args.get('with_') or query.args.get('with')
+    if with_ is not None:
+        for cte in with_.expressions:
+            ctes[cte.alias_or_name] = summarize_query(cte.this)
+    if isinstance(query, _SET_OPERATION):
+        out = {'union': [summarize_query(query.left), summarize_query(query.right)]}
+    elif isinstance(query, exp.Subquery):
+        out = summarize_query(query.this)
+    elif isinstance(query, exp.Select):
+        scope = {}
+        sources = []
+        from_ = query.args.get('from_') or query.args.get('from')
+        if from_ is not None:
+            # older sqlglot keeps FROM sources in a list
+            sources.extend([from_.this] if from_.this is not None else from_.expressions)
+        sources.extend(j.this for j in query.args.get('joins') or [])
+        for src in sources:
+            alias = src.alias_or_name
+            if isinstance(src, exp.Table):
+                scope[alias] = src.name
+            elif isinstance(src, exp.Subquery) and alias:
+                # a derived table is resolved like a CTE of the same name
+                ctes[alias] = summarize_query(src.this)
+                scope[alias] = alias
+        columns = []
+        for expr in query.expressions:
+            if isinstance(expr, exp.Star):
+                columns.append(['*', ['*']])
+            elif isinstance(expr, exp.Column) and isinstance(expr.this, exp.Star):
+                columns.append(['*', [_column_ref(expr)]])
+            else:
+                try:
+                    out_name = expr.alias_or_name or expr.sql()
+                except Exception:
+                    out_name = str(expr)
+                refs = []
+                for col in expr.find_all(exp.Column):
+                    ref = _column_ref(col)
+                    if ref not in refs:
+                        refs.append(ref)
+                columns.append([out_name, refs])
+        out = {'columns': columns, 'scope': scope}
+    else:
+        return {'columns': [], 'scope': {}}
+    if ctes:
+        out['ctes'] = ctes
+    return out
+
+def summarize_statement(ast) -> List[dict]:
+    """
+    Summaries of the objects a statement defines: {'target', 'kind': 'ddl'|'create'|'insert',
+    'columns' (declared or INSERT column list), 'query' (summarize_query) or None}.
+    """
+    out = []
+    declared = table_columns(ast)
+    if declared:
+        out.append({'target': declared[0], 'kind': 'ddl', 'columns': declared[1], 'query': None})
+    for node in ([ast] if isinstance(ast, (exp.Create, exp.Insert)) else ast.walk()):
+        if not isinstance(node, (exp.Create, exp.Insert)):
+            continue
+        query = node.args.get("expression")
+        if query is None:
+            continue
+        cols = []
+        if isinstance(node, exp.Insert) and isinstance(node.this, exp.Schema):
+            cols = [c.name for c in node.this.expressions]
+        out.append({'target': _target_name(node), 'kind': 'insert' if isinstance(node, exp.Insert) else 'create',
+                    'columns': cols, 'query': summarize_query(query)})
+    return out
+
+def summarize_sql(sql_text: str, metrics=NULL_METRICS) -> List[dict]:
+    """
+    Summaries (summarize_statement) of every table/view definition in SQL text.
+    Plain CREATE TABLE declarations are read by declared_columns without parsing; lineage
+    statements and irregular DDL are parsed one by one as in parse_sql_statements, and all
+    other statements are skipped.
+    """
+    out = []
+    for stmt in split_statements(sql_text):
+        metrics.add('statements')
+        if not is_lineage_statement(stmt):
+            if not is_schema_statement(stmt):
+                metrics.add('statements_skipped')
+                continue
+            declared = declared_columns(stmt)
+            if declared is not None:
+                metrics.add('statements_declared')
+                out.append({'target': declared[0], 'kind': 'ddl', 'columns': declared[1], 'query': None})
+                continue
+        with metrics.stage('parse'):
+            parsed = parse_statement(stmt)
+        metrics.add('statements_parsed' if parsed else 'statements_failed')
+        with metrics.stage('extract'):
+            for ast in parsed:
+                out.extend(summarize_statement(ast))
+    return out
+
+def query_sources(summary: dict, out: Optional[set] = None) -> set:
+    """Names of the tables/views a query summary reads from (CTEs and derived tables excluded)."""
+    out = set() if out is None else out
+    for part in summary.get('union', ()):
+        query_sources(part, out)
+    local = summary.get('ctes', {})
+    for sub in local.values():
+        query_sources(sub, out)
+    out.update(src for src in summary.get('scope', {}).values() if src not in local)
+    return out
+
+def _dedupe(items: List[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+def resolve_query(summary: dict, lookup) -> Dict[str, List[str]]:
+    """
+    Output column -> input columns for a summarize_query summary.
+    lookup(name) returns {column: [inputs]} for a known table or view (for a plain table each
+    column maps to 'table.column') or None. Aliases resolve to their table, columns of CTEs and
+    derived tables resolve through to their own inputs, stars expand over known sources and
+    unqualified columns are qualified when exactly one source has them (or there is only one
+    source). Stars over unknown sources stay as 'source.*' ('*' without any FROM).
+    """
+    local = {}
+    def scoped(name):
+        hit = local.get(name)
+        return hit if hit is not None else lookup(name)
+    for name, sub in summary.get('ctes', {}).items():
+        local[name] = resolve_query(sub, scoped)
+
+    if 'union' in summary:
+        parts = [resolve_query(p, scoped) for p in summary['union']]
+        mapping = {k: list(v) for k, v in parts[0].items()}
+        names = list(mapping)
+        for part in parts[1:]:
+            for name, inputs in zip(names, part.values()):
+                mapping[name] = _dedupe(mapping[name] + inputs)
         return mapping
 
-    # Get projection expressions (Select.expressions)
-    try:
-        select_list = list(select_ast.expressions)
-    except Exception:
-        # fallback: scan children for projection-like nodes
-        select_list = [n for n in select_ast.find_all(exp.Expression)][:50]
+    scope = summary.get('scope', {})
+    sources = _dedupe(list(scope.values()))
+    known = {src: scoped(src) for src in sources}
+    lowered = {src: {c.lower(): c for c in cols} for src, cols in known.items() if cols is not None}
 
-    for expr in select_list:
-        # Determine output name (alias or expression SQL)
-        try:
-            out_name = expr.alias_or_name or expr.sql()
-        except Exception:
-            out_name = expr.sql() if hasattr(expr, "sql") else str(expr)
+    def column(src, col):
+        cols = known.get(src) if src in known else scoped(src)
+        if cols is not None:
+            hit = cols.get(col)
+            if hit is None:
+                real = lowered.get(src, {}).get(col.lower())
+                hit = cols.get(real) if real is not None else None
+            if hit is not None:
+                return hit
+            star_inputs = cols.get('*')
+            if star_inputs and len(star_inputs) == 1 and star_inputs[0].endswith('.*'):
+                # a CTE selecting * from one unknown table passes its columns through
+                return [f"{star_inputs[0][:-2]}.{col}"]
+        return [f"{src}.{col}"]
 
+    def star(src):
+        cols = known.get(src) if src in known else scoped(src)
+        if cols is None:
+            return None
+        return list(cols.items())
+
+    mapping = {}
+    for out_name, refs in summary.get('columns', []):
+        if out_name == '*':
+            qual, _, _ = refs[0].rpartition('.')
+            targets = [scope.get(qual, qual)] if qual else sources
+            if not targets:
+                mapping.setdefault('*', []).append('*')
+            for src in targets:
+                expanded = star(src)
+                if expanded is None:
+                    mapping.setdefault('*', []).append(f"{src}.*")
+                    continue
+                for col, inputs in expanded:
+                    mapping[col] = _dedupe(mapping.get(col, []) + inputs)
+            continue
         inputs = []
-        # If expression contains Column nodes, collect them
-        columns = list(expr.find_all(exp.Column))
-        if columns:
-            for ident in columns:
-                # ident may have parts: table, column
-                try:
-                    table = getattr(ident, "table", None)
-                except Exception:
-                    table = None
-                col = getattr(ident, "name", None) or ident.sql()
-                if table:
-                    inputs.append(f"{table}.{col}")
-                else:
-                    inputs.append(col)
-        else:
-            # handle star expansion: if expression includes Star nodes, expand
-            stars = list(expr.find_all(exp.Star))
-            if stars:
-                # If catalog provided, attempt to expand using available tables in FROM clause
-                from_tables = [t for t in select_ast.find_all(exp.Table)]
-                if catalog and from_tables:
-                    # Expand * across referenced tables using their catalog columns if available
-                    for t in from_tables:
-                        tname = getattr(t, "name", None) or t.sql()
-                        cols = catalog.get(tname, [])
-                        for c in cols:
-                            inputs.append(f"{tname}.{c}")
-                else:
-                    # fallback: leave wildcard marker
-                    inputs.append("*")
-        # Deduplicate while preserving order
-        seen = []
-        for x in inputs:
-            if x not in seen:
-                seen.append(x)
-        mapping[out_name] = seen
+        for ref in refs:
+            qual, _, col = ref.rpartition('.')
+            if qual:
+                inputs.extend(column(scope.get(qual, qual), col))
+                continue
+            owners = [src for src, low in lowered.items() if col.lower() in low]
+            if len(owners) == 1:
+                inputs.extend(column(owners[0], col))
+            elif not owners and len(sources) == 1:
+                inputs.extend(column(sources[0], col))
+            else:
+                inputs.append(col)
+        mapping[out_name] = _dedupe(mapping.get(out_name, []) + inputs)
+    if '*' in mapping:
+        mapping['*'] = _dedupe(mapping['*'])
     return mapping
+
+def catalog_lookup(catalog: Optional[Dict[str, List[str]]]):
+    """A resolve_query lookup over a plain {table: [columns]} catalog."""
+    catalog = catalog or {}
+    lowered = {k.lower(): k for k in catalog}
+    def lookup(name):
+        cols = catalog.get(name)
+        if cols is None and name.lower() in lowered:
+            cols = catalog[lowered[name.lower()]]
+        return {c: [f"{name}.{c}"] for c in cols} if cols is not None else None
+    return lookup
+
+def map_output_to_input_columns(select_ast, catalog: Optional[Dict[str, List[str]]] = None) -> Dict[str, List[str]]:
+    """
+    Walk the select AST expressions to map output column names -> input columns.
+    Returns dict: out_col -> list of input references like 'table.col' or just 'col' if ambiguous.
+    Aliases are resolved to table names; SELECT * expands over tables found in `catalog`
+    (a {table: [columns]} dict) and is kept as a 'table.*' marker otherwise.
+    """
+    if select_ast is None:
+        return {}
+    return resolve_query(summarize_query(select_ast), catalog_lookup(catalog))
@@ -0,0 +1,130 @@
+"""
+Workspace schema index: the column list of every table and view a workspace defines.
+
+process_workspace builds it in a first pass over per-artifact statement summaries
+(parser_sql.summarize_statement). Those depend only on an artifact's own text, so they are
+cached with it. CREATE TABLE declarations give columns directly. Views, CTAS and INSERT targets
+get the output columns of their query, resolved in dependency order so stars over upstream views
+expand too. The second pass resolves every statement against the finished index.
+"""
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from src.sl_core.parser_sql import query_sources, resolve_query
+
+log = logging.getLogger(__name__)
+
+# which definition of a name decides its columns: declared DDL over CREATE ... AS over INSERT
+PRECEDENCE = {'ddl': 0, 'create': 1, 'insert': 2}
+
+def statement_deps(summaries: Iterable[dict]) -> set:
+    """Names whose columns the resolution of these statements depends on."""
+    deps = set()
+    for st in summaries:
+        if st.get('query') is not None:
+            query_sources(st['query'], deps)
+            if st['kind'] == 'insert' and st['target']:
+                deps.add(st['target'])
+    return deps
+
+class SchemaIndex:
+    """
+    {name: [columns]} for a workspace, seeded with an optional hand-built catalog that workspace
+    definitions override. add() collects definitions, build() resolves them; lookup() and
+    resolve() then serve the second pass. Name lookups fall back to a case-insensitive match.
+    """
+    def __init__(self, catalog: Optional[Dict[str, List[str]]] = None):
+        self.tables: Dict[str, List[str]] = {}
+        self._lower: Dict[str, str] = {}
+        self.defs: Dict[str, dict] = {}
+        for name, cols in (catalog or {}).items():
+            self._set(name, list(cols))
+
+    def _set(self, name: str, cols: List[str]):
+        self.tables[name] = cols
+        self._lower.setdefault(name.lower(), name)
+
+    def columns(self, name: str) -> Optional[List[str]]:
+        cols = self.tables.get(name)
+        if cols is None:
+            real = self._lower.get(name.lower())
+            cols = self.tables.get(real) if real is not None else None
+        return cols
+
+    def lookup(self, name: str) -> Optional[Dict[str, List[str]]]:
+        """resolve_query lookup: {column: ['name.column']} for a known table or view."""
+        cols = self.columns(name)
+        return {c: [f"{name}.{c}"] for c in cols} if cols is not None else None
+
+    def add(self, summaries: Iterable[dict]):
+        """Collect definitions; among equal kinds the one added last wins (CREATE OR REPLACE)."""
+        for st in summaries:
+            name = st.get('target')
+            if not name:
+                continue
+            prev = self.defs.get(name)
+            if prev is None or PRECEDENCE[st['kind']] <= PRECEDENCE[prev['kind']]:
+                self.defs[name] = st
+
+    def _order(self) -> List[str]:
+        """Definitions in dependency order (iterative DFS post-order; cycles are cut where found)."""
+        deps = {name: [d for d in query_sources(st['query']) if d in self.defs and d != name]
+                if st.get('query') is not None else [] for name, st in self.defs.items()}
+        state, order = {}, []
+        for root in self.defs:
+            if root in state:
+                continue
+            state[root] = 1
+            work = [(root, iter(deps[root]))]
+            while work:
+                name, it = work[-1]
+                for d in it:
+                    if d not in state:
+                        state[d] = 1
+                        work.append((d, iter(deps[d])))
+                        break
+                    if state[d] == 1:
+                        log.debug("Dependency cycle through %s and %s", name, d)
+                else:
+                    work.pop()
+                    state[name] = 2
+                    order.append(name)
+        return order
+
+    def build(self) -> 'SchemaIndex':
+        for name in self._order():
+            st = self.defs[name]
+            if st['kind'] == 'ddl' or (st['kind'] == 'insert' and st['columns']):
+                self._set(name, list(st['columns']))
+                continue
+            mapping = resolve_query(st['query'], self.lookup)
+            if '*' in mapping:
+                # a star over an unknown source: the column list would be incomplete
+                continue
+            self._set(name, list(mapping))
+        return self
+
+    def resolve(self, st: dict) -> Dict[str, List[str]]:
+        """Output column -> input columns of one statement summary against the index."""
+        if st.get('query') is None:
+            return {}
+        mapping = resolve_query(st['query'], self.lookup)
+        if st['kind'] == 'insert' and '*' not in mapping:
+            # INSERT maps by position onto the target's column list
+            cols = st['columns'] or self.columns(st['target'] or '')
+            if cols and len(cols) == len(mapping) and list(cols) != list(mapping):
+                mapping = dict(zip(cols, mapping.values()))
+        return mapping
+
+    def frozen(self) -> 'SchemaIndex':
+        """A copy with only the built column lists, for shipping to the resolve-pass workers."""
+        out = SchemaIndex()
+        out.tables, out._lower = self.tables, self._lower
+        return out
+
+    def digest(self, names: Iterable[str]) -> str:
+        """Fingerprint of the columns of `names`; cached edges stay valid while it is unchanged."""
+        state = [(n, self.columns(n)) for n in sorted(names)]
+        return hashlib.sha1(json.dumps(state).encode('utf-8')).hexdigest()
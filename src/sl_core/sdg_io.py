@@ -0,0 +1,232 @@
+"""
+Streaming and columnar persistence for SDG stores.
+
+NDJSON: one JSON record per line, all {"type": "node"} records first, then one
+{"type": "edge"} record per edge with its evidence. Readers and writers handle one
+record at a time; a .gz suffix switches to gzip.
+
+Parquet: a directory with nodes/ (node_id, name), edges/ (edge_id, src_id, tgt_id, prob)
+and evidence/ (edge_id, seq, artifact, score, ts) subdirectories of part-NNNNN.parquet files,
+one per written chunk, read and written through DuckDB so snapshots can also be queried in
+place. Snapshots with a single <table>.parquet file per table are still read.
+
+All functions work with any store exposing nodes()/iter_edges()/put_node()/put_edge()
+(SDGStore and CompactSDGStore).
+"""
+import gzip
+import json
+import os
+from typing import Dict, Iterator, Tuple
+
+PARQUET_TABLES = ('nodes', 'edges', 'evidence')
+
+def _open_text(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def _new_store(store):
+    if store is None:
+        from src.sl_core.graph_store import SDGStore
+        store = SDGStore()
+    return store
+
+# ---------------------------------------------------------------------------- NDJSON
+def write_ndjson(store, path: str):
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    with _open_text(path, 'w') as f:
+        for n in store.nodes():
+            f.write(dumps({'type': 'node', 'name': n}))
+            f.write('\n')
+        for u, v, p, ev in store.iter_edges():
+            f.write(dumps({'type': 'edge', 'src': u, 'tgt': v, 'prob': float(p), 'evidence': ev}))
+            f.write('\n')
+
+def iter_ndjson(path: str) -> Iterator[dict]:
+    with _open_text(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def read_ndjson(path: str, store=None):
+    store = _new_store(store)
+    if not os.path.exists(path):
+        return store
+    for rec in iter_ndjson(path):
+        if rec.get('type') == 'node':
+            store.put_node(rec['name'])
+        elif rec.get('type') == 'edge':
+            store.put_edge(rec['src'], rec['tgt'], rec.get('prob', 0.0), rec.get('evidence', []))
+    return store
+
+# ---------------------------------------------------------------------------- Parquet
+PARQUET_COLUMNS = {'nodes': 'node_id::BIGINT AS node_id, name::VARCHAR AS name',
+                   'edges': 'edge_id::BIGINT AS edge_id, src_id::BIGINT AS src_id, tgt_id::BIGINT AS tgt_id, prob::DOUBLE AS prob',
+                   'evidence': 'edge_id::BIGINT AS edge_id, seq::INTEGER AS seq, artifact::VARCHAR AS artifact, '
+                               'score::DOUBLE AS score, ts::VARCHAR AS ts'}
+
+def _parquet_glob(sdg_dir: str, table: str) -> str:
+    if os.path.isdir(os.path.join(sdg_dir, table)):
+        return os.path.join(sdg_dir, table, '*.parquet')
+    return os.path.join(sdg_dir, f'{table}.parquet')
+
+def write_parquet(store, out_dir: str, chunk_size: int = 100000):
+    """
+    Export the store to nodes/edges/evidence Parquet part files. At most chunk_size rows per
+    table are buffered; each full buffer is written out as the table's next part file.
+    """
+    import duckdb
+    import pandas as pd
+    con = duckdb.connect(database=':memory:')
+    for t in PARQUET_TABLES:
+        # replace a previous export in place, whichever layout it used
+        table_dir = os.path.join(out_dir, t)
+        os.makedirs(table_dir, exist_ok=True)
+        for name in os.listdir(table_dir):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                os.remove(os.path.join(table_dir, name))
+        if os.path.exists(os.path.join(out_dir, f'{t}.parquet')):
+            os.remove(os.path.join(out_dir, f'{t}.parquet'))
+    columns = {'nodes': ['node_id', 'name'], 'edges': ['edge_id', 'src_id', 'tgt_id', 'prob'],
+               'evidence': ['edge_id', 'seq', 'artifact', 'score', 'ts']}
+    buffers = {t: [] for t in PARQUET_TABLES}
+    parts = {t: 0 for t in PARQUET_TABLES}
+
+    def flush(table):
+        # an empty table still gets one (empty) part so readers see its schema
+        if not buffers[table] and parts[table]:
+            return
+        df = pd.DataFrame(buffers[table], columns=columns[table])
+        path = os.path.join(out_dir, table, f'part-{parts[table]:05d}.parquet').replace("'", "''")
+        con.register('_chunk', df)
+        con.execute(f"COPY (SELECT {PARQUET_COLUMNS[table]} FROM _chunk) TO '{path}' (FORMAT PARQUET)")
+        con.unregister('_chunk')
+        buffers[table] = []
+        parts[table] += 1
+
+    def append(table, row):
+        buffers[table].append(row)
+        if len(buffers[table]) >= chunk_size:
+            flush(table)
+
+    ids = {}
+    for n in store.nodes():
+        ids[n] = len(ids)
+        append('nodes', (ids[n], n))
+    for eid, (u, v, p, ev) in enumerate(store.iter_edges()):
+        append('edges', (eid, ids[u], ids[v], float(p)))
+        for seq, e in enumerate(ev):
+            append('evidence', (eid, seq, e.get('artifact'), e.get('score'), e.get('ts')))
+    for t in PARQUET_TABLES:
+        flush(t)
+    con.close()
+
+def connect_parquet(sdg_dir: str, con=None):
+    """
+    Return a DuckDB connection with views nodes/edges/evidence over a Parquet snapshot, plus a
+    `lineage` view (src, tgt, prob) with node names resolved, for querying without loading the graph.
+    """
+    import duckdb
+    con = con or duckdb.connect(database=':memory:')
+    for t in PARQUET_TABLES:
+        path = _parquet_glob(sdg_dir, t).replace("'", "''")
+        con.execute(f"CREATE OR REPLACE VIEW {t} AS SELECT * FROM read_parquet('{path}')")
+    con.execute('''CREATE OR REPLACE VIEW lineage AS
+                   SELECT s.name AS src, t.name AS tgt, e.prob AS prob
+                   FROM edges e JOIN nodes s ON s.node_id = e.src_id JOIN nodes t ON t.node_id = e.tgt_id''')
+    return con
+
+def iter_parquet(sdg_dir: str, batch_size: int = 10000) -> Iterator[Tuple[str, object]]:
+    con = connect_parquet(sdg_dir)
+    cur = con.execute('SELECT name FROM nodes ORDER BY node_id')
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for (name,) in rows:
+            yield 'node', name
+    cur = con.execute('''SELECT s.name, t.name, e.prob,
+                                list(struct_pack(artifact := v.artifact, score := v.score, ts := v.ts) ORDER BY v.seq)
+                                    FILTER (WHERE v.edge_id IS NOT NULL)
+                         FROM edges e
+                         JOIN nodes s ON s.node_id = e.src_id
+                         JOIN nodes t ON t.node_id = e.tgt_id
+                         LEFT JOIN evidence v ON v.edge_id = e.edge_id
+                         GROUP BY e.edge_id, s.name, t.name, e.prob
+                         ORDER BY e.edge_id''')
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        for src, tgt, prob, ev in rows:
+            yield 'edge', {'src': src, 'tgt': tgt, 'prob': prob, 'evidence': ev or []}
+    con.close()
+
+def read_parquet(sdg_dir: str, store=None):
+    store = _new_store(store)
+    if not os.path.isdir(sdg_dir):
+        return store
+    for kind, rec in iter_parquet(sdg_dir):
+        if kind == 'node':
+            store.put_node(rec)
+        else:
+            store.put_edge(rec['src'], rec['tgt'], rec['prob'], rec['evidence'])
+    return store
+
+# ---------------------------------------------------------------------------- any format
+def sdg_format(path: str) -> str:
+    if os.path.isdir(path) or path.endswith('.parquet'):
+        return 'parquet'
+    if path.endswith(('.ndjson', '.ndjson.gz', '.jsonl', '.jsonl.gz')):
+        return 'ndjson'
+    return 'json'
+
+def iter_sdg(path: str) -> Iterator[Tuple[str, object]]:
+    """Yield ('node', name) and ('edge', {src, tgt, prob, evidence}) records from any SDG format."""
+    fmt = sdg_format(path)
+    if fmt == 'parquet':
+        yield from iter_parquet(path if os.path.isdir(path) else os.path.dirname(path))
+    elif fmt == 'ndjson':
+        for rec in iter_ndjson(path):
+            if rec.get('type') == 'node':
+                yield 'node', rec['name']
+            elif rec.get('type') == 'edge':
+                yield 'edge', rec
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            j = json.load(f)
+        for n in j.get('nodes', []):
+            yield 'node', n
+        for e in j.get('edges', []):
+            yield 'edge', e
+
+def read_sdg(path: str) -> Dict[str, list]:
+    """Read any SDG format into the sdg.json layout: {'nodes': [...], 'edges': [...]}."""
+    out = {'nodes': [], 'edges': []}
+    if not os.path.exists(path):
+        return {}
+    for kind, rec in iter_sdg(path):
+        out['nodes' if kind == 'node' else 'edges'].append(rec)
+    return out
+
+def load_sdg(path: str, store=None):
+    """Load any SDG format into a store (a new SDGStore by default)."""
+    store = _new_store(store)
+    if not os.path.exists(path):
+        return store
+    for kind, rec in iter_sdg(path):
+        if kind == 'node':
+            store.put_node(rec)
+        else:
+            store.put_edge(rec['src'], rec['tgt'], rec.get('prob', 0.0), rec.get('evidence', []))
+    return store
+
+def save_sdg(store, path: str, fmt: str = None):
+    """Write a store as 'json', 'ndjson' or 'parquet' (a directory); by default the format implied by path."""
+    fmt = fmt or sdg_format(path)
+    if fmt == 'parquet':
+        write_parquet(store, os.path.dirname(path) or '.' if path.endswith('.parquet') else path)
+    elif fmt == 'ndjson':
+        write_ndjson(store, path)
+    else:
+        store.persist_json(path)
@@ -0,0 +1,233 @@
+"""
+Column sketches for value-overlap evidence without touching data again.
+
+Each column gets, in one streaming pass:
+  * a MinHash signature with `num_perm` slots (default 128), and
+  * a HyperLogLog register array with 2**hll_p registers (default p=12, 4096 registers).
+
+Estimates and their error bounds (one standard deviation):
+  * jaccard(A, B): the fraction of equal MinHash slots. Unbiased, std = sqrt(J(1-J)/num_perm),
+    so at most 0.044 for 128 slots.
+  * cardinality(A): HyperLogLog with linear-counting small-range correction, relative std about
+    1.04/sqrt(2**hll_p), i.e. 1.6% for p=12.
+  * containment(A in B) = |A n B| / |A|, with |A n B| = J/(1+J) * (|A| + |B|). The error combines
+    both of the above and grows when |A| << |B|, because J is then small.
+Containment is over distinct values, unlike the row-based value_cooccurrence/probe measures.
+"""
+import hashlib
+import os
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+_U64 = np.uint64
+_MAX = np.iinfo(np.uint64).max
+
+def _mix64(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, vectorized over uint64 arrays (wrap-around is intended)."""
+    with np.errstate(over='ignore'):
+        x = x + _U64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> _U64(30))) * _U64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> _U64(27))) * _U64(0x94D049BB133111EB)
+        return x ^ (x >> _U64(31))
+
+def hash_values(values) -> np.ndarray:
+    """
+    64-bit hashes of the non-null values. Numbers are hashed as float64 so 1 and 1.0 collide,
+    matching Python set semantics; everything else goes through pandas' object hashing.
+    """
+    import pandas as pd
+    s = pd.Series(values).dropna()
+    if s.empty:
+        return np.empty(0, dtype=np.uint64)
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.is_numeric_dtype(s):
+        arr = s.to_numpy(dtype=np.float64)
+        return _mix64(arr.view(np.uint64))
+    return pd.util.hash_array(s.astype(str).to_numpy(dtype=object), categorize=False)
+
+def _leading_zeros64(w: np.ndarray) -> np.ndarray:
+    hi = (w >> _U64(32)).astype(np.float64)
+    lo = (w & _U64(0xFFFFFFFF)).astype(np.float64)
+    # frexp gives the exact bit length of integers below 2**53
+    bl_hi = np.frexp(hi)[1]
+    bl_lo = np.frexp(lo)[1]
+    return np.where(hi > 0, 32 - bl_hi, 64 - bl_lo).astype(np.int64)
+
+class ColumnSketch:
+    def __init__(self, num_perm: int = 128, hll_p: int = 12, seed: int = 1):
+        self.num_perm = num_perm
+        self.hll_p = hll_p
+        self.seed = seed
+        self.minhash = np.full(num_perm, _MAX, dtype=np.uint64)
+        self.hll = np.zeros(1 << hll_p, dtype=np.uint8)
+        self.rows = 0
+        self._salts = _salts(num_perm, seed)
+
+    def update(self, values, chunk: int = 8192):
+        """Fold a batch of raw values (any iterable/Series/array) into the sketch."""
+        n_values = len(values) if hasattr(values, '__len__') else None
+        h = hash_values(values)
+        self.rows += n_values if n_values is not None else len(h)
+        self.update_hashes(h, chunk)
+        return self
+
+    def update_hashes(self, h: np.ndarray, chunk: int = 8192):
+        if len(h) == 0:
+            return self
+        p = self.hll_p
+        idx = (h >> _U64(64 - p)).astype(np.int64)
+        w = h << _U64(p)
+        rank = np.minimum(_leading_zeros64(w) + 1, 64 - p + 1).astype(np.uint8)
+        np.maximum.at(self.hll, idx, rank)
+        for start in range(0, len(h), chunk):
+            block = _mix64(h[start:start + chunk, None] ^ self._salts[None, :])
+            np.minimum(self.minhash, block.min(axis=0), out=self.minhash)
+        return self
+
+    def merge(self, other: 'ColumnSketch') -> 'ColumnSketch':
+        self._check(other)
+        np.minimum(self.minhash, other.minhash, out=self.minhash)
+        np.maximum(self.hll, other.hll, out=self.hll)
+        self.rows += other.rows
+        return self
+
+    def _check(self, other: 'ColumnSketch'):
+        if (self.num_perm, self.hll_p, self.seed) != (other.num_perm, other.hll_p, other.seed):
+            raise ValueError("sketches were built with different parameters")
+
+    @property
+    def empty(self) -> bool:
+        return not self.hll.any()
+
+    def cardinality(self) -> float:
+        m = float(len(self.hll))
+        alpha = 0.7213 / (1.0 + 1.079 / m)
+        est = alpha * m * m / np.sum(np.ldexp(1.0, -self.hll.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.hll == 0))
+        if est <= 2.5 * m and zeros:
+            est = m * np.log(m / zeros)
+        return float(est)
+
+    def jaccard(self, other: 'ColumnSketch') -> float:
+        self._check(other)
+        if self.empty or other.empty:
+            return 0.0
+        return float(np.count_nonzero(self.minhash == other.minhash)) / self.num_perm
+
+    def containment(self, other: 'ColumnSketch') -> float:
+        """Estimated fraction of this column's distinct values that also occur in `other`."""
+        j = self.jaccard(other)
+        if j == 0.0:
+            return 0.0
+        a, b = self.cardinality(), other.cardinality()
+        inter = j / (1.0 + j) * (a + b)
+        return float(min(1.0, inter / max(a, 1.0)))
+
+    def jaccard_stderr(self, other: 'ColumnSketch') -> float:
+        j = self.jaccard(other)
+        return float(np.sqrt(j * (1.0 - j) / self.num_perm))
+
+    def cardinality_rel_stderr(self) -> float:
+        return 1.04 / np.sqrt(len(self.hll))
+
+_SALTS = {}
+
+def _salts(num_perm: int, seed: int) -> np.ndarray:
+    key = (num_perm, seed)
+    if key not in _SALTS:
+        _SALTS[key] = np.random.default_rng(seed).integers(0, _MAX, size=num_perm, dtype=np.uint64, endpoint=True)
+    return _SALTS[key]
+
+class SketchStore:
+    """Column name ('table.col') -> ColumnSketch, persisted as one .npz next to the SDG."""
+    def __init__(self, num_perm: int = 128, hll_p: int = 12, seed: int = 1):
+        self.num_perm = num_perm
+        self.hll_p = hll_p
+        self.seed = seed
+        self.sketches: Dict[str, ColumnSketch] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.sketches
+
+    def __len__(self) -> int:
+        return len(self.sketches)
+
+    def get(self, name: str) -> ColumnSketch:
+        sk = self.sketches.get(name)
+        if sk is None:
+            sk = self.sketches[name] = ColumnSketch(self.num_perm, self.hll_p, self.seed)
+        return sk
+
+    def add_dataframe(self, df, table: str):
+        for col in df.columns:
+            self.get(f"{table}.{col}").update(df[col])
+        return self
+
+    def add_query(self, con, sql: str, table: str, vectors_per_chunk: int = 64):
+        """Sketch every column of a DuckDB query result in a single streaming pass."""
+        res = con.execute(sql)
+        while True:
+            chunk = res.fetch_df_chunk(vectors_per_chunk)
+            if chunk is None or chunk.empty:
+                break
+            self.add_dataframe(chunk, table)
+        return self
+
+    def containment(self, left: str, right: str) -> float:
+        """Estimated containment of left's values in right's; 0.0 when either column has no sketch."""
+        a, b = self.sketches.get(left), self.sketches.get(right)
+        if a is None or b is None:
+            return 0.0
+        return a.containment(b)
+
+    def jaccard(self, left: str, right: str) -> float:
+        a, b = self.sketches.get(left), self.sketches.get(right)
+        if a is None or b is None:
+            return 0.0
+        return a.jaccard(b)
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha1(f"{self.num_perm}:{self.hll_p}:{self.seed}".encode())
+        for name in sorted(self.sketches):
+            h.update(name.encode('utf-8'))
+            h.update(self.sketches[name].minhash.tobytes())
+        return h.hexdigest()
+
+    def save(self, path: str):
+        names = sorted(self.sketches)
+        np.savez_compressed(
+            path,
+            params=np.array([self.num_perm, self.hll_p, self.seed], dtype=np.int64),
+            names=np.array(names, dtype=object).astype(str),
+            minhash=np.stack([self.sketches[n].minhash for n in names]) if names else np.empty((0, self.num_perm), np.uint64),
+            hll=np.stack([self.sketches[n].hll for n in names]) if names else np.empty((0, 1 << self.hll_p), np.uint8),
+            rows=np.array([self.sketches[n].rows for n in names], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> 'SketchStore':
+        with np.load(path, allow_pickle=False) as z:
+            num_perm, hll_p, seed = (int(x) for x in z['params'])
+            store = cls(num_perm, hll_p, seed)
+            for i, name in enumerate(z['names']):
+                sk = store.get(str(name))
+                sk.minhash = z['minhash'][i].copy()
+                sk.hll = z['hll'][i].copy()
+                sk.rows = int(z['rows'][i])
+        return store
+
+def sketch_path_for(sdg_path: str) -> str:
+    """Where the sketches for an SDG file live: sdg.json -> sdg.sketches.npz."""
+    base = sdg_path[:-1] if sdg_path.endswith(os.sep) else sdg_path
+    for ext in ('.ndjson.gz', '.json', '.ndjson', '.sqlite3', '.parquet'):
+        if base.endswith(ext):
+            base = base[:-len(ext)]
+            break
+    return base + '.sketches.npz'
+
+def build_sketches(sources: Iterable, store: Optional[SketchStore] = None, **params) -> SketchStore:
+    """Sketch (table, DataFrame) pairs into a SketchStore."""
+    store = store or SketchStore(**params)
+    for table, df in sources:
+        store.add_dataframe(df, table)
+    return store
@@ -0,0 +1,144 @@
+import os, sys, time, json, argparse, tempfile, platform, resource, datetime
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+from src.tools.gen_synthetic import gen_project, gen_workload, PRESETS
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.parser_sql import clear_parse_cache
+from src.sl_core.metrics import BuildMetrics
+
+STAGES = ('glob', 'read', 'render', 'parse', 'extract', 'schema', 'map', 'score', 'store', 'persist')
+
+def bench_workers(root: str, worker_counts=(1, 2, 4), repeats: int = 1):
+    """Time process_workspace for each worker count and report speedup over the serial run."""
+    results = []
+    base = None
+    for w in worker_counts:
+        best = None
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            store = process_workspace(root, workers=w)
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        if base is None:
+            base = best
+        results.append({'workers': w, 'seconds': round(best, 4), 'speedup': round(base / best, 2) if best else 0.0,
+                        'edges': store.G.number_of_edges()})
+    return results
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == 'darwin' else rss / 1024.0
+
+def time_stages(root: str, catalog=None, compact: bool = False, out_dir: str = None, workers: int = None,
+                profile: str = None):
+    """
+    Build root with metrics on and persist sdg.json into out_dir (a temp dir by default).
+    Returns (seconds per stage, metrics) where the stages are STAGES plus any extra ones recorded.
+    """
+    metrics = BuildMetrics(profile=profile)
+    store = process_workspace(root, catalog=catalog, compact=compact, workers=workers, metrics=metrics)
+    out_dir = out_dir or tempfile.mkdtemp(prefix='sl_bench_out_')
+    with metrics.stage('persist'):
+        store.persist_json(os.path.join(out_dir, 'sdg.json'))
+    metrics.close()
+    stages = {k: round(metrics.stages.get(k, 0.0), 6) for k in STAGES}
+    stages.update({k: round(v, 6) for k, v in metrics.stages.items() if k not in stages})
+    return stages, metrics
+
+def run_case(size, seed: int = 0, notebook_frac: float = 0.1, levels: int = 4, objects_per_file: int = 1,
+             compact: bool = False, workdir: str = None, repeats: int = 1):
+    """
+    Generate one workload and benchmark it: per-stage times, end-to-end time, throughput and peak RSS.
+    Without workdir the workload lives in a temporary directory removed afterwards.
+    """
+    if workdir is None:
+        with tempfile.TemporaryDirectory(prefix='sl_bench_') as tmp:
+            return run_case(size, seed, notebook_frac, levels, objects_per_file, compact, tmp, repeats)
+    root = os.path.join(workdir, f"workload_{size}_{seed}")
+    t0 = time.perf_counter()
+    meta = gen_workload(root, size, seed=seed, levels=levels, notebook_frac=notebook_frac,
+                        objects_per_file=objects_per_file, verbose=False)
+    gen_s = time.perf_counter() - t0
+
+    best = None
+    for _ in range(repeats):
+        clear_parse_cache()
+        stages, metrics = time_stages(root, compact=compact, out_dir=workdir)
+        if best is None or sum(stages.values()) < sum(best[0].values()):
+            best = (stages, metrics)
+    stages, metrics = best
+    counts = metrics.counters
+    clear_parse_cache()
+    t0 = time.perf_counter()
+    process_workspace(root, compact=compact)
+    e2e = time.perf_counter() - t0
+    total = sum(stages.values())
+    return {
+        'size': size, 'seed': seed, 'compact': compact, 'notebook_frac': notebook_frac,
+        'n_objects': meta['n_objects'], 'levels': meta['levels'], 'view_kinds': meta['view_kinds'],
+        'n_truth_edges': meta['n_truth_edges'], 'generate_s': round(gen_s, 4),
+        'stages_s': stages, 'stages_total_s': round(total, 4), 'end_to_end_s': round(e2e, 4),
+        'artifacts_per_s': round(counts['artifacts'] / total, 2) if total else 0.0,
+        'edges_per_s': round(counts['edges_stored'] / total, 2) if total else 0.0,
+        'mb_per_s': round(counts['bytes_read'] / 1e6 / total, 3) if total else 0.0,
+        'peak_rss_mb': round(peak_rss_mb(), 1), 'counters': dict(counts),
+        'slowest_artifacts': metrics.slowest(5),
+    }
+
+def run_suite(sizes=('tiny', 'small', 'medium'), seeds=(0,), out_path: str = None, isolate: bool = True, **case_kw):
+    """
+    Run run_case for every size x seed and write {'meta': ..., 'results': [...]} as JSON to out_path.
+    With isolate=True each case runs in a fresh process so peak_rss_mb is that case's own high-water mark.
+    """
+    import sqlglot
+    results = []
+    for size in sizes:
+        for seed in seeds:
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as ex:
+                    r = ex.submit(run_case, size, seed, **case_kw).result()
+            else:
+                r = run_case(size, seed, **case_kw)
+            results.append(r)
+            print(f"{str(size):>8} seed={seed}  objects={r['n_objects']:>6}  stages={r['stages_total_s']:.3f}s  "
+                  f"e2e={r['end_to_end_s']:.3f}s  edges/s={r['edges_per_s']:.0f}  peak_rss={r['peak_rss_mb']:.0f}MB")
+    report = {
+        'meta': {'timestamp': datetime.datetime.utcnow().isoformat(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'cpu_count': os.cpu_count(), 'sqlglot': sqlglot.__version__,
+                 'stages': list(STAGES)},
+        'results': results,
+    }
+    if out_path:
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description="Benchmark process_workspace: stage timings per workload size, or speedup vs. worker count")
+    ap.add_argument('root', nargs='?', help="workspace to build (a synthetic one is generated if omitted)")
+    ap.add_argument('--suite', nargs='+', metavar='SIZE',
+                    help=f"run the stage benchmark for these sizes ({', '.join(PRESETS)} or object counts)")
+    ap.add_argument('--seeds', type=int, nargs='+', default=[0])
+    ap.add_argument('--notebook_frac', type=float, default=0.1)
+    ap.add_argument('--compact', action='store_true')
+    ap.add_argument('--out', default='bench_results.json', help="JSON results file for --suite")
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    ap.add_argument('--n_tables', type=int, default=200)
+    ap.add_argument('--n_views', type=int, default=800)
+    ap.add_argument('--repeats', type=int, default=1)
+    args = ap.parse_args()
+    if args.suite:
+        sizes = [s if s in PRESETS else int(s) for s in args.suite]
+        run_suite(sizes, args.seeds, args.out, notebook_frac=args.notebook_frac, compact=args.compact,
+                  repeats=args.repeats)
+        print(f"results written to {args.out}")
+    else:
+        root = args.root
+        if root is None:
+            root = tempfile.mkdtemp(prefix='sl_bench_')
+            gen_project(root, n_tables=args.n_tables, n_views=args.n_views)
+        print(f"cpu_count={os.cpu_count()}")
+        for r in bench_workers(root, sorted(set(args.workers)), args.repeats):
+            print(f"workers={r['workers']:>3}  time={r['seconds']:.3f}s  speedup={r['speedup']:.2f}x  edges={r['edges']}")
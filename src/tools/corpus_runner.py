@@ -0,0 +1,340 @@
+"""
+Resumable corpus runner: build (and probe) the SDG of every local checkout under public_repos/.
+
+Repos are processed by a bounded process pool, each under a wall-clock limit. Every finished
+repo is appended to data/corpus_runs/<run>/checkpoint.jsonl, which is the run's source of
+truth: restarting with the same --run skips everything already recorded. The summary CSV is
+appended as repos finish and the JSON aggregate is rewritten periodically, both in the
+corpus_summary_with_probes.* format produced by structurelineage_publiccorpus.ipynb.
+
+    python -m src.tools.corpus_runner public_repos --run nightly --workers 8 --timeout 600
+"""
+import os, sys, time, json, csv, signal, heapq, argparse, logging, traceback
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+log = logging.getLogger(__name__)
+
+SKIP_DIRS = ("node_modules", ".venv", ".git", "__pycache__")
+CSV_HEADER = ["repo", "dir", "sql_count", "ipynb_count", "py_count", "csv_count", "parquet_count",
+              "parse_time_s", "num_edges", "avg_prob", "status", "build_time_s", "probe_time_s", "total_time_s"]
+CHECKPOINT = "checkpoint.jsonl"
+SUMMARY_JSON = "corpus_summary_with_probes.json"
+SUMMARY_CSV = "corpus_summary_with_probes.csv"
+
+class RepoTimeout(BaseException):
+    """
+    Raised by _time_limit wherever the repo's build happens to be. A BaseException, so the
+    per-statement and per-artifact `except Exception` handlers cannot swallow it.
+    """
+
+class _time_limit:
+    """Raise RepoTimeout in the current (main) thread after `seconds`; a no-op without SIGALRM."""
+    def __init__(self, seconds):
+        self.seconds = seconds if seconds and hasattr(signal, 'SIGALRM') else None
+
+    def _expire(self, signum, frame):
+        raise RepoTimeout(f"timed out after {self.seconds}s")
+
+    def __enter__(self):
+        if self.seconds:
+            self._old = signal.signal(signal.SIGALRM, self._expire)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc):
+        if self.seconds:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._old)
+        return False
+
+def count_files(root: str):
+    sql = ipynb = py = csv_files = parquet_files = 0
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for f in files:
+            lf = f.lower()
+            if lf.endswith(".sql"): sql += 1
+            elif lf.endswith(".ipynb"): ipynb += 1
+            elif lf.endswith(".py"): py += 1
+            elif lf.endswith(".csv"): csv_files += 1
+            elif lf.endswith(".parquet") or lf.endswith(".pq"): parquet_files += 1
+    return {"sql": sql, "ipynb": ipynb, "py": py, "csv": csv_files, "parquet": parquet_files}
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+def attempt_probe_for_edge(engine, table_columns, edge_src: str, edge_tgt: str, timeout_s=None):
+    """
+    Probe value overlap for one SDG edge against the registered tables: first a table holding
+    both column names, then every (src table, tgt table) equi-join. Returns (score, description)
+    or (None, None) when no probe could run.
+    """
+    src_col = edge_src.split('.')[-1].lower()
+    tgt_col = edge_tgt.split('.')[-1].lower()
+    src_tables = [t for t, cols in table_columns.items() if src_col in cols]
+    tgt_tables = [t for t, cols in table_columns.items() if tgt_col in cols]
+    for t in src_tables:
+        if t in tgt_tables:
+            l, r = table_columns[t][src_col], table_columns[t][tgt_col]
+            score = engine.probe(f"SELECT * FROM {_quote(t)}", _quote(l), _quote(r), timeout_s=timeout_s)
+            if score is not None:
+                return score, f"{t}.{src_col} <-> {t}.{tgt_col}"
+    for s in src_tables:
+        for t in tgt_tables:
+            if s == t:
+                continue
+            l = f"{_quote(s)}.{_quote(table_columns[s][src_col])}"
+            r = f"{_quote(t)}.{_quote(table_columns[t][tgt_col])}"
+            sql = f"SELECT {l} AS left_col, {r} AS right_col FROM {_quote(s)} JOIN {_quote(t)} ON {l} = {r}"
+            score = engine.probe(sql, 'left_col', 'right_col', timeout_s=timeout_s)
+            if score is not None:
+                return score, f"{s}.{src_col} JOIN {t}.{tgt_col}"
+    return None, None
+
+def probe_top_edges(repo_dir: str, edges, sample_size: int = 5000, timeout_s=None):
+    """Probe edges against the repo's CSV/Parquet files and fold the scores in with noisy-OR."""
+    from src.sl_core.dynamic_probe import ProbeEngine
+    engine = ProbeEngine(sample_size=sample_size, timeout_s=timeout_s)
+    results = []
+    try:
+        table_map = engine.register_directory(repo_dir, sample_size=sample_size, skip=SKIP_DIRS)
+        if not table_map:
+            return results, 0
+        table_columns = {t: {c.lower(): c for c in engine.columns(t)} for t in table_map}
+        for e in edges:
+            prob_before = float(e.get("prob", 0.0))
+            score, desc = attempt_probe_for_edge(engine, table_columns, e.get("src"), e.get("tgt"))
+            updated = 1.0 - (1.0 - prob_before) * (1.0 - float(score)) if score is not None else prob_before
+            results.append({"src": e.get("src"), "tgt": e.get("tgt"), "prob_before": prob_before,
+                            "probe_score": score, "probe_desc": desc, "prob_after": updated})
+            e["probe_score"] = score
+            e["probe_desc"] = desc
+            e["prob_after_probe"] = updated
+        return results, len(table_map)
+    finally:
+        engine.close()
+
+def run_repo(repo_dir: str, out_dir: str, repo: str = None, timeout_s: float = None, top_edges: int = 10,
+             probe: bool = True, probe_sample: int = 5000):
+    """
+    Build, persist and probe one repo; always returns a summary record (status ok/timeout/error).
+    SDG files go to out_dir/sdg.json and out_dir/sdg_with_probes.json.
+    """
+    from src.sl_core.build_sdg import process_workspace
+    from src.sl_core.sdg_io import read_sdg
+    t_start = time.perf_counter()
+    rec = {"repo": repo or repo_dir, "dir": repo_dir, "counts": None, "parse_time_s": None, "sdg": None,
+           "probe_samples": [], "status": "ok", "build_time_s": None, "probe_time_s": None}
+    try:
+        with _time_limit(timeout_s):
+            rec["counts"] = count_files(repo_dir)
+            os.makedirs(out_dir, exist_ok=True)
+            t0 = time.perf_counter()
+            store = process_workspace(repo_dir, metrics=True)
+            rec["parse_time_s"] = round(store.metrics.parse_time_s, 3)
+            sdg_path = os.path.join(out_dir, "sdg.json")
+            store.persist_json(sdg_path)
+            store.metrics.dump_json(os.path.join(out_dir, "build_metrics.json"), include_artifacts=False)
+            rec["build_time_s"] = round(time.perf_counter() - t0, 3)
+            rec["metrics"] = store.metrics.to_dict()
+            del store
+
+            raw_sdg = read_sdg(sdg_path)
+            edges = raw_sdg.get("edges", [])
+            rec["sdg"] = {"num_nodes": len(raw_sdg.get("nodes", [])), "num_edges": len(edges),
+                          "avg_prob": (sum(float(x.get("prob", 0.0)) for x in edges) / len(edges)) if edges else 0.0}
+            counts = rec["counts"]
+            if probe and edges and counts["csv"] + counts["parquet"] > 0:
+                t0 = time.perf_counter()
+                top = heapq.nlargest(top_edges, edges, key=lambda e: float(e.get("prob", 0.0)))
+                remaining = timeout_s - (time.perf_counter() - t_start) if timeout_s else None
+                rec["probe_samples"], rec["registered_tables"] = probe_top_edges(repo_dir, top, probe_sample, remaining)
+                rec["probe_time_s"] = round(time.perf_counter() - t0, 3)
+            with open(os.path.join(out_dir, "sdg_with_probes.json"), 'w', encoding='utf-8') as f:
+                json.dump(raw_sdg, f)
+    except RepoTimeout as e:
+        rec["status"], rec["error"] = "timeout", str(e)
+    except Exception as e:
+        rec["status"], rec["error"] = "error", f"{type(e).__name__}: {str(e)[:400]}"
+        log.debug("repo %s failed:\n%s", repo_dir, traceback.format_exc())
+    rec["total_time_s"] = round(time.perf_counter() - t_start, 3)
+    return rec
+
+# ---------------------------------------------------------------------------- run bookkeeping
+def load_checkpoint(run_dir: str):
+    """Records already finished in this run, keyed by repo dir (a torn last line is ignored)."""
+    done = {}
+    path = os.path.join(run_dir, CHECKPOINT)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                done[rec["dir"]] = rec
+    return done
+
+def csv_row(r):
+    c = r.get("counts") or {}
+    sdg = r.get("sdg")
+    return [r["repo"], r["dir"], c.get("sql"), c.get("ipynb"), c.get("py"), c.get("csv"), c.get("parquet"),
+            r.get("parse_time_s"), sdg["num_edges"] if sdg is not None else 0, sdg["avg_prob"] if sdg is not None else 0.0,
+            r.get("status"), r.get("build_time_s"), r.get("probe_time_s"), r.get("total_time_s")]
+
+def write_summary(run_dir: str, records, meta=None):
+    """Rewrite corpus_summary_with_probes.json (atomically) and .csv from the given records."""
+    ok = [r for r in records if r.get("sdg") is not None]
+    agg = dict(meta or {})
+    agg.update({
+        "date_utc": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime()),
+        "repos_processed": len(records),
+        "repos_failed": [{"repo": r["repo"], "reason": r["status"], "error": r.get("error")}
+                         for r in records if r.get("status") != "ok"],
+        "total_sql": sum((r.get("counts") or {}).get("sql", 0) for r in records),
+        "total_ipynb": sum((r.get("counts") or {}).get("ipynb", 0) for r in records),
+        "total_edges": sum(r["sdg"]["num_edges"] for r in ok),
+        "avg_edges_per_repo": (sum(r["sdg"]["num_edges"] for r in ok) / len(records)) if records else 0.0,
+        "total_parse_time_s": round(sum(r.get("parse_time_s") or 0.0 for r in records), 3),
+        "per_repo": [{k: v for k, v in r.items() if k != "metrics"} for r in records],
+    })
+    tmp = os.path.join(run_dir, SUMMARY_JSON + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(agg, f, indent=2)
+    os.replace(tmp, os.path.join(run_dir, SUMMARY_JSON))
+    tmp = os.path.join(run_dir, SUMMARY_CSV + ".tmp")
+    with open(tmp, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f)
+        w.writerow(CSV_HEADER)
+        for r in records:
+            w.writerow(csv_row(r))
+    os.replace(tmp, os.path.join(run_dir, SUMMARY_CSV))
+    return agg
+
+def list_repos(repos_root: str):
+    """Repo checkouts under repos_root as (name, dir, display name); repos.json maps names back to URLs."""
+    urls = {}
+    idx = os.path.join(repos_root, "repos.json")
+    if os.path.exists(idx):
+        with open(idx, encoding='utf-8') as f:
+            urls = {u.rstrip('/').split('/')[-1]: u for u in json.load(f)}
+    out = []
+    for name in sorted(os.listdir(repos_root)):
+        d = os.path.join(repos_root, name)
+        if os.path.isdir(d) and name not in SKIP_DIRS:
+            out.append((name, d, urls.get(name, name)))
+    return out
+
+def _safe_name(name: str) -> str:
+    return "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in name)
+
+def run_corpus(repos_root: str = "public_repos", run: str = None, out_root: str = os.path.join("data", "corpus_runs"),
+               workers: int = None, timeout_s: float = 600, top_edges: int = 10, probe: bool = True,
+               probe_sample: int = 5000, max_repos: int = None, retry_failed: bool = False,
+               summary_every: int = 25, max_tasks_per_child: int = 50):
+    """
+    Process every repo under repos_root that this run has not finished yet.
+    At most `workers` repos are in flight; workers are recycled every max_tasks_per_child repos
+    (Python 3.11+) so leaks in one repo do not accumulate. Returns the aggregate summary.
+    """
+    run = run or time.strftime("%Y%m%d_%H%M%S")
+    run_dir = os.path.join(out_root, run)
+    os.makedirs(run_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(run_dir)
+    if retry_failed:
+        done = {d: r for d, r in done.items() if r.get("status") == "ok"}
+    repos = list_repos(repos_root)
+    if max_repos:
+        repos = repos[:max_repos]
+    todo = [r for r in repos if os.path.abspath(r[1]) not in done and r[1] not in done]
+    meta = {"run": run, "repos_root": os.path.abspath(repos_root), "repos_found": len(repos)}
+    print(f"[corpus] run={run} repos={len(repos)} done={len(repos) - len(todo)} todo={len(todo)} workers={workers}")
+
+    records = dict(done)
+    # the CSV is rebuilt from the checkpoint so rows lost in a crash reappear
+    write_summary(run_dir, list(records.values()), meta)
+    ckpt = open(os.path.join(run_dir, CHECKPOINT), 'a', encoding='utf-8')
+    # rows are appended between rewrites; write_summary replaces the file, so the append handle
+    # is reopened after every rewrite to keep writing to the live CSV rather than the replaced inode
+    csv_out = {}
+
+    def open_csv():
+        csv_out['f'] = open(os.path.join(run_dir, SUMMARY_CSV), 'a', newline='', encoding='utf-8')
+        csv_out['w'] = csv.writer(csv_out['f'])
+
+    open_csv()
+    pool_kw = {'max_tasks_per_child': max_tasks_per_child} if sys.version_info >= (3, 11) and max_tasks_per_child else {}
+
+    def record(rec):
+        # drop this run's older failed attempt of the same repo before appending the new one
+        records.pop(rec["dir"], None)
+        records[rec["dir"]] = rec
+        ckpt.write(json.dumps(rec) + "\n")
+        ckpt.flush()
+        os.fsync(ckpt.fileno())
+        csv_out['w'].writerow(csv_row(rec))
+        csv_out['f'].flush()
+        print(f"[corpus] {rec['status']:>7} {rec['repo']} edges={(rec.get('sdg') or {}).get('num_edges', 0)} "
+              f"parse={rec.get('parse_time_s')}s total={rec.get('total_time_s')}s")
+        if summary_every and len(records) % summary_every == 0:
+            csv_out['f'].close()
+            write_summary(run_dir, list(records.values()), meta)
+            open_csv()
+
+    def submit(ex, item):
+        name, d, display = item
+        out_dir = os.path.join(run_dir, "repos", _safe_name(name))
+        return ex.submit(run_repo, os.path.abspath(d), out_dir, display, timeout_s, top_edges, probe, probe_sample)
+
+    def crashed(item, e):
+        return {"repo": item[2], "dir": os.path.abspath(item[1]), "counts": None, "parse_time_s": None,
+                "sdg": None, "probe_samples": [], "status": "crashed", "error": str(e)[:400]}
+
+    queue = list(reversed(todo))
+    try:
+        while queue:
+            in_flight = {}
+            with ProcessPoolExecutor(max_workers=workers, **pool_kw) as ex:
+                broken = False
+                while (queue or in_flight) and not broken:
+                    while queue and len(in_flight) < workers * 2:
+                        item = queue.pop()
+                        in_flight[submit(ex, item)] = item
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        item = in_flight.pop(fut)
+                        try:
+                            record(fut.result())
+                        except BrokenProcessPool as e:
+                            # a worker died hard (e.g. in native code); every repo in flight is lost with it
+                            broken = True
+                            record(crashed(item, e))
+                for fut, item in in_flight.items():
+                    record(crashed(item, "process pool broken"))
+    finally:
+        ckpt.close()
+        csv_out['f'].close()
+    agg = write_summary(run_dir, list(records.values()), meta)
+    print(f"[corpus] finished: {agg['repos_processed']} repos, {len(agg['repos_failed'])} failed; "
+          f"summary in {run_dir}")
+    return agg
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    ap = argparse.ArgumentParser(description="Build and probe SDGs for a corpus of local repo checkouts (resumable)")
+    ap.add_argument('repos_root', nargs='?', default='public_repos')
+    ap.add_argument('--run', help="run name; reuse it to resume (default: a timestamp)")
+    ap.add_argument('--out_root', default=os.path.join('data', 'corpus_runs'))
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--timeout', type=float, default=600, help="per-repo wall-clock limit in seconds")
+    ap.add_argument('--top_edges', type=int, default=10)
+    ap.add_argument('--probe_sample', type=int, default=5000)
+    ap.add_argument('--no_probe', action='store_true')
+    ap.add_argument('--max_repos', type=int, default=None)
+    ap.add_argument('--retry_failed', action='store_true', help="re-run repos that failed or timed out in this run")
+    ap.add_argument('--summary_every', type=int, default=25)
+    args = ap.parse_args()
+    run_corpus(args.repos_root, args.run, args.out_root, args.workers, args.timeout, args.top_edges,
+               not args.no_probe, args.probe_sample, args.max_repos, args.retry_failed, args.summary_every)
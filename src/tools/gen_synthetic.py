@@ -1,9 +1,14 @@
-import os, random, json
+import os, random, json, argparse
 from pathlib import Path
 
 COMMON_KEYS = ["customer_id", "order_id", "product_id", "user_id", "date_id"]
 COMMON_ATTRS = ["amount", "quantity", "price", "status", "region", "country"]
 
+# total objects (tables + views) per workload size
+PRESETS = {'tiny': 10, 'small': 100, 'medium': 1000, 'large': 10000, 'xlarge': 100000}
+VIEW_KINDS = ('select', 'join', 'cte', 'star', 'insert')
+DEFAULT_KIND_WEIGHTS = {'select': 0.35, 'join': 0.25, 'cte': 0.15, 'star': 0.1, 'insert': 0.15}
+
 def generate_table_sql(name, columns, path):
     cols_def = ",\n  ".join([f"{c} INTEGER" for c in columns])
     sql = f"CREATE TABLE {name} (\n  {cols_def}\n);\n\n"
@@ -15,26 +20,31 @@ def generate_view_sql(view_name, mapping, path):
     for out_col, (t, c) in mapping.items():
         select_list.append(f"{t}.{c} AS {out_col}")
     select_sql = ",\n  ".join(select_list)
-    from_tables = ", ".join(list({t for t, _ in mapping.values()}))
+    from_tables = ", ".join(dict.fromkeys(t for t, _ in mapping.values()))
     q = f"CREATE VIEW {view_name} AS\nSELECT\n  {select_sql}\nFROM {from_tables};\n"
     with open(path, 'w', encoding='utf-8') as f:
         f.write(q)
 
-def make_table_columns(base_idx, n_cols):
+def make_table_columns(base_idx, n_cols, rng=random):
     """Generate realistic table columns with a few shared names."""
     cols = []
     for i in range(n_cols):
-        if i == 0 and random.random() < 0.8:
+        if i == 0 and rng.random() < 0.8:
             # 80% of first columns are shared keys
-            cols.append(random.choice(COMMON_KEYS))
+            cols.append(rng.choice(COMMON_KEYS))
         else:
             cols.append(f"col{base_idx}_{i}")
     # Add 1-2 semantic columns
-    if random.random() < 0.7:
-        cols.append(random.choice(COMMON_ATTRS))
+    if rng.random() < 0.7:
+        cols.append(rng.choice(COMMON_ATTRS))
     return cols
 
-def gen_project(out_dir, n_tables=5, cols_range=(3,6), n_views=5):
+def gen_project(out_dir, n_tables=5, cols_range=(3,6), n_views=5, seed=None):
+    """
+    Small flat project: one file per table/view, single-level views.
+    seed=None draws from the global `random` module, so callers seeding it with random.seed() stay reproducible.
+    """
+    rng = random.Random(seed) if seed is not None else random
     os.makedirs(out_dir, exist_ok=True)
     truth = []
     tables = {}
@@ -42,7 +52,7 @@ def gen_project(out_dir, n_tables=5, cols_range=(3,6), n_views=5):
     # Generate base tables
     for i in range(n_tables):
         tname = f"raw_table_{i}"
-        cols = make_table_columns(i, random.randint(cols_range[0], cols_range[1]))
+        cols = make_table_columns(i, rng.randint(cols_range[0], cols_range[1]), rng)
         generate_table_sql(tname, cols, os.path.join(out_dir, f"{tname}.sql"))
         tables[tname] = cols
 
@@ -50,11 +60,11 @@ def gen_project(out_dir, n_tables=5, cols_range=(3,6), n_views=5):
     for v in range(n_views):
         vname = f"view_{v}"
         mapping = {}
-        for k in range(random.randint(3, 6)):
-            t = random.choice(list(tables.keys()))
-            c = random.choice(tables[t])
+        for k in range(rng.randint(3, 6)):
+            t = rng.choice(list(tables.keys()))
+            c = rng.choice(tables[t])
             # Keep the same name in output to ensure match
-            out_col = c if random.random() < 0.8 else f"vcol_{v}_{k}"
+            out_col = c if rng.random() < 0.8 else f"vcol_{v}_{k}"
             mapping[out_col] = (t, c)
             truth.append((f"{t}.{c}", f"{vname}.{out_col}"))
         generate_view_sql(vname, mapping, os.path.join(out_dir, f"{vname}.sql"))
@@ -65,5 +75,183 @@ def gen_project(out_dir, n_tables=5, cols_range=(3,6), n_views=5):
     print(f"[+] Generated enhanced project at {out_dir} with {n_tables} tables and {n_views} views.")
     print("[+] Shared columns and realistic names included for better matching.")
 
+# ---------------------------------------------------------------------------- scalable workloads
+def _unique(name, taken):
+    out, i = name, 1
+    while out in taken:
+        out = f"{name}_{i}"; i += 1
+    taken.add(out)
+    return out
+
+def _projection(rng, v, parent, cols, n, taken):
+    """Pick n source columns of parent; returns [(src_col, out_col)] with unique output names."""
+    picked = rng.sample(cols, min(n, len(cols)))
+    return [(c, _unique(c if rng.random() < 0.8 else f"vcol_{v}_{k}", taken)) for k, c in enumerate(picked)]
+
+def _view_statement(rng, kind, v, vname, parents, catalog):
+    """
+    SQL for one derived object plus its column lineage [(src, tgt)] and output columns.
+    Column references are always qualified by the full table name so lineage is recoverable
+    without alias resolution.
+    """
+    truth, out_cols, taken = [], [], set()
+    p = parents[0]
+    pcols = catalog[p]
+    if kind == 'star':
+        out_cols = list(pcols)
+        truth = [(f"{p}.{c}", f"{vname}.{c}") for c in pcols]
+        return f"CREATE VIEW {vname} AS\nSELECT *\nFROM {p};\n", truth, out_cols
+
+    if kind == 'join' and len(parents) > 1:
+        q = parents[1]
+        qcols = catalog[q]
+        shared = [c for c in pcols if c in qcols]
+        lk, rk = (shared[0], shared[0]) if shared else (pcols[0], qcols[0])
+        proj = [(p, s, o) for s, o in _projection(rng, v, p, pcols, rng.randint(2, 4), taken)]
+        proj += [(q, s, o) for s, o in _projection(rng, v, q, qcols, rng.randint(1, 3), taken)]
+        select = ",\n  ".join(f"{t}.{s} AS {o}" for t, s, o in proj)
+        sql = f"CREATE VIEW {vname} AS\nSELECT\n  {select}\nFROM {p}\nJOIN {q} ON {p}.{lk} = {q}.{rk};\n"
+    elif kind == 'cte':
+        proj = [(p, s, o) for s, o in _projection(rng, v, p, pcols, rng.randint(3, 6), taken)]
+        inner = ",\n    ".join(f"{p}.{s} AS {s}" for _, s, _ in proj)
+        outer = ",\n  ".join(f"base.{s} AS {o}" for _, s, o in proj)
+        sql = (f"CREATE VIEW {vname} AS\nWITH base AS (\n  SELECT\n    {inner}\n  FROM {p}\n)\n"
+               f"SELECT\n  {outer}\nFROM base;\n")
+    else:
+        proj = [(p, s, o) for s, o in _projection(rng, v, p, pcols, rng.randint(3, 6), taken)]
+        select = [f"{t}.{s} AS {o}" for t, s, o in proj]
+        if len(pcols) > 1 and rng.random() < 0.2:
+            a, b = rng.sample(pcols, 2)
+            o = _unique(f"derived_{v}", taken)
+            select.append(f"COALESCE({p}.{a}, {p}.{b}) AS {o}")
+            truth += [(f"{p}.{a}", f"{vname}.{o}"), (f"{p}.{b}", f"{vname}.{o}")]
+            out_cols.append(o)
+        select = ",\n  ".join(select)
+        if kind == 'insert':
+            cols_def = ", ".join(f"{o} INTEGER" for _, _, o in proj) + "".join(f", {o} INTEGER" for o in out_cols)
+            sql = (f"CREATE TABLE {vname} ({cols_def});\n"
+                   f"INSERT INTO {vname}\nSELECT\n  {select}\nFROM {p};\n")
+        else:
+            sql = f"CREATE VIEW {vname} AS\nSELECT\n  {select}\nFROM {p};\n"
+    truth = [(f"{t}.{s}", f"{vname}.{o}") for t, s, o in proj] + truth
+    out_cols = [o for _, _, o in proj] + out_cols
+    return sql, truth, out_cols
+
+def _notebook_json(statements):
+    cells = [{'cell_type': 'markdown', 'metadata': {}, 'source': ['Generated lineage notebook']}]
+    for sql in statements:
+        cells.append({'cell_type': 'code', 'execution_count': None, 'metadata': {}, 'outputs': [],
+                      'source': [f'df = spark.sql("""\n{sql.strip().rstrip(";")}\n""")\n']})
+    return {'cells': cells, 'metadata': {}, 'nbformat': 4, 'nbformat_minor': 4}
+
+def _shard(kind, idx, per_dir=1000):
+    return os.path.join(kind, f"{idx // per_dir:04d}")
+
+def gen_workload(out_dir, size='small', seed=0, table_frac=0.2, levels=4, cols_range=(3, 8),
+                 notebook_frac=0.0, kind_weights=None, objects_per_file=1, verbose=True):
+    """
+    Deterministic multi-level workload for benchmarks.
+
+    size is a PRESETS key or a number of objects; table_frac of them are base tables and the
+    rest are views spread over `levels` levels, each reading from lower levels (so the DAG is
+    `levels` deep). Views mix plain projections, joins, CTEs, SELECT * and INSERT ... SELECT
+    according to kind_weights. notebook_frac of the views are emitted as spark.sql cells in
+    .ipynb files instead of .sql. objects_per_file > 1 packs several statements per artifact.
+
+    Writes the artifacts (sharded into subdirectories of at most 1000 files), ground_truth.json
+    (list of [src, tgt] column pairs, the gen_project format) and workload.json (parameters,
+    counts and the catalog of every object's columns). Returns the workload.json dict.
+    """
+    n_objects = PRESETS[size] if isinstance(size, str) else int(size)
+    if n_objects < 2:
+        raise ValueError("a workload needs at least 2 objects")
+    rng = random.Random(seed)
+    weights = dict(DEFAULT_KIND_WEIGHTS, **(kind_weights or {}))
+    kinds = [k for k in VIEW_KINDS if weights.get(k, 0) > 0]
+    kind_w = [weights[k] for k in kinds]
+    n_tables = min(n_objects - 1, max(1, round(n_objects * table_frac)))
+    n_views = n_objects - n_tables
+    levels = max(1, min(levels, n_views))
+    os.makedirs(out_dir, exist_ok=True)
+
+    catalog, truth = {}, []
+    by_level = [[]]
+    table_sql = []
+    for i in range(n_tables):
+        tname = f"raw_table_{i}"
+        cols = list(dict.fromkeys(make_table_columns(i, rng.randint(*cols_range), rng)))
+        catalog[tname] = cols
+        by_level[0].append(tname)
+        table_sql.append(f"CREATE TABLE {tname} (\n  " + ",\n  ".join(f"{c} INTEGER" for c in cols) + "\n);\n")
+
+    view_sql, notebook_sql = [], []
+    kind_counts = dict.fromkeys(kinds, 0)
+    for v in range(n_views):
+        level = 1 + v * levels // n_views
+        while len(by_level) <= level:
+            by_level.append([])
+        # the first parent comes from the level just below, so every level adds depth
+        lower = by_level[level - 1]
+        parents = [rng.choice(lower)]
+        kind = rng.choices(kinds, kind_w)[0]
+        if kind == 'join':
+            pool = by_level[rng.randrange(level)]
+            other = rng.choice(pool)
+            if other == parents[0]:
+                kind = 'select'
+            else:
+                parents.append(other)
+        vname = f"view_{v}"
+        sql, pairs, out_cols = _view_statement(rng, kind, v, vname, parents, catalog)
+        kind_counts[kind] += 1
+        catalog[vname] = out_cols
+        by_level[level].append(vname)
+        truth.extend(pairs)
+        (notebook_sql if rng.random() < notebook_frac else view_sql).append(sql)
+
+    n_files = 0
+    for kind, stmts in (('tables', table_sql), ('views', view_sql)):
+        for f_idx, start in enumerate(range(0, len(stmts), objects_per_file)):
+            d = os.path.join(out_dir, _shard(kind, f_idx))
+            os.makedirs(d, exist_ok=True)
+            with open(os.path.join(d, f"{kind[:-1]}_{f_idx}.sql"), 'w', encoding='utf-8') as f:
+                f.write("\n".join(stmts[start:start + objects_per_file]))
+            n_files += 1
+    n_notebooks = 0
+    for f_idx, start in enumerate(range(0, len(notebook_sql), objects_per_file)):
+        d = os.path.join(out_dir, _shard('notebooks', f_idx))
+        os.makedirs(d, exist_ok=True)
+        with open(os.path.join(d, f"notebook_{f_idx}.ipynb"), 'w', encoding='utf-8') as f:
+            json.dump(_notebook_json(notebook_sql[start:start + objects_per_file]), f, indent=1)
+        n_notebooks += 1
+
+    with open(os.path.join(out_dir, 'ground_truth.json'), 'w', encoding='utf-8') as f:
+        json.dump(truth, f)
+    meta = {'size': size, 'seed': seed, 'n_objects': n_objects, 'n_tables': n_tables, 'n_views': n_views,
+            'levels': len(by_level) - 1, 'notebook_frac': notebook_frac, 'objects_per_file': objects_per_file,
+            'n_sql_files': n_files, 'n_notebooks': n_notebooks, 'n_truth_edges': len(truth),
+            'view_kinds': kind_counts, 'catalog': catalog}
+    with open(os.path.join(out_dir, 'workload.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    if verbose:
+        print(f"[+] Generated {size} workload at {out_dir}: {n_tables} tables, {n_views} views "
+              f"over {meta['levels']} levels, {n_files} SQL files, {n_notebooks} notebooks.")
+    return meta
+
 if __name__ == '__main__':
-    gen_project('examples/demo_project', n_tables=4, cols_range=(3,5), n_views=4)
+    ap = argparse.ArgumentParser(description="Generate a synthetic lineage project")
+    ap.add_argument('out_dir', nargs='?', default='examples/demo_project')
+    ap.add_argument('--n_tables', type=int, default=4)
+    ap.add_argument('--n_views', type=int, default=4)
+    ap.add_argument('--preset', help=f"scalable workload size: one of {', '.join(PRESETS)} or a number of objects")
+    ap.add_argument('--seed', type=int, default=None)
+    ap.add_argument('--levels', type=int, default=4)
+    ap.add_argument('--notebook_frac', type=float, default=0.0)
+    ap.add_argument('--objects_per_file', type=int, default=1)
+    args = ap.parse_args()
+    if args.preset:
+        size = args.preset if args.preset in PRESETS else int(args.preset)
+        gen_workload(args.out_dir, size, seed=0 if args.seed is None else args.seed, levels=args.levels,
+                     notebook_frac=args.notebook_frac, objects_per_file=args.objects_per_file)
+    else:
+        gen_project(args.out_dir, n_tables=args.n_tables, cols_range=(3, 5), n_views=args.n_views, seed=args.seed)
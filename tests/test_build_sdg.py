@@ -0,0 +1,45 @@
+import random
+from src.tools.gen_synthetic import gen_project
+from src.sl_core.build_sdg import process_workspace
+
+def _edges(store):
+    return [(u, v, d['prob'], [e['artifact'] for e in d['evidence']]) for u, v, d in store.G.edges(data=True)]
+
+def test_parallel_matches_serial(tmp_path):
+    random.seed(7)
+    gen_project(str(tmp_path), n_tables=4, cols_range=(3, 5), n_views=6)
+    serial = process_workspace(str(tmp_path))
+    parallel = process_workspace(str(tmp_path), workers=2)
+    assert serial.G.number_of_edges() > 0
+    assert list(serial.G.nodes()) == list(parallel.G.nodes())
+    assert _edges(serial) == _edges(parallel)
+
+def test_incremental_cache_matches_full_rebuild(tmp_path):
+    random.seed(11)
+    ws = tmp_path / 'ws'
+    gen_project(str(ws), n_tables=3, cols_range=(3, 4), n_views=4)
+    cache = str(tmp_path / 'cache.json')
+    store = process_workspace(str(ws), cache_path=cache)
+    (ws / 'view_0.sql').unlink()
+    (ws / 'view_1.sql').write_text("CREATE VIEW view_1 AS SELECT raw_table_0.amount AS amount FROM raw_table_0;")
+    process_workspace(str(ws), cache_path=cache, store=store)
+    full = process_workspace(str(ws))
+    replayed = process_workspace(str(ws), cache_path=cache)
+    assert sorted(store.G.edges()) == sorted(full.G.edges()) == sorted(replayed.G.edges())
+    assert sorted(store.G.nodes()) == sorted(full.G.nodes())
+    for u, v, d in full.G.edges(data=True):
+        assert abs(store.G[u][v]['prob'] - d['prob']) < 1e-12
+
+def test_incremental_retracts_deleted_artifacts_without_cache_entries(tmp_path):
+    random.seed(13)
+    ws = tmp_path / 'ws'
+    gen_project(str(ws), n_tables=3, cols_range=(3, 4), n_views=4)
+    cache = tmp_path / 'cache.json'
+    for compact in (False, True):
+        store = process_workspace(str(ws), cache_path=str(cache), compact=compact)
+        (ws / 'view_0.sql').rename(tmp_path / 'view_0.sql')
+        cache.write_text('not json')  # an unreadable cache knows nothing about the deleted file
+        process_workspace(str(ws), cache_path=str(cache), store=store)
+        assert str(ws / 'view_0.sql') not in store.artifact_ids()
+        assert sorted(store.G.edges()) == sorted(process_workspace(str(ws)).G.edges())
+        (tmp_path / 'view_0.sql').rename(ws / 'view_0.sql')
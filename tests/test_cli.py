@@ -0,0 +1,35 @@
+import json
+import subprocess
+import sys
+
+from src.sl_core.cli import main
+from src.tools.gen_synthetic import gen_project
+
+HEAVY = ('pandas', 'numpy', 'networkx', 'duckdb', 'nbformat')
+IMPORT_BUDGET_S = 0.6
+
+def _cold_import(stmt):
+    code = (f"import sys, time; t = time.perf_counter(); {stmt}; dt = time.perf_counter() - t; "
+            f"import json; print(json.dumps([dt, sorted(m for m in {HEAVY!r} + ('sqlglot',) if m in sys.modules)]))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+def test_cold_start_budget():
+    dt, loaded = _cold_import('import src.sl_core.build_sdg')
+    assert loaded == ['sqlglot'] and dt < IMPORT_BUDGET_S
+    # query/export never need the SQL parser
+    dt, loaded = _cold_import('import src.sl_core.cli, src.sl_core.lineage_query, src.sl_core.sdg_io, src.sl_core.dynamic_probe')
+    assert loaded == [] and dt < IMPORT_BUDGET_S
+
+def test_build_query_export(tmp_path, capsys):
+    gen_project(str(tmp_path / 'ws'), n_tables=2, cols_range=(3, 4), n_views=2, seed=0)
+    sdg = str(tmp_path / 'sdg.ndjson')
+    assert main(['build', str(tmp_path / 'ws'), '--out', sdg]) == 0
+    edges = [json.loads(l) for l in open(sdg, encoding='utf-8') if '"edge"' in l]
+    src = edges[0]['src']
+    assert main(['export', sdg, str(tmp_path / 'pq'), '--format', 'parquet']) == 0
+    capsys.readouterr()
+    assert main(['query', str(tmp_path / 'pq'), src, '--json']) == 0
+    down = json.loads(capsys.readouterr().out)[src]
+    assert {e['tgt'] for e in edges if e['src'] == src} <= set(down)
+    assert main(['query', sdg, 'no_such.column']) == 1
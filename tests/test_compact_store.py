@@ -0,0 +1,59 @@
+import random
+from src.tools.gen_synthetic import gen_project
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.compact_store import CompactSDGStore
+
+def _edges(G):
+    return sorted((u, v, d['prob'], [e['artifact'] for e in d['evidence']]) for u, v, d in G.edges(data=True))
+
+def test_compact_store_matches_sdgstore(tmp_path):
+    random.seed(3)
+    gen_project(str(tmp_path), n_tables=4, cols_range=(3, 5), n_views=6)
+    ref = process_workspace(str(tmp_path))
+    compact = process_workspace(str(tmp_path), compact=True)
+    assert compact.compacted
+    assert sorted(compact.G.nodes()) == sorted(ref.G.nodes())
+    assert _edges(compact.to_networkx()) == _edges(ref.G)
+
+    drop = str(tmp_path / 'view_0.sql')
+    ref.remove_artifacts([drop])
+    compact.remove_artifacts([drop])
+    assert sorted(compact.G.nodes()) == sorted(ref.G.nodes())
+    assert _edges(compact.G) == _edges(ref.G)
+
+    path = str(tmp_path / 'sdg.json')
+    compact.persist_json(path)
+    loaded = CompactSDGStore()
+    loaded.load_json(path)
+    assert _edges(loaded.G) == _edges(ref.G)
+    u, v = next(iter(ref.G.edges()))
+    assert (v, ref.G[u][v]['prob']) in loaded.successors(u)
+    assert (u, ref.G[u][v]['prob']) in loaded.predecessors(v)
+
+def test_put_node_invalidates_views():
+    from src.sl_core.lineage_query import LineageIndex
+    store = CompactSDGStore()
+    store.add_edge('t.a', 'v.a', 0.5, artifact_id='x.sql', timestamp='ts')
+    idx = LineageIndex(store)
+    assert 'iso.c' not in store.G
+    version = store.version
+    store.put_node('iso.c')
+    assert store.version > version and 'iso.c' in store.G
+    assert idx.downstream_set('iso.c') == set() and 'iso.c' in idx.ids
+    store.put_node('iso.c')
+    assert store.version == version + 1
+
+def test_remove_artifacts_node_parity():
+    from src.sl_core.graph_store import SDGStore
+    stores = [SDGStore(), CompactSDGStore()]
+    for store in stores:
+        store.put_node('iso.a')
+        store.add_edge('t.a', 'v.a', 0.5, artifact_id='x.sql', timestamp='ts')
+        store.add_edge('t.a', 'v.b', 0.5, artifact_id='y.sql', timestamp='ts')
+        store.add_edge('t.b', 'v.b', 0.5, artifact_id='y.sql', timestamp='ts')
+        store.put_node('iso.b')
+        store.remove_artifacts(['y.sql'])
+    ref, compact = stores
+    assert sorted(compact.nodes()) == sorted(ref.nodes()) == ['iso.a', 'iso.b', 't.a', 'v.a']
+    assert _edges(compact.G) == _edges(ref.G)
+    assert compact.successors('t.a') == [('v.a', 0.5)]
@@ -0,0 +1,70 @@
+import csv
+import json
+import time
+
+import pytest
+
+from src.tools.gen_synthetic import gen_project
+from src.tools.corpus_runner import run_corpus, load_checkpoint, RepoTimeout, _time_limit
+
+def test_corpus_run_resumes_from_checkpoint(tmp_path):
+    root = tmp_path / 'public_repos'
+    for i in range(3):
+        gen_project(str(root / f'repo{i}'), n_tables=2, cols_range=(3, 4), n_views=2, seed=i)
+    (root / 'repo0' / 'data.csv').write_text("customer_id,amount\n1,10\n2,20\n", encoding='utf-8')
+    out = tmp_path / 'runs'
+
+    agg = run_corpus(str(root), run='r1', out_root=str(out), workers=2, max_repos=2, timeout_s=120)
+    assert agg['repos_processed'] == 2 and not agg['repos_failed']
+    run_dir = out / 'r1'
+    assert len(load_checkpoint(str(run_dir))) == 2
+    first = {r['repo']: r for r in agg['per_repo']}
+    assert all(r['parse_time_s'] is not None for r in first.values())
+    assert (run_dir / 'repos' / 'repo0' / 'sdg_with_probes.json').exists()
+
+    # a second invocation only processes the repo that is still missing
+    agg = run_corpus(str(root), run='r1', out_root=str(out), workers=2, timeout_s=120)
+    assert agg['repos_processed'] == 3
+    with open(run_dir / 'checkpoint.jsonl', encoding='utf-8') as f:
+        assert sorted(json.loads(l)['repo'] for l in f) == ['repo0', 'repo1', 'repo2']
+    with open(run_dir / 'corpus_summary_with_probes.csv', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(r['repo'] for r in rows) == ['repo0', 'repo1', 'repo2']
+    assert all(r['status'] == 'ok' and r['parse_time_s'] for r in rows)
+
+def test_time_limit():
+    with pytest.raises(RepoTimeout):
+        with _time_limit(0.05):
+            time.sleep(1)
+
+def test_csv_rows_land_in_live_file_between_rewrites(tmp_path, monkeypatch):
+    from src.tools import corpus_runner
+    root = tmp_path / 'public_repos'
+    for i in range(3):
+        gen_project(str(root / f'repo{i}'), n_tables=1, cols_range=(2, 3), n_views=1, seed=i)
+    seen = []
+    real = corpus_runner.write_summary
+
+    def spy(run_dir, records, meta=None):
+        # rows visible in the live CSV just before each rewrite
+        path = tmp_path / 'runs' / 'r' / 'corpus_summary_with_probes.csv'
+        if path.exists():
+            with open(path, encoding='utf-8') as f:
+                seen.append(len(list(csv.DictReader(f))))
+        return real(run_dir, records, meta)
+
+    monkeypatch.setattr(corpus_runner, 'write_summary', spy)
+    run_corpus(str(root), run='r', out_root=str(tmp_path / 'runs'), workers=1, timeout_s=120, probe=False, summary_every=2)
+    assert seen == [2, 3]
+
+def test_timeout_is_not_swallowed_by_build(tmp_path):
+    from src.tools.gen_synthetic import gen_workload
+    from src.tools.corpus_runner import run_repo
+    ws = tmp_path / 'ws'
+    gen_workload(str(ws), 'medium', seed=1, verbose=False)
+    # land the alarm at different points of the build: parsing, resolving, storing
+    for limit in (0.05, 0.15, 0.3):
+        t0 = time.perf_counter()
+        rec = run_repo(str(ws), str(tmp_path / 'out'), timeout_s=limit, probe=False)
+        assert rec['status'] == 'timeout', (limit, rec.get('error'))
+        assert time.perf_counter() - t0 < limit + 0.5
@@ -0,0 +1,127 @@
+import json
+
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.dbt_render import clear_render_cache, render_sql, render_template
+
+FILES = {
+    'dbt_project.yml': """name: 'jaffle_shop'
+version: '1.0.0'
+model-paths: ["models"]
+target-path: "target"
+""",
+    'models/staging/stg_orders.sql': """{{ config(materialized='view') }}
+
+with source as (
+    select * from {{ source('jaffle', 'raw_orders') }}
+),
+renamed as (
+    select id as order_id, user_id as customer_id, order_date, status
+    from source
+)
+select * from renamed
+""",
+    'models/staging/stg_payments.sql': """with source as (
+    select * from {{ source('jaffle', 'raw_payments') }}
+)
+select
+    id as payment_id,
+    order_id,
+    payment_method,
+    -- amount is stored in cents
+    {{ cents_to_dollars('amount') }} as amount
+from source
+""",
+    'models/orders.sql': """{{ config(materialized='incremental', alias='fct_orders') }}
+{% set payment_methods = ['credit_card', 'coupon', 'bank_transfer'] %}
+
+with orders as (
+    select * from {{ ref('stg_orders') }}
+),
+payments as (
+    select * from {{ ref('stg_payments') }}
+),
+order_payments as (
+    select
+        order_id,
+        {% for payment_method in payment_methods -%}
+        sum(case when payment_method = '{{ payment_method }}' then amount else 0 end) as {{ payment_method }}_amount,
+        {% endfor -%}
+        sum(amount) as total_amount
+    from payments
+    group by order_id
+)
+select
+    orders.order_id,
+    orders.customer_id,
+    {% for payment_method in payment_methods -%}
+    order_payments.{{ payment_method }}_amount,
+    {% endfor -%}
+    order_payments.total_amount as amount
+from orders
+left join order_payments on orders.order_id = order_payments.order_id
+{% if is_incremental() %}
+where orders.order_date > (select max(order_date) from {{ this }})
+{% endif %}
+""",
+    'macros/cents_to_dollars.sql': """{% macro cents_to_dollars(column_name) -%}
+    ({{ column_name }} / 100)::numeric(16, 2)
+{%- endmacro %}
+""",
+    'tests/assert_positive_total.sql': "select order_id from {{ ref('orders') }} where amount < 0\n",
+}
+
+def _project(root):
+    for name, text in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+    return root
+
+def _edges(store):
+    return {(u, v) for u, v, _, _ in store.iter_edges()}
+
+def test_render_template_offline():
+    sql, config = render_template(FILES['models/orders.sql'], 'orders')
+    assert config['alias'] == 'fct_orders'
+    assert 'stg_orders' in sql and '{{' not in sql and '{%' not in sql
+    assert sql.count('_amount,') == 6 and 'coupon_amount' in sql
+    # is_incremental() is false offline: full-refresh SQL only
+    assert 'max(order_date)' not in sql
+    sql, _ = render_template("select {{ var('day', '2020-01-01') }} as d, {{ my_macro() }} as x from {{ unknown.relation }}", 'm')
+    assert sql == "select 2020-01-01 as d, NULL as x from unknown_relation"
+
+def test_dbt_project_renders_into_lineage(tmp_path):
+    clear_render_cache()
+    root = _project(tmp_path / 'jaffle')
+    store = process_workspace(str(root), metrics=True)
+    c = store.metrics.counters
+    assert c['dbt_rendered'] == 3 and c['dbt_skipped'] == 2 and not c.get('statements_failed')
+    edges = _edges(store)
+    assert ('raw_orders.user_id', 'stg_orders.customer_id') in edges
+    assert ('raw_payments.amount', 'stg_payments.amount') in edges
+    assert ('stg_payments.amount', 'fct_orders.coupon_amount') in edges
+    assert ('stg_orders.order_id', 'fct_orders.order_id') in edges
+    # macros and data tests are not models
+    assert not [e for e in edges if 'column_name' in e[0] or e[1].startswith('orders.')]
+
+def test_manifest_compiled_code_wins(tmp_path):
+    clear_render_cache()
+    root = _project(tmp_path / 'jaffle')
+    cache = str(tmp_path / 'cache.json')
+    store = process_workspace(str(root), cache_path=cache)
+    assert ('raw_orders.status', 'stg_orders.status') in _edges(store)
+    manifest = {'nodes': {'model.jaffle_shop.stg_orders': {
+        'resource_type': 'model', 'package_name': 'jaffle_shop', 'name': 'stg_orders', 'alias': 'stg_orders',
+        'original_file_path': 'models/staging/stg_orders.sql',
+        'compiled_code': 'select id as order_id, status as order_status from "db"."raw"."raw_orders"'}}}
+    (root / 'target').mkdir()
+    (root / 'target' / 'manifest.json').write_text(json.dumps(manifest), encoding='utf-8')
+    path = str(root / 'models' / 'staging' / 'stg_orders.sql')
+    sql = render_sql(path, FILES['models/staging/stg_orders.sql'])
+    assert sql.startswith('CREATE VIEW stg_orders AS select id as order_id')
+    # a recompile invalidates the cached entries even though the model file is unchanged
+    store = process_workspace(str(root), cache_path=cache, metrics=True)
+    assert store.metrics.counters['dbt_compiled'] == 1
+    edges = _edges(store)
+    assert ('raw_orders.status', 'stg_orders.order_status') in edges
+    assert ('raw_orders.status', 'stg_orders.status') not in edges
@@ -0,0 +1,17 @@
+import pandas as pd
+from src.sl_core.dynamic_probe import ProbeEngine, probe_cooccurrence_from_query
+
+def _reference(df, left, right):
+    set_right = set(df[right].dropna().unique())
+    return float(df[left].dropna().apply(lambda v: v in set_right).sum()) / max(1, len(df))
+
+def test_probe_many_matches_python_containment():
+    df = pd.DataFrame({'a': [1, 2, 3, None, 5, 6], 'b': [2, 3, 4, 5, None, 9], 's': list('xyzxyz')})
+    engine = ProbeEngine(threads=1)
+    engine.register('t', df)
+    res = engine.probe_many('SELECT * FROM t', [('a', 'b'), ('b', 'a'), ('a', 'a'), ('a', 's')])
+    assert list(res['containment'][:3]) == [_reference(df, 'a', 'b'), _reference(df, 'b', 'a'), _reference(df, 'a', 'a')]
+    assert pd.isna(res['containment'][3])  # INTEGER vs VARCHAR: isolated failure
+    assert engine.probe('SELECT * FROM t WHERE a > 100', 'a', 'b') == 0.0
+    assert probe_cooccurrence_from_query("SELECT * FROM (VALUES (1, 1), (2, 3)) v(x, y)", 'x', 'y') == 0.5
+    assert probe_cooccurrence_from_query("SELECT * FROM missing_table", 'x', 'y') is None
@@ -0,0 +1,63 @@
+from src.sl_core.graph_store import SDGStore
+
+def test_sqlite_roundtrip_and_queries(tmp_path):
+    db = str(tmp_path / 'sdg.sqlite3')
+    store = SDGStore(db, batch_size=2)
+    store.add_edge('t.a', 'v.a', 0.5, artifact_id='x.sql', timestamp='ts')
+    store.add_edge('t.a', 'v.a', 0.5, artifact_id='y.sql', timestamp='ts')
+    store.add_edge('t.b', 'v.b', 0.9, artifact_id='y.sql', timestamp='ts')
+    store.flush()
+    assert store.query_sqlite('t.a') == [('v.a', store.G['t.a']['v.a']['prob'])]
+    assert store.query_sqlite('v.b', direction='upstream') == [('t.b', 0.9)]
+
+    store.remove_artifacts(['y.sql'])
+    loaded = SDGStore()
+    loaded.load_sqlite(db)
+    assert sorted(loaded.G.edges()) == sorted(store.G.edges()) == [('t.a', 'v.a')]
+    assert loaded.G['t.a']['v.a']['prob'] == 0.5
+    assert [e['artifact'] for e in loaded.G['t.a']['v.a']['evidence']] == ['x.sql']
+    assert sorted(loaded.G.nodes()) == ['t.a', 'v.a']
+    store.close()
+
+def _snapshot(store):
+    return sorted((u, v, round(p, 9), len(ev)) for u, v, p, ev in store.iter_edges())
+
+def test_rebuild_into_same_database(tmp_path):
+    from src.sl_core.build_sdg import process_workspace
+    ws = tmp_path / 'ws'
+    ws.mkdir()
+    (ws / 'a.sql').write_text('CREATE VIEW v AS SELECT id, amount FROM t;')
+    (ws / 'b.sql').write_text('CREATE VIEW w AS SELECT id FROM t;\nCREATE VIEW v2 AS SELECT id, amount FROM t;')
+    db = str(tmp_path / 'sdg.sqlite3')
+    first = process_workspace(str(ws), sqlite_db=db)
+    first.close()
+    (ws / 'b.sql').unlink()
+    expected = _snapshot(process_workspace(str(ws)))
+    for _ in range(2):
+        store = process_workspace(str(ws), sqlite_db=db)
+        store.close()
+        loaded = SDGStore()
+        loaded.load_sqlite(db)
+        assert _snapshot(loaded) == _snapshot(store) == expected
+
+def test_legacy_database_is_migrated(tmp_path):
+    import json
+    import sqlite3
+    import pytest
+    db = str(tmp_path / 'legacy.sqlite3')
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE edges (src TEXT, tgt TEXT, prob REAL, evidence TEXT, ts TEXT)')
+    for src, tgt, score, art in [('t.a', 'v.a', 0.5, 'x.sql'), ('t.a', 'v.a', 0.5, 'y.sql'), ('t.b', 'v.b', 0.9, 'y.sql')]:
+        conn.execute('INSERT INTO edges VALUES (?,?,?,?,?)',
+                     (src, tgt, score, json.dumps([{'artifact': art, 'score': score, 'ts': 'ts'}]), 'ts'))
+    conn.commit()
+    conn.close()
+    store = SDGStore(db)
+    store.load_sqlite()
+    assert store.G['t.a']['v.a']['prob'] == 0.75
+    assert [e['artifact'] for e in store.G['t.a']['v.a']['evidence']] == ['x.sql', 'y.sql']
+    assert store.query_sqlite('v.b', direction='upstream') == [('t.b', 0.9)]
+    assert 'edges_legacy' not in {r[0] for r in store.conn.execute("SELECT name FROM sqlite_master")}
+    store.close()
+    with pytest.raises(ValueError):
+        SDGStore().load_sqlite()
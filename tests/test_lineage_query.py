@@ -0,0 +1,53 @@
+import networkx as nx
+from src.sl_core.graph_store import SDGStore
+from src.sl_core.lineage_query import LineageIndex
+
+def _store():
+    store = SDGStore()
+    for src, tgt, p in [('raw.amount', 'stg.amount', 0.9), ('stg.amount', 'fct.total', 0.5),
+                        ('raw.amount', 'fct.total', 0.2), ('fct.total', 'rpt.total', 1.0),
+                        ('raw.id', 'stg.id', 1.0), ('a.x', 'b.x', 0.7), ('b.x', 'a.x', 0.7)]:
+        store.add_edge(src, tgt, p, artifact_id='m.sql', timestamp='ts')
+    return store
+
+def test_sets_and_probabilities():
+    idx = LineageIndex(_store())
+    assert idx.downstream_set('raw.amount') == {'stg.amount', 'fct.total', 'rpt.total'}
+    assert idx.upstream_set('rpt.total') == {'raw.amount', 'stg.amount', 'fct.total'}
+    assert idx.downstream_set('a.x') == {'a.x', 'b.x'}
+    assert idx.downstream_many(['raw.amount', 'raw.id']) == {'stg.amount', 'fct.total', 'rpt.total', 'stg.id'}
+    assert not idx.reachable('raw.id', 'fct.total')
+    assert abs(idx.path_prob('raw.amount', 'rpt.total') - 0.45) < 1e-12
+    assert abs(idx.path_prob('raw.amount', 'rpt.total', mode='product') - 0.2) < 1e-12
+    assert idx.downstream('raw.amount', max_depth=1) == {'stg.amount': 0.9, 'fct.total': 0.2}
+    assert set(idx.downstream('raw.amount', min_prob=0.5)) == {'stg.amount'}
+    assert idx.impact(['raw.amount']) == {'fct': ['total'], 'rpt': ['total'], 'stg': ['amount']}
+
+def test_index_matches_networkx_and_tracks_add_edge():
+    store = _store()
+    idx = LineageIndex(store)
+    idx.add_edge('raw.amount', 'rpt.total', 0.3, artifact_id='n.sql', timestamp='ts')
+    assert idx._version == store.version  # implied edge: updated in place
+    idx.add_edge('rpt.total', 'raw.id', 0.5, artifact_id='n.sql', timestamp='ts')
+    store.add_edge('stg.id', 'new.col', 0.5, artifact_id='n.sql', timestamp='ts')
+    for n in store.G.nodes():
+        assert idx.downstream_set(n) - {n} == nx.descendants(store.G, n)
+        assert idx.upstream_set(n) - {n} == nx.ancestors(store.G, n)
+        for m in store.G.nodes():
+            assert idx.reachable(n, m) == (n == m or nx.has_path(store.G, n, m))
+
+def test_cache_is_bounded_by_bytes():
+    import random
+    from src.sl_core.lineage_query import _bits_to_ids
+    rng = random.Random(4)
+    store = SDGStore()
+    for _ in range(600):
+        u, v = sorted(rng.sample(range(300), 2))
+        store.add_edge(f'c{u}', f'c{v}', 0.5, artifact_id='m.sql', timestamp='ts')
+    idx = LineageIndex(store, cache_bytes=64)
+    for n in store.G.nodes():
+        assert idx.downstream_set(n) == nx.descendants(store.G, n)
+        assert idx.upstream_set(n) == nx.ancestors(store.G, n)
+        assert idx._cached_bytes <= 64
+    for ids in ([], [0], [3, 64, 999], list(range(0, 5000, 7)), list(range(100))):
+        assert _bits_to_ids(sum(1 << i for i in ids)) == ids
@@ -0,0 +1,32 @@
+import random
+from src.sl_core.map_columns import name_similarity, NameSimilarityEngine
+
+def test_engine_matches_name_similarity():
+    rng = random.Random(1)
+    words = ['customer', 'id', 'order', 'Amount', 'total', 'qty', 'price', 'x', '', '__']
+    names = ['_'.join(rng.sample(words, rng.randint(1, 3))) for _ in range(60)] + ['', '*', 'CustomerID']
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(400)] + [(None, 'a'), ('a', None)]
+    engine = NameSimilarityEngine(cache_size=50)
+    assert engine.score_pairs(pairs) == [name_similarity(a, b) for a, b in pairs]
+    assert [engine.score(a, b) for a, b in pairs] == [name_similarity(a, b) for a, b in pairs]
+
+def test_blocking_only_scores_shared_tokens():
+    engine = NameSimilarityEngine()
+    left = ['customer_id', 'order_total']
+    right = ['customer_name', 'order_id', 'user_id', 'zip']
+    assert set(engine.candidates(left, right)) == {('customer_id', 'customer_name'), ('customer_id', 'order_id'),
+                                                   ('customer_id', 'user_id'), ('order_total', 'order_id')}
+    assert engine.candidates(left, right, max_block=1) == [('customer_id', 'customer_name'), ('order_total', 'order_id')]
+    assert engine.match(left, right, min_score=0.5, top_k=1) == {'customer_id': [('customer_name', 0.5)],
+                                                                   'order_total': [('order_id', 0.5)]}
+
+def test_token_arrays_grow_across_batches():
+    rng = random.Random(2)
+    engine = NameSimilarityEngine(vectorize_min=1)
+    for b in range(300):
+        # every batch brings names the engine has not seen
+        pairs = [(f'col_{b}_{rng.randrange(50)}', f'{rng.choice(["col", "src"])}_{rng.randrange(50)}_{b % 7}') for _ in range(8)]
+        assert engine.score_pairs(pairs) == [name_similarity(a, c) for a, c in pairs]
+    ptr, data = engine._arrays()
+    assert ptr.tolist() == engine._tok_ptr and data.tolist() == engine._tok_data
+    assert len(engine._ptr_buf) < 4 * len(ptr)
@@ -0,0 +1,39 @@
+import json
+
+from src.tools.gen_synthetic import gen_workload
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.metrics import BuildMetrics, NULL_METRICS
+
+def test_build_metrics_serial_and_parallel(tmp_path):
+    ws = tmp_path / 'ws'
+    gen_workload(str(ws), 'tiny', seed=3, notebook_frac=0.3, verbose=False)
+    (ws / 'broken.sql').write_text("CREATE VIEW bad AS SELECT FROM WHERE;\nSET x = 1;", encoding='utf-8')
+
+    assert process_workspace(str(ws)).metrics is NULL_METRICS
+    serial = process_workspace(str(ws), metrics=True).metrics
+    c = serial.counters
+    assert c['statements_failed'] == 1 and c['statements_skipped'] >= 1
+    assert c['edges_emitted'] == c['edges_stored'] > 0
+    assert c['artifacts'] == len(serial.artifacts) and c['bytes_read'] > 0
+    assert {'glob', 'read', 'parse', 'extract', 'map', 'score', 'store'} <= set(serial.stages)
+    assert len(serial.slowest(3)) == 3
+
+    parallel = process_workspace(str(ws), workers=2, metrics=True).metrics
+    assert parallel.counters == serial.counters
+    assert set(parallel.artifacts) == set(serial.artifacts)
+
+    serial.dump_json(str(tmp_path / 'metrics.json'))
+    with open(tmp_path / 'metrics.json', encoding='utf-8') as f:
+        dumped = json.load(f)
+    assert dumped['counters']['edges_stored'] == c['edges_stored'] and dumped['parse_time_s'] > 0
+
+def test_profile_hooks(tmp_path):
+    m = BuildMetrics(profile='tracemalloc')
+    with m.stage('alloc'):
+        blob = [0] * 100000
+    m.close()
+    assert m.stage_peak_bytes['alloc'] >= 100000 * 8 and blob
+    m = BuildMetrics(profile='cprofile')
+    with m.stage('work'):
+        sorted(range(1000), key=lambda x: -x)
+    assert 'sorted' in m.profile_stats()
@@ -0,0 +1,54 @@
+import json
+
+from src.sl_core.parser_notebook import extract_cells_from_notebook, scan_code_cells, scan_code_chunks
+
+def _write_nb(path, cells):
+    nb = {'cells': cells, 'metadata': {'widgets': {'state': {'x': [1, {'y': '"}]'}]}}},
+          'nbformat': 4, 'nbformat_minor': 5}
+    path.write_text(json.dumps(nb, indent=1), encoding='utf-8')
+    return str(path)
+
+def test_scanner_skips_outputs_and_extracts_all_calls(tmp_path):
+    big_output = {'output_type': 'stream', 'name': 'stdout', 'text': ['{"not": [json}\n'] * 1000}
+    cells = [
+        {'cell_type': 'markdown', 'metadata': {}, 'source': ['spark.sql("SELECT 1")']},
+        {'cell_type': 'code', 'metadata': {}, 'execution_count': 1, 'outputs': [big_output],
+         'source': ['a = spark.sql("""CREATE VIEW v AS\n', 'SELECT id FROM t""")\n',
+                    "b = pd.read_sql('SELECT x FROM y', con)\n"]},
+        {'cell_type': 'code', 'metadata': {}, 'execution_count': None, 'outputs': [],
+         'source': '%%sql\nCREATE VIEW w AS SELECT id FROM v'},
+    ]
+    nb_path = _write_nb(tmp_path / 'nb.ipynb', cells)
+    with open(nb_path, encoding='utf-8') as f:
+        assert [i for i, _ in scan_code_cells(f.read())] == [1, 2]
+    out = extract_cells_from_notebook(nb_path)
+    assert [(c['cell_index'], c['content']) for c in out] == [
+        (1, 'CREATE VIEW v AS\nSELECT id FROM t'),
+        (1, 'SELECT x FROM y'),
+        (2, 'CREATE VIEW w AS SELECT id FROM v'),
+    ]
+
+def test_legacy_notebook_falls_back_to_nbformat(tmp_path):
+    import nbformat
+    nb = nbformat.v3.new_notebook()
+    ws = nbformat.v3.new_worksheet()
+    ws.cells.append(nbformat.v3.new_code_cell(input='spark.sql("SELECT 1")'))
+    nb.worksheets.append(ws)
+    # v3 notebooks keep cells under worksheets, which the v4 scanner rejects
+    path = tmp_path / 'nb.ipynb'
+    path.write_text(nbformat.v3.writes_json(nb), encoding='utf-8')
+    assert extract_cells_from_notebook(str(path))[0]['content'] == 'SELECT 1'
+
+def test_streaming_scan_matches_across_chunk_boundaries(tmp_path):
+    cells = [
+        {'cell_type': 'code', 'metadata': {'tags': ['x"y']}, 'outputs': [{'text': ['a\\"b' * 50, '"]}' * 20]}],
+         'source': ['q = "SELECT \\"a\\" FROM t"\n', 'spark.sql("SELECT 1")']},
+        {'cell_type': 'markdown', 'metadata': {}, 'source': '{"cells": []}'},
+        {'source': 'x = 1', 'cell_type': 'code', 'outputs': [], 'metadata': {}},
+    ]
+    with open(_write_nb(tmp_path / 'nb.ipynb', cells), encoding='utf-8') as f:
+        text = f.read()
+    expected = [(0, ''.join(cells[0]['source'])), (2, 'x = 1')]
+    assert scan_code_cells(text) == expected
+    for size in (1, 2, 3, 5, 64):
+        assert scan_code_chunks(text[k:k + size] for k in range(0, len(text), size)) == expected
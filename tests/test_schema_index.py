@@ -0,0 +1,54 @@
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.parser_sql import declared_columns, split_statements
+
+def _write(ws, name, sql):
+    (ws / name).write_text(sql, encoding='utf-8')
+
+def _edges(store):
+    return sorted((u, v) for u, v, _, _ in store.iter_edges())
+
+def _workspace(ws):
+    ws.mkdir()
+    # file order is the reverse of dependency order
+    _write(ws, 'a_report.sql', "CREATE VIEW report AS SELECT * FROM enriched;\n"
+                               "INSERT INTO archive SELECT order_id, region FROM enriched;")
+    _write(ws, 'b_enriched.sql', "CREATE VIEW enriched AS\nWITH o AS (SELECT * FROM orders)\n"
+                                 "SELECT o.*, region FROM o JOIN customers c ON o.customer_id = c.id;")
+    _write(ws, 'c_tables.sql', "CREATE TABLE orders (order_id INT, customer_id INT);\n"
+                               "CREATE TABLE customers (id INT, region VARCHAR(20), PRIMARY KEY (id));\n"
+                               "CREATE TABLE archive (archived_id INT, archived_region VARCHAR);")
+
+def test_declared_columns_fast_path():
+    stmt = split_statements("CREATE TABLE IF NOT EXISTS s.t (a INT, b DECIMAL(10, 2), CONSTRAINT pk PRIMARY KEY (a))")[0]
+    assert declared_columns(stmt) == ('t', ['a', 'b'])
+    assert declared_columns("CREATE TABLE t AS SELECT * FROM u") is None
+    assert declared_columns('CREATE TABLE "t" (a INT)') is None
+
+def test_stars_and_bare_columns_resolve_through_the_workspace(tmp_path):
+    _workspace(tmp_path / 'ws')
+    store = process_workspace(str(tmp_path / 'ws'), compact=True)
+    assert store.schema_index.tables['report'] == ['order_id', 'customer_id', 'region']
+    edges = _edges(store)
+    assert ('orders.customer_id', 'enriched.customer_id') in edges
+    assert ('customers.region', 'enriched.region') in edges
+    assert ('enriched.region', 'report.region') in edges
+    # INSERT maps by position onto the declared columns of its target
+    assert ('enriched.region', 'archive.archived_region') in edges
+    assert not [e for e in edges if '*' in e[0] or '*' in e[1]]
+
+def test_incremental_build_follows_upstream_schema_changes(tmp_path):
+    ws = tmp_path / 'ws'
+    _workspace(ws)
+    cache = str(tmp_path / 'cache.json')
+    store = process_workspace(str(ws), cache_path=cache)
+    _write(ws, 'c_tables.sql', "CREATE TABLE orders (order_id INT, customer_id INT, amount INT);\n"
+                               "CREATE TABLE customers (id INT, region VARCHAR(20));\n"
+                               "CREATE TABLE archive (archived_id INT, archived_region VARCHAR);")
+    process_workspace(str(ws), cache_path=cache, store=store, metrics=True)
+    assert store.metrics.counters.get('artifacts_cached', 0) == 0
+    assert ('enriched.amount', 'report.amount') in _edges(store)
+    assert _edges(store) == _edges(process_workspace(str(ws)))
+    # nothing changed: every artifact replays from the cache without parsing
+    rerun = process_workspace(str(ws), cache_path=cache, metrics=True)
+    assert rerun.metrics.counters['artifacts_cached'] == 3 and 'statements' not in rerun.metrics.counters
+    assert _edges(rerun) == _edges(store)
@@ -0,0 +1,31 @@
+import os
+import random
+from src.tools.gen_synthetic import gen_project
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.compact_store import CompactSDGStore
+from src.sl_core import sdg_io
+
+def _edges(store):
+    return sorted((u, v, p, [e['artifact'] for e in ev]) for u, v, p, ev in store.iter_edges())
+
+def test_ndjson_and_parquet_roundtrip(tmp_path):
+    random.seed(5)
+    gen_project(str(tmp_path / 'ws'), n_tables=3, cols_range=(3, 4), n_views=4)
+    store = process_workspace(str(tmp_path / 'ws'))
+    nd = str(tmp_path / 'sdg.ndjson.gz')
+    pq = str(tmp_path / 'sdg_parquet')
+    sdg_io.write_ndjson(store, nd)
+    sdg_io.write_parquet(store, pq, chunk_size=7)
+    assert _edges(sdg_io.read_ndjson(nd)) == _edges(store)
+    assert _edges(sdg_io.read_parquet(pq, CompactSDGStore())) == _edges(store)
+    assert list(sdg_io.load_sdg(pq).nodes()) == list(store.nodes())
+    assert len(sdg_io.read_sdg(nd)['edges']) == store.G.number_of_edges()
+    con = sdg_io.connect_parquet(pq)
+    assert con.execute('SELECT count(*) FROM lineage').fetchone()[0] == store.G.number_of_edges()
+
+    # one part file per chunk; a re-export replaces the previous parts
+    n_edges = store.G.number_of_edges()
+    assert len(os.listdir(os.path.join(pq, 'edges'))) == -(-n_edges // 7)
+    sdg_io.write_parquet(store, pq, chunk_size=10 ** 6)
+    assert os.listdir(os.path.join(pq, 'edges')) == ['part-00000.parquet']
+    assert _edges(sdg_io.read_parquet(pq)) == _edges(store)
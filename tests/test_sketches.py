@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+from src.sl_core.sketches import ColumnSketch, SketchStore
+
+def test_estimates_within_documented_bounds(tmp_path):
+    a = np.arange(0, 20000)
+    b = np.arange(10000, 40000)
+    sa, sb = ColumnSketch().update(a), ColumnSketch().update(pd.Series(b, dtype='float64'))
+    assert abs(sa.cardinality() - 20000) < 4 * 20000 * sa.cardinality_rel_stderr()
+    true_j = 10000 / 40000
+    assert abs(sa.jaccard(sb) - true_j) < 4 * np.sqrt(true_j * (1 - true_j) / 128)
+    assert abs(sa.containment(sb) - 0.5) < 0.15
+    assert ColumnSketch().update(['x', 'y']).containment(ColumnSketch().update([1, 2])) == 0.0
+
+    store = SketchStore()
+    store.add_dataframe(pd.DataFrame({'id': a[:500], 'name': [f"n{i}" for i in range(500)]}), 'raw')
+    store.add_dataframe(pd.DataFrame({'id': a[:250]}), 'view')
+    path = str(tmp_path / 'sdg.sketches.npz')
+    store.save(path)
+    loaded = SketchStore.load(path)
+    assert loaded.fingerprint() == store.fingerprint()
+    assert loaded.containment('view.id', 'raw.id') > 0.85
+    assert loaded.containment('view.id', 'missing.col') == 0.0
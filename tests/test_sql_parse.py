@@ -13,3 +13,17 @@ def test_create_view_simple():
     mapping = map_output_to_input_columns(select_ast)
     # mapping keys might be 'id' and 'name' or alias forms
     assert any('id' in k.lower() for k in mapping.keys())
+
+def test_prefilter_and_statement_isolation():
+    from src.sl_core.parser_sql import split_statements, is_lineage_statement
+    sql = """-- header; not a statement
+SET x = 1;
+CREATE TABLE a (id INT);
+CREATE VIEW v AS SELECT 'a;b' AS s, a.id /* ; */ FROM a;
+CREATE VIEW broken AS SELECT FROM WHERE;
+INSERT INTO t SELECT id FROM a"""
+    stmts = split_statements(sql)
+    assert len(stmts) == 5
+    assert [is_lineage_statement(s) for s in stmts] == [False, False, True, True, True]
+    pairs = [p for ast in parse_sql_statements(sql) for p in extract_create_selects(ast)]
+    assert [name for name, _ in pairs] == ['v', 't']
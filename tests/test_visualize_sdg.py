@@ -0,0 +1,36 @@
+import xml.etree.ElementTree as ET
+
+from src.sl_core.build_sdg import process_workspace
+from src.sl_core.sdg_io import write_parquet
+from src.tools.gen_synthetic import gen_workload
+from examples.visualize_sdg import EdgeArrays, layered_layout, render_svg, rollup_tables
+
+def test_layout_rollup_and_ego():
+    edges = [('a.x', 'b.x', 0.9), ('a.y', 'b.y', 0.4), ('b.x', 'c.x', 0.8), ('c.x', 'b.y', 0.7), ('d.z', 'a.x', 0.2)]
+    names = sorted({n for e in edges for n in e[:2]})
+    ids = {n: i for i, n in enumerate(names)}
+    g = EdgeArrays(names, [ids[u] for u, _, _ in edges], [ids[v] for _, v, _ in edges], [p for _, _, p in edges])
+    assert {(u, v) for u, v, _ in g.ego('b.x', depth=1)} == {('a.x', 'b.x'), ('b.x', 'c.x')}
+    assert {(u, v) for u, v, _ in g.ego('b.x', depth=2, min_prob=0.5, direction='down')} == {('b.x', 'c.x'), ('c.x', 'b.y')}
+
+    tables, columns = rollup_tables(edges)
+    assert {(u, v): (p, n) for u, v, p, n in tables}[('a', 'b')] == (0.9, 2)
+    assert columns['b'] == ['b.x', 'b.y']
+    expanded, _ = rollup_tables(edges, expand=['b'])
+    assert ('a', 'b.y', 0.4, 1) in expanded
+
+    # b -> c -> b is a cycle; every node still gets a layer and sources come first
+    pos = layered_layout(['a', 'b', 'c', 'd'], tables)
+    assert pos['d'][0] == 0 and pos['a'][0] == 1 and len({p for p in pos.values()}) == 4
+
+def test_render_svg_from_build(tmp_path):
+    gen_workload(str(tmp_path / 'ws'), 'tiny', seed=1, verbose=False)
+    store = process_workspace(str(tmp_path / 'ws'))
+    write_parquet(store, str(tmp_path / 'sdg'))
+    stats = render_svg(str(tmp_path / 'sdg'), str(tmp_path / 'tables.svg'))
+    root = ET.parse(tmp_path / 'tables.svg').getroot()
+    assert stats['nodes'] == len(root.findall('{http://www.w3.org/2000/svg}g/{http://www.w3.org/2000/svg}rect'))
+    focus = next(iter(store.iter_edges()))[1]
+    stats = render_svg(store, str(tmp_path / 'focus.svg'), focus=focus, depth=1)
+    assert stats['nodes'] >= 2 and stats['edges'] >= 1
+    ET.parse(tmp_path / 'focus.svg')